@@ -5,23 +5,51 @@
 """
 
 import re
-import json
 import time
+import hashlib
 import random
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 from urllib.parse import urlparse
-import requests
-from bs4 import BeautifulSoup
+from chapter_crawler import ChapterCrawler
+from http_client import HttpClient
+from cache import TwoLevelCache
+from page_store import PageStore
+from character_extractor import CharacterExtractor, RoleClassifier
+from stream_analyzer import StreamingAnalyzer
+from html_parser import create_backend
+
+
+# 常见的章节关键词
+CHAPTER_KEYWORD_PATTERN = re.compile('[章节回话卷篇集]')
+
+# 可能指向章节的链接
+CHAPTER_URL_PATTERN = re.compile('chapter|chap|回|章', re.IGNORECASE)
 
 
 class NovelAnalyzer:
     """小说分析器"""
     
+    # 分析逻辑变化时递增，旧的分析结果随之失效
+    ANALYZER_VERSION = "1.5.0"
+    
+    # 标题、作者选择器（按优先级）
+    TITLE_SELECTORS = [
+        'h1', 'h2', '.title', '.book-title', '#title', 
+        'meta[property="og:title"]', 'meta[name="title"]'
+    ]
+    AUTHOR_SELECTORS = [
+        '.author', '.writer', '#author', 'meta[name="author"]',
+        'meta[property="book:author"]', 'a[href*="author"]'
+    ]
+    
     def __init__(self, config: Dict):
         self.config = config
         self.cache_dir = Path(config.get("cache", {}).get("cache_dir", "cache"))
         self.cache_dir.mkdir(exist_ok=True)
+        self.cache = TwoLevelCache(config.get("cache", {}), self.cache_dir)
+        self.pages = PageStore(self.cache_dir / "pages", config.get("cache", {}).get("enabled", True))
         
         # 请求头
         self.headers = {
@@ -32,31 +60,32 @@ class NovelAnalyzer:
             'Connection': 'keep-alive',
         }
         
+        # 复用的HTTP会话
+        self.http = HttpClient(config, self.headers)
+        
+        # 章节抓取器（按需创建）
+        self.crawler = None
+        
+        # 人名提取引擎（姓氏自动机只编译一次）
+        self.character_extractor = CharacterExtractor()
+        self.role_classifier = RoleClassifier()
+        
+        # HTML解析后端与选择器（选择器只编译一次）
+        self.parser = create_backend(config.get("analysis", {}).get("html_parser", "auto"))
+        self.title_selectors = self.parser.compile(self.TITLE_SELECTORS)
+        self.author_selectors = self.parser.compile(self.AUTHOR_SELECTORS)
+        
     def analyze(self, url: str) -> Optional[Dict]:
         """分析小说"""
         try:
-            # 检查缓存
-            cache_key = self._get_cache_key(url)
-            cached_result = self._load_from_cache(cache_key)
-            if cached_result:
-                print("使用缓存的分析结果")
-                return cached_result
-            
-            # 获取小说内容
+            # 获取原始页面（未过期直接使用本地存储，过期则做条件请求）
             print(f"获取小说内容: {url}")
-            content = self._fetch_novel_content(url)
-            if not content:
+            record = self._fetch_novel_content(url)
+            if not record:
                 print("错误: 无法获取小说内容")
                 return None
             
-            # 分析内容
-            print("分析小说内容...")
-            analysis_result = self._analyze_content(content, url)
-            
-            # 保存到缓存
-            self._save_to_cache(cache_key, analysis_result)
-            
-            return analysis_result
+            return self._analyze_record(record, url)
             
         except Exception as e:
             print(f"分析过程中出错: {e}")
@@ -64,55 +93,78 @@ class NovelAnalyzer:
             traceback.print_exc()
             return None
     
-    def _fetch_novel_content(self, url: str) -> Optional[str]:
-        """获取小说内容"""
-        try:
-            response = requests.get(
-                url, 
-                headers=self.headers,
-                timeout=self.config["analysis"].get("timeout", 30)
-            )
-            response.raise_for_status()
-            response.encoding = self._detect_encoding(response)
-            return response.text
-        except Exception as e:
-            print(f"获取内容失败: {e}")
+    def reanalyze(self, url: str) -> Optional[Dict]:
+        """使用已存储的原始页面离线重新分析（不访问网络）"""
+        record = self.pages.latest(url)
+        if not record:
+            print(f"错误: 没有已存储的页面: {url}")
             return None
+        
+        return self._analyze_record(record, url)
+    
+    def reanalyze_all(self) -> List[Dict]:
+        """离线重新分析存储中的全部小说"""
+        results = []
+        for url in self.pages.iter_urls():
+            result = self.reanalyze(url)
+            if result:
+                results.append(result)
+        return results
     
-    def _detect_encoding(self, response) -> str:
-        """检测编码"""
-        # 尝试从headers中获取
-        if response.encoding:
-            return response.encoding
+    def _fetch_novel_content(self, url: str) -> Optional[Dict]:
+        """获取小说页面，返回原始页面存储中的记录"""
+        return self.pages.fetch(self.http, url, self.config["cache"].get("ttl", 86400))
+    
+    def _analyze_record(self, record: Dict, url: str) -> Optional[Dict]:
+        """分析一条页面记录，结果按(URL, 内容哈希, 分析器版本)缓存"""
+        cache_key = self._get_cache_key(url, record["sha256"])
+        cached_result = self._load_from_cache(cache_key)
+        if cached_result:
+            print("使用缓存的分析结果")
+            return cached_result
+        
+        content = self.pages.load(record)
+        if content is None:
+            print("错误: 原始页面已丢失")
+            return None
         
-        # 尝试从content中检测
-        try:
-            import chardet
-            encoding = chardet.detect(response.content)['encoding']
-            if encoding:
-                return encoding
-        except:
-            pass
-        
-        # 默认使用utf-8
-        return 'utf-8'
+        # 分析内容
+        print("分析小说内容...")
+        analysis_result = self._analyze_content(content, url)
+        
+        # 保存到缓存
+        self._save_to_cache(cache_key, analysis_result)
+        
+        return analysis_result
     
     def _analyze_content(self, content: str, url: str) -> Dict:
         """分析小说内容"""
-        soup = BeautifulSoup(content, 'html.parser')
+        document = self.parser.parse(content)
         
         # 提取基本信息
-        title = self._extract_title(soup, url)
-        author = self._extract_author(soup)
+        title = self._extract_title(document, url)
+        author = self._extract_author(document)
         
         # 提取章节
-        chapters = self._extract_chapters(soup, content)
+        chapters = self._extract_chapters(document, content)
+        
+        content_type = self._detect_content_type(content)
+        
+        # 解析树不再需要，逐章分析期间不必常驻内存
+        del document
+        
+        # 流式分析正文：抓取模式下逐章消费章节正文，否则分析页面本身
+        stream = self._new_stream_analyzer()
+        if self.config.get("crawl", {}).get("enabled", False):
+            stream.feed_all(self._iter_chapter_texts(chapters, url))
+        if not stream.chunks:
+            stream.feed(content)
         
         # 分析写作风格
-        writing_style = self._analyze_writing_style(content, chapters)
+        writing_style = stream.writing_style()
         
         # 提取角色
-        main_characters = self._extract_characters(content, chapters)
+        main_characters = self._characters_from_stream(stream)
         
         # 分析情节结构
         plot_structure = self._analyze_plot_structure(chapters)
@@ -130,29 +182,18 @@ class NovelAnalyzer:
             "metadata": {
                 "total_chapters": len(chapters),
                 "avg_chapter_length": self._calculate_avg_length(chapters),
-                "content_type": self._detect_content_type(content)
+                "content_type": content_type
             }
         }
         
         return result
     
-    def _extract_title(self, soup: BeautifulSoup, url: str) -> str:
+    def _extract_title(self, document, url: str) -> str:
         """提取标题"""
         # 尝试多种选择器
-        selectors = [
-            'h1', 'h2', '.title', '.book-title', '#title', 
-            'meta[property="og:title"]', 'meta[name="title"]'
-        ]
-        
-        for selector in selectors:
-            if selector.startswith('meta'):
-                meta = soup.select_one(selector)
-                if meta and meta.get('content'):
-                    return meta['content'].strip()
-            else:
-                element = soup.select_one(selector)
-                if element and element.text.strip():
-                    return element.text.strip()
+        title = document.first_text(self.title_selectors)
+        if title:
+            return title
         
         # 从URL中提取
         parsed_url = urlparse(url)
@@ -163,36 +204,16 @@ class NovelAnalyzer:
         
         return "未知标题"
     
-    def _extract_author(self, soup: BeautifulSoup) -> str:
+    def _extract_author(self, document) -> str:
         """提取作者"""
-        selectors = [
-            '.author', '.writer', '#author', 'meta[name="author"]',
-            'meta[property="book:author"]', 'a[href*="author"]'
-        ]
-        
-        for selector in selectors:
-            if selector.startswith('meta'):
-                meta = soup.select_one(selector)
-                if meta and meta.get('content'):
-                    return meta['content'].strip()
-            else:
-                element = soup.select_one(selector)
-                if element and element.text.strip():
-                    return element.text.strip()
-        
-        return "未知作者"
+        return document.first_text(self.author_selectors) or "未知作者"
     
-    def _extract_chapters(self, soup: BeautifulSoup, content: str) -> List[Dict]:
+    def _extract_chapters(self, document, content: str) -> List[Dict]:
         """提取章节"""
         chapters = []
         
         # 尝试查找章节链接
-        chapter_links = soup.find_all('a', href=True)
-        
-        for link in chapter_links:
-            link_text = link.text.strip()
-            link_href = link['href']
-            
+        for link_text, link_href in document.iter_links():
             # 判断是否是章节链接
             if self._is_chapter_link(link_text, link_href):
                 chapter = {
@@ -212,23 +233,63 @@ class NovelAnalyzer:
         
         return chapters
     
+    def _iter_chapter_texts(self, chapters: List[Dict], url: str) -> Iterator[str]:
+        """并发抓取章节正文，按章节顺序逐章产出"""
+        if not chapters:
+            return
+        
+        if self.crawler is None:
+            self.crawler = ChapterCrawler(self.config, self.headers, session=self.http.session,
+                                          page_store=self.pages, parser=self.parser)
+        
+        print(f"抓取{len(chapters)}章正文...")
+        start = time.time()
+        fetched = 0
+        
+        for chapter, text in self.crawler.iter_chapters(chapters, url):
+            if text:
+                chapter["length"] = len(text)
+                fetched += 1
+                yield text
+        
+        print(f"抓取完成: {fetched}/{len(chapters)}章，耗时{time.time() - start:.1f}秒")
+    
+    def analyze_texts(self, texts: Iterable[str]) -> Dict:
+        """流式分析正文生成器（如本地文件逐章读取），返回写作风格和主要角色"""
+        stream = self._new_stream_analyzer().feed_all(texts)
+        return {
+            "writing_style": stream.writing_style(),
+            "main_characters": self._characters_from_stream(stream)
+        }
+    
+    def _new_stream_analyzer(self, track_names: bool = True) -> StreamingAnalyzer:
+        """创建流式分析器（共享已编译的人名自动机）"""
+        return StreamingAnalyzer(self.character_extractor, self.role_classifier, track_names)
+    
+    def _characters_from_stream(self, stream: StreamingAnalyzer) -> List[Dict]:
+        """根据流式统计结果生成角色信息"""
+        characters = []
+        for name, freq in stream.top_names(limit=10, min_frequency=3):
+            characters.append({
+                "name": name,
+                "frequency": freq,
+                "role": stream.role_of(name),
+                "gender": self._guess_character_gender(name)
+            })
+        return characters
+    
     def _is_chapter_link(self, text: str, href: str) -> bool:
         """判断是否是章节链接"""
-        # 常见的章节关键词
-        chapter_keywords = ['章', '节', '回', '话', '卷', '篇', '集']
-        number_patterns = [r'第[零一二三四五六七八九十百千万\d]+章', r'第\d+章']
+        # 目录页可能有上千个链接，先做最便宜的长度判断
+        if len(text) >= 50:
+            return False
         
-        # 检查是否包含章节关键词
-        has_keyword = any(keyword in text for keyword in chapter_keywords)
-        
-        # 检查是否匹配数字模式
-        matches_pattern = any(re.search(pattern, text) for pattern in number_patterns)
+        # 检查是否包含章节关键词（“第N章”必然包含“章”，无需单独匹配数字模式）
+        if CHAPTER_KEYWORD_PATTERN.search(text):
+            return True
         
         # 检查链接是否可能指向章节
-        href_lower = href.lower()
-        is_chapter_url = any(word in href_lower for word in ['chapter', 'chap', '回', '章'])
-        
-        return (has_keyword or matches_pattern or is_chapter_url) and len(text) < 50
+        return CHAPTER_URL_PATTERN.search(href) is not None
     
     def _extract_chapters_from_content(self, content: str) -> List[Dict]:
         """从内容中提取章节"""
@@ -255,108 +316,36 @@ class NovelAnalyzer:
         return chapters[:self.config["analysis"].get("max_chapters", 50)]
     
     def _analyze_writing_style(self, content: str, chapters: List[Dict]) -> Dict:
-        """分析写作风格"""
-        # 采样部分内容进行分析
-        sample_text = content[:10000]  # 分析前10000字符
-        
-        style_analysis = {
-            "style_type": "未知",
-            "dialogue_ratio": 0.0,
-            "description_ratio": 0.0,
-            "paragraph_length_avg": 0.0,
-            "sentence_length_avg": 0.0,
-            "common_words": [],
-            "special_patterns": []
-        }
-        
-        # 分析对话比例
-        dialogue_patterns = ['「', '」', '“', '”', '"', "'", '说道', '问道', '喊道']
-        dialogue_count = sum(sample_text.count(pattern) for pattern in dialogue_patterns)
-        total_quotes = sample_text.count('「') + sample_text.count('」') + sample_text.count('"') + sample_text.count("'")
-        style_analysis["dialogue_ratio"] = dialogue_count / max(len(sample_text), 1)
-        
-        # 分析段落长度
-        paragraphs = [p.strip() for p in sample_text.split('\n') if p.strip()]
-        if paragraphs:
-            style_analysis["paragraph_length_avg"] = sum(len(p) for p in paragraphs) / len(paragraphs)
-        
-        # 分析句子长度
-        sentences = re.split(r'[。！？!?]', sample_text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        if sentences:
-            style_analysis["sentence_length_avg"] = sum(len(s) for s in sentences) / len(sentences)
-        
-        # 判断风格类型
-        if style_analysis["dialogue_ratio"] > 0.3:
-            style_analysis["style_type"] = "对话驱动型"
-        elif style_analysis["paragraph_length_avg"] > 200:
-            style_analysis["style_type"] = "描写细腻型"
-        elif style_analysis["sentence_length_avg"] < 20:
-            style_analysis["style_type"] = "简洁明快型"
-        else:
-            style_analysis["style_type"] = "平衡型"
-        
-        return style_analysis
+        """分析写作风格（覆盖全部内容）"""
+        stream = self._new_stream_analyzer(track_names=False)
+        stream.feed(content)
+        return stream.writing_style()
     
     def _extract_characters(self, content: str, chapters: List[Dict]) -> List[Dict]:
         """提取角色"""
         characters = []
         
-        # 常见的中文人名模式
-        name_patterns = [
-            r'[赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜戚谢邹喻柏水窦章云苏潘葛奚范彭郎鲁韦昌马苗凤花方俞任袁柳酆鲍史唐费廉岑薛雷贺倪汤滕殷罗毕郝邬安常乐于时傅皮卞齐康伍余元卜顾孟平黄和穆萧尹姚邵湛汪祁毛禹狄米贝明臧计伏成戴谈宋茅庞熊纪舒屈项祝董梁杜阮蓝闵席季麻强贾路娄危江童颜郭梅盛林刁钟徐邱骆高夏蔡田樊胡凌霍虞万支柯昝管卢莫经房裘缪干解应宗丁宣贲邓郁单杭洪包诸左石崔吉钮龚程嵇邢滑裴陆荣翁荀羊於惠甄曲家封芮羿储靳汲邴糜松井段富巫乌焦巴弓牧隗山谷车侯宓蓬全郗班仰秋仲伊宫宁仇栾暴甘钭厉戎祖武符刘景詹束龙叶幸司韶郜黎蓟薄印宿白怀蒲邰从鄂索咸籍赖卓蔺屠蒙池乔阴鬱胥能苍双闻莘党翟谭贡劳逄姬申扶堵冉宰郦雍卻璩桑桂濮牛寿通边扈燕冀郏浦尚农温别庄晏柴瞿阎充慕连茹习宦艾鱼容向古易慎戈廖庾终暨居衡步都耿满弘匡国文寇广禄阙东欧殳沃利蔚越夔隆师巩厍聂晁勾敖融冷訾辛阚那简饶空曾毋沙乜养鞠须丰巢关蒯相查后荆红游竺权逯盖益桓公][\u4e00-\u9fa5]{1,2}'
-        ]
-        
-        # 从内容中提取人名
-        all_names = set()
-        for pattern in name_patterns:
-            matches = re.findall(pattern, content[:50000])  # 只分析前50000字符
-            all_names.update(matches)
+        # 一次扫描全文统计候选人名，至少出现3次才认为是重要角色
+        top_names = self.character_extractor.extract(content, limit=10, min_frequency=3)
         
-        # 统计出现频率
-        name_freq = {}
-        for name in all_names:
-            if 2 <= len(name) <= 4:  # 合理的人名长度
-                freq = content.count(name)
-                if freq >= 3:  # 至少出现3次才认为是重要角色
-                    name_freq[name] = freq
-        
-        # 按频率排序
-        sorted_names = sorted(name_freq.items(), key=lambda x: x[1], reverse=True)
+        # 一次建立人名位置索引，批量判断身份
+        roles = self._guess_character_roles([name for name, _ in top_names], content)
         
         # 创建角色信息
-        for name, freq in sorted_names[:10]:  # 只取前10个
+        for name, freq in top_names:
             character = {
                 "name": name,
                 "frequency": freq,
-                "role": self._guess_character_role(name, content),
+                "role": roles[name],
                 "gender": self._guess_character_gender(name)
             }
             characters.append(character)
         
         return characters
     
-    def _guess_character_role(self, name: str, content: str) -> str:
+    def _guess_character_roles(self, names: List[str], content: str) -> Dict[str, str]:
         """猜测角色身份"""
-        # 在名字周围提取上下文
-        context_pattern = f'.{{0,50}}{name}.{{0,50}}'
-        contexts = re.findall(context_pattern, content[:20000])
-        
-        role_keywords = {
-            "主角": ["主角", "主人公", "主要人物", "英雄", "侠客", "少年", "少女"],
-            "反派": ["反派", "恶人", "敌人", "对手", "魔王", "妖怪", "恶霸"],
-            "导师": ["师父", "师傅", "老师", "导师", "前辈", "长老", "仙人"],
-            "伙伴": ["朋友", "伙伴", "兄弟", "姐妹", "同伴", "队友", "同盟"],
-            "恋人": ["爱人", "恋人", "情侣", "夫妻", "娘子", "相公", "心上人"],
-            "配角": ["配角", "次要人物", "路人", "群众", "村民", "士兵", "仆人"]
-        }
-        
-        for role, keywords in role_keywords.items():
-            for context in contexts:
-                if any(keyword in context for keyword in keywords):
-                    return role
-        
-        return "未知"
+        return self.role_classifier.classify(content, names)
     
     def _guess_character_gender(self, name: str) -> str:
         """猜测角色性别"""
@@ -407,8 +396,40 @@ class NovelAnalyzer:
         if not chapters:
             return 0.0
         
+        # 有抓取到的正文时使用实际长度
+        lengths = [chapter["length"] for chapter in chapters if chapter.get("length")]
+        if lengths:
+            return sum(lengths) / len(lengths)
+        
         # 基于章节数量估算
         avg_words_per_chapter = 2000  # 假设每章2000字
         return avg_words_per_chapter
     
-    def _detect_content_type
\ No newline at end of file
+    def _detect_content_type(self, content: str) -> str:
+        """检测内容类型"""
+        if re.search(r'第[零一二三四五六七八九十百千万\d]+章', content):
+            return "web_novel"
+        if '<article' in content or '<p' in content:
+            return "article"
+        return "unknown"
+    
+    def _get_cache_key(self, url: str, content_hash: str) -> str:
+        """生成缓存键：URL哈希 + 内容哈希 + 抓取模式 + 分析器版本
+
+        标题回退和章节链接都与URL有关，相同内容的不同URL分别缓存。
+        """
+        mode = "crawl" if self.config.get("crawl", {}).get("enabled", False) else "page"
+        url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
+        return f"{url_hash}-{content_hash[:32]}-{mode}-v{self.ANALYZER_VERSION}"
+    
+    def _load_from_cache(self, key: str) -> Optional[Dict]:
+        """从缓存加载（按内容寻址，不受TTL限制，只按大小淘汰）"""
+        return self.cache.get(key, ignore_ttl=True)
+    
+    def _save_to_cache(self, key: str, data: Dict):
+        """保存到缓存"""
+        self.cache.set(key, data)
+    
+    def cache_stats(self) -> Dict:
+        """缓存命中统计"""
+        return self.cache.stats()
@@ -4,81 +4,93 @@
 """
 
 import re
-import json
-import time
 import hashlib
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime
 from urllib.parse import urlparse
-import requests
-from bs4 import BeautifulSoup
+from http_client import HttpClient
+from cache import TwoLevelCache
+from page_store import PageStore
+from html_parser import create_backend
 
 
 class NovelAnalyzer:
     """小说分析器"""
     
+    ANALYZER_VERSION = "1.1.0"
+    
+    TITLE_SELECTORS = ['h1', '.title', '#title', 'meta[property="og:title"]']
+    AUTHOR_SELECTORS = ['.author', '#author', 'meta[name="author"]']
+    
     def __init__(self, config: Dict):
         self.config = config
         self.cache_dir = Path(config.get("cache", {}).get("cache_dir", "cache"))
         self.cache_dir.mkdir(exist_ok=True)
+        self.cache = TwoLevelCache(config.get("cache", {}), self.cache_dir)
+        self.pages = PageStore(self.cache_dir / "pages", config.get("cache", {}).get("enabled", True))
         
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
         }
+        self.http = HttpClient(config, self.headers)
+        
+        # HTML解析后端，选择器只编译一次
+        self.parser = create_backend(config.get("analysis", {}).get("html_parser", "auto"))
+        self.title_selectors = self.parser.compile(self.TITLE_SELECTORS)
+        self.author_selectors = self.parser.compile(self.AUTHOR_SELECTORS)
     
     def analyze(self, url: str) -> Optional[Dict]:
         """分析小说"""
         try:
-            cache_key = self._get_cache_key(url)
-            cached = self._load_from_cache(cache_key)
-            if cached:
-                print("使用缓存的分析结果")
-                return cached
-            
             print(f"获取小说内容: {url}")
-            content = self._fetch_content(url)
-            if not content:
+            record = self.pages.fetch(self.http, url, self.config["cache"].get("ttl", 86400))
+            if not record:
                 return None
             
-            print("分析小说内容...")
-            result = self._analyze_content(content, url)
-            
-            self._save_to_cache(cache_key, result)
-            return result
+            return self._analyze_record(record, url)
             
         except Exception as e:
             print(f"分析失败: {e}")
             return None
     
-    def _fetch_content(self, url: str) -> Optional[str]:
-        """获取网页内容"""
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=30)
-            resp.raise_for_status()
-            resp.encoding = self._detect_encoding(resp)
-            return resp.text
-        except Exception as e:
-            print(f"获取失败: {e}")
+    def reanalyze(self, url: str) -> Optional[Dict]:
+        """使用已存储的原始页面离线重新分析"""
+        record = self.pages.latest(url)
+        if not record:
+            print(f"没有已存储的页面: {url}")
             return None
-    
-    def _detect_encoding(self, response) -> str:
-        """检测编码"""
-        if response.encoding:
-            return response.encoding
-        return 'utf-8'
+        return self._analyze_record(record, url)
+    
+    def _analyze_record(self, record: Dict, url: str) -> Optional[Dict]:
+        """分析页面记录，结果按(URL, 内容哈希, 分析器版本)缓存"""
+        cache_key = self._get_cache_key(url, record["sha256"])
+        cached = self._load_from_cache(cache_key)
+        if cached:
+            print("使用缓存的分析结果")
+            return cached
+        
+        content = self.pages.load(record)
+        if content is None:
+            return None
+        
+        print("分析小说内容...")
+        result = self._analyze_content(content, url)
+        
+        self._save_to_cache(cache_key, result)
+        return result
     
     def _analyze_content(self, content: str, url: str) -> Dict:
         """分析内容"""
-        soup = BeautifulSoup(content, 'html.parser')
+        document = self.parser.parse(content)
         
         return {
             "url": url,
-            "title": self._extract_title(soup, url),
-            "author": self._extract_author(soup),
-            "chapters": self._extract_chapters(soup),
+            "title": self._extract_title(document, url),
+            "author": self._extract_author(document),
+            "chapters": self._extract_chapters(document),
             "writing_style": self._analyze_style(content),
             "main_characters": self._extract_characters(content),
             "analysis_time": datetime.now().isoformat(),
@@ -88,18 +100,12 @@ class NovelAnalyzer:
             }
         }
     
-    def _extract_title(self, soup: BeautifulSoup, url: str) -> str:
+    def _extract_title(self, document, url: str) -> str:
         """提取标题"""
         # 尝试多种选择器
-        for selector in ['h1', '.title', '#title', 'meta[property="og:title"]']:
-            if selector.startswith('meta'):
-                meta = soup.select_one(selector)
-                if meta and meta.get('content'):
-                    return meta['content'].strip()
-            else:
-                elem = soup.select_one(selector)
-                if elem and elem.text.strip():
-                    return elem.text.strip()
+        title = document.first_text(self.title_selectors)
+        if title:
+            return title
         
         # 从URL提取
         parsed = urlparse(url)
@@ -109,29 +115,15 @@ class NovelAnalyzer:
         
         return "未知标题"
     
-    def _extract_author(self, soup: BeautifulSoup) -> str:
+    def _extract_author(self, document) -> str:
         """提取作者"""
-        for selector in ['.author', '#author', 'meta[name="author"]']:
-            if selector.startswith('meta'):
-                meta = soup.select_one(selector)
-                if meta and meta.get('content'):
-                    return meta['content'].strip()
-            else:
-                elem = soup.select_one(selector)
-                if elem and elem.text.strip():
-                    return elem.text.strip()
-        
-        return "未知作者"
-    
-    def _extract_chapters(self, soup: BeautifulSoup) -> List[Dict]:
+        return document.first_text(self.author_selectors) or "未知作者"
+    
+    def _extract_chapters(self, document) -> List[Dict]:
         """提取章节"""
         chapters = []
-        links = soup.find_all('a', href=True)
         
-        for link in links:
-            text = link.text.strip()
-            href = link['href']
-            
+        for text, href in document.iter_links():
             # 简单判断是否是章节
             if ('章' in text or '节' in text or '回' in text) and len(text) < 50:
                 chapters.append({
@@ -192,38 +184,22 @@ class NovelAnalyzer:
         
         return "未知"
     
-    def _get_cache_key(self, url: str) -> str:
-        """生成缓存键"""
-        return hashlib.md5(url.encode()).hexdigest()[:16]
+    def _get_cache_key(self, url: str, content_hash: str) -> str:
+        """生成缓存键：URL哈希 + 内容哈希 + 分析器版本"""
+        url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
+        return f"{url_hash}-{content_hash[:32]}-simple-v{self.ANALYZER_VERSION}"
     
     def _load_from_cache(self, key: str) -> Optional[Dict]:
         """从缓存加载"""
-        if not self.config["cache"]["enabled"]:
-            return None
-        
-        cache_file = self.cache_dir / f"{key}.json"
-        if cache_file.exists():
-            cache_age = time.time() - cache_file.stat().st_mtime
-            if cache_age < self.config["cache"]["ttl"]:
-                try:
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-                except:
-                    pass
-        
-        return None
+        return self.cache.get(key, ignore_ttl=True)
     
     def _save_to_cache(self, key: str, data: Dict):
         """保存到缓存"""
-        if not self.config["cache"]["enabled"]:
-            return
-        
-        cache_file = self.cache_dir / f"{key}.json"
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+        self.cache.set(key, data)
+    
+    def cache_stats(self) -> Dict:
+        """缓存命中统计"""
+        return self.cache.stats()
 
 
 # 简化版本，直接使用这个文件
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+异步分析模块
+非阻塞地抓取页面、读写缓存，解析与统计放到进程池，一个事件循环可同时处理大量分析请求
+"""
+
+import os
+import asyncio
+from functools import partial
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from analyzer import NovelAnalyzer
+from http_client import HttpClient
+
+
+# 工作进程内的分析器（每个进程只初始化一次）
+_worker_analyzer = None
+
+
+def _init_worker(config: Dict):
+    """工作进程初始化"""
+    global _worker_analyzer
+    _worker_analyzer = NovelAnalyzer(config)
+
+
+def _analyze_content(config: Dict, content: str, url: str) -> Dict:
+    """在工作进程中解析和统计页面内容"""
+    if _worker_analyzer is None:
+        _init_worker(config)
+    return _worker_analyzer._analyze_content(content, url)
+
+
+class AsyncHttpClient:
+    """异步HTTP客户端
+
+    安装了aiohttp时使用原生异步请求，否则在线程中调用同步的 HttpClient。
+    返回值格式与 HttpClient.get 相同。
+    """
+
+    def __init__(self, config: Dict, headers: Dict, max_connections: int = 100):
+        self.timeout = config.get("analysis", {}).get("timeout", 30)
+        self.headers = headers
+        self.max_connections = max_connections
+        self._session = None
+        self._sync_client = None if aiohttp else HttpClient(config, headers)
+
+    async def get(self, url: str, validators: Optional[Dict] = None) -> Optional[Dict]:
+        """获取页面，带上已有的验证信息时发起条件请求"""
+        if self._sync_client is not None:
+            return await asyncio.to_thread(self._sync_client.get, url, validators)
+
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
+
+        try:
+            session = self._get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return {
+                        "status": 304,
+                        "text": None,
+                        "etag": response.headers.get('ETag') or (validators or {}).get("etag"),
+                        "last_modified": response.headers.get('Last-Modified') or (validators or {}).get("last_modified"),
+                        "not_modified": True
+                    }
+
+                response.raise_for_status()
+                body = await response.read()
+                return {
+                    "status": response.status,
+                    "text": body.decode(self._detect_encoding(response, body), errors='replace'),
+                    "etag": response.headers.get('ETag'),
+                    "last_modified": response.headers.get('Last-Modified'),
+                    "not_modified": False
+                }
+        except Exception as e:
+            print(f"获取内容失败: {e}")
+            return None
+
+    def _get_session(self):
+        """在事件循环内按需创建会话"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+        return self._session
+
+    def _detect_encoding(self, response, body: bytes) -> str:
+        """检测编码"""
+        # 尝试从headers中获取
+        if response.charset:
+            return response.charset
+
+        # 尝试从content中检测
+        try:
+            import chardet
+            encoding = chardet.detect(body)['encoding']
+            if encoding:
+                return encoding
+        except:
+            pass
+
+        # 默认使用utf-8
+        return 'utf-8'
+
+    async def close(self):
+        """关闭会话"""
+        if self._session is not None:
+            await self._session.close()
+        if self._sync_client is not None:
+            self._sync_client.close()
+
+
+class AsyncNovelAnalyzer:
+    """异步小说分析器
+
+    与 NovelAnalyzer 共用页面存储、分析缓存和缓存键，结果完全一致：
+    - 网络请求：aiohttp（未安装时用线程）
+    - 页面存储、缓存的文件读写：I/O线程池
+    - HTML解析、正文统计：进程池（可传入自定义执行器）
+    """
+
+    def __init__(self, config: Dict, max_concurrency: int = 100,
+                 executor: Optional[Executor] = None):
+        self.config = config
+        self.analyzer = NovelAnalyzer(config)
+        self.http = AsyncHttpClient(config, self.analyzer.headers, max_concurrency)
+
+        # 同时进行的分析数
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = None
+
+        self._io_executor = ThreadPoolExecutor(max_workers=min(32, self.max_concurrency))
+        self._owns_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 4, initializer=_init_worker, initargs=(config,)
+        )
+
+    async def analyze(self, url: str) -> Optional[Dict]:
+        """分析小说"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            try:
+                print(f"获取小说内容: {url}")
+                record = await self._fetch_novel_content(url)
+                if not record:
+                    print("错误: 无法获取小说内容")
+                    return None
+
+                return await self._analyze_record(record, url)
+
+            except Exception as e:
+                print(f"分析过程中出错: {e}")
+                import traceback
+                traceback.print_exc()
+                return None
+
+    async def analyze_many(self, urls: Iterable[str]) -> List[Optional[Dict]]:
+        """并发分析多个URL，按输入顺序返回"""
+        return await asyncio.gather(*(self.analyze(url) for url in urls))
+
+    async def _io(self, func, *args):
+        """在I/O线程池中执行阻塞的文件操作"""
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, func, *args)
+
+    async def _fetch_novel_content(self, url: str) -> Optional[Dict]:
+        """获取小说页面（与 PageStore.fetch 逻辑相同）"""
+        pages = self.analyzer.pages
+        ttl = self.config["cache"].get("ttl", 86400)
+
+        record, validators = await self._io(pages.lookup, url, ttl)
+        if record:
+            return record
+
+        page = await self.http.get(url, validators)
+        if page and page["not_modified"] and not validators:
+            page = await self.http.get(url)
+        return await self._io(pages.store_response, url, page, validators)
+
+    async def _analyze_record(self, record: Dict, url: str) -> Optional[Dict]:
+        """分析一条页面记录，结果按(URL, 内容哈希, 分析器版本)缓存"""
+        cache_key = self.analyzer._get_cache_key(url, record["sha256"])
+        cached_result = await self._io(self.analyzer._load_from_cache, cache_key)
+        if cached_result:
+            print("使用缓存的分析结果")
+            return cached_result
+
+        content = await self._io(self.analyzer.pages.load, record)
+        if content is None:
+            print("错误: 原始页面已丢失")
+            return None
+
+        print("分析小说内容...")
+        if isinstance(self.executor, ProcessPoolExecutor):
+            analyze_content = partial(_analyze_content, self.config)
+        else:
+            analyze_content = self.analyzer._analyze_content
+        loop = asyncio.get_running_loop()
+        analysis_result = await loop.run_in_executor(self.executor, analyze_content, content, url)
+
+        await self._io(self.analyzer._save_to_cache, cache_key, analysis_result)
+        return analysis_result
+
+    def cache_stats(self) -> Dict:
+        """缓存命中统计"""
+        return self.analyzer.cache_stats()
+
+    async def close(self):
+        """关闭会话和执行器"""
+        await self.http.close()
+        self.analyzer.http.close()
+        self._io_executor.shutdown(wait=False)
+        if self._owns_executor:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
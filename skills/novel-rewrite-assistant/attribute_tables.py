@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+角色属性表模块
+性别、年龄、性格、背景、关系、作用、外貌的规则只定义一次，按（题材, 角色类型）
+编译为属性表并缓存，生成角色时直接取表中的候选项，不再逐次构建字典、逐个匹配关键字
+"""
+
+import random
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from template_engine import Template
+
+
+GENDERS = ("男", "女")
+
+# 完整版规则（CharacterGenerator）
+# 关键字规则按顺序匹配，角色类型包含关键字即命中，第一个命中的生效
+FULL_RULES = {
+    # 性别按角色类型完全匹配，未命中时随机
+    "male": ("师父", "师兄", "师弟", "长老", "掌门", "魔头",
+             "妖王", "上司", "兄弟", "科学家", "军官", "指挥官"),
+    "female": ("师姐", "师妹", "恋人", "情敌", "闺蜜", "前任"),
+
+    # 年龄按角色类型完全匹配
+    "ages": [
+        (("师父", "长老", "掌门", "仙人", "长辈"), ("50多岁", "60多岁", "70多岁", "百岁高龄")),
+        (("师兄", "师姐", "同事", "朋友"), ("20多岁", "30多岁", "40多岁")),
+        (("师弟", "师妹", "学生", "晚辈"), ("10多岁", "20岁左右", "20出头")),
+    ],
+    "default_ages": ("20多岁", "30多岁", "40多岁"),
+
+    "personalities": {
+        "导师": ["严肃认真", "慈祥和蔼", "深藏不露", "严格苛刻", "智慧深邃"],
+        "伙伴": ["忠诚可靠", "幽默风趣", "冷静沉着", "热情开朗", "勇敢无畏"],
+        "恋人": ["温柔体贴", "坚强独立", "善解人意", "活泼可爱", "成熟稳重"],
+        "反派": ["阴险狡诈", "冷酷无情", "野心勃勃", "残忍暴戾", "工于心计"],
+        "盟友": ["正直守信", "精明能干", "豪爽大方", "谨慎小心", "果断坚决"],
+        "对手": ["骄傲自负", "顽强不屈", "机智过人", "冷酷傲慢", "执着坚定"],
+        "家人": ["慈爱关怀", "严格管教", "支持鼓励", "保护过度", "理解包容"],
+        "朋友": ["真诚友善", "乐于助人", "风趣幽默", "可靠信任", "共同成长"]
+    },
+    "default_personalities": ["神秘莫测", "性格复杂", "多重性格", "难以捉摸", "普通平凡"],
+
+    # 背景按题材区分
+    "backgrounds": {
+        "玄幻": {
+            "师父": ["隐世高人", "宗门长老", "散修强者", "转世仙人"],
+            "伙伴": ["同门师兄弟", "冒险途中结识", "救命恩人", "志同道合"],
+            "反派": ["魔道巨擘", "宗门叛徒", "妖族王者", "邪修高手"]
+        },
+        "都市": {
+            "上司": ["公司高管", "部门主管", "创业伙伴", "行业前辈"],
+            "同事": ["同期入职", "项目搭档", "竞争对手", "职场好友"],
+            "恋人": ["青梅竹马", "工作相识", "偶然邂逅", "朋友介绍"]
+        },
+        "言情": {
+            "恋人": ["校园初恋", "职场精英", "家族联姻", "意外相遇"],
+            "情敌": ["前任恋人", "暗恋对象", "商业对手", "家族世仇"],
+            "家人": ["严格父亲", "温柔母亲", "关心兄长", "调皮妹妹"]
+        }
+    },
+    "default_backgrounds": [
+        "来历神秘", "普通出身", "世家子弟", "寒门学子",
+        "江湖游侠", "职场精英", "学院天才", "平凡之人"
+    ],
+
+    # {name} 为主角名字
+    "relationships": {
+        "师父": "{name}的授业恩师",
+        "师兄": "{name}的师兄，关系密切",
+        "师姐": "{name}的师姐，照顾有加",
+        "师弟": "{name}的师弟，尊敬师兄",
+        "师妹": "{name}的师妹，仰慕师兄",
+        "恋人": "{name}的爱人，感情深厚",
+        "朋友": "{name}的挚友，生死之交",
+        "反派": "{name}的主要对手，势不两立",
+        "家人": "{name}的亲人，血浓于水",
+        "盟友": "{name}的合作伙伴，利益一致"
+    },
+    "default_relationship": "与{name}有复杂关系",
+
+    "roles": {
+        "导师": "引导主角成长，传授知识和技能",
+        "伙伴": "陪伴主角冒险，共同面对挑战",
+        "恋人": "与主角发展感情线，提供情感支持",
+        "反派": "制造冲突和障碍，推动剧情发展",
+        "盟友": "在关键时刻提供帮助和支持",
+        "对手": "与主角竞争，促使主角进步",
+        "家人": "提供家庭背景和情感纽带",
+        "朋友": "日常互动，丰富主角生活"
+    },
+    "default_role": "推动剧情发展的重要角色",
+
+    # 外貌按题材组区分
+    "appearances": [
+        (("玄幻", "仙侠", "武侠"), {
+            "师父": ["仙风道骨", "白发苍苍", "目光如电", "气质超凡"],
+            "师兄": ["英俊潇洒", "气宇轩昂", "剑眉星目", "风度翩翩"],
+            "师姐": ["清丽脱俗", "貌美如花", "气质冷艳", "温婉动人"],
+            "反派": ["面目狰狞", "眼神阴冷", "气势逼人", "邪气凛然"]
+        }),
+        (("都市", "现代"), {
+            "上司": ["西装革履", "精明干练", "气场强大", "严肃认真"],
+            "同事": ["普通打扮", "亲切随和", "专业形象", "时尚潮流"],
+            "恋人": ["阳光帅气", "美丽动人", "气质独特", "引人注目"]
+        }),
+    ],
+    "default_appearances": [
+        "相貌普通", "长相清秀", "外貌出众", "气质独特",
+        "身材匀称", "眼神明亮", "笑容亲切", "姿态优雅"
+    ]
+}
+
+# 简化版规则（SimpleCharacterGenerator），不生成年龄、背景和外貌
+SIMPLE_RULES = {
+    "male": ("师父", "师兄", "反派", "长老", "上司", "兄弟", "对手"),
+    "female": ("师姐", "恋人", "闺蜜", "情敌", "前任"),
+
+    "personalities": {
+        "师父": ["严肃", "慈祥", "严格", "智慧"],
+        "师兄": ["可靠", "幽默", "冷静", "热情"],
+        "师姐": ["温柔", "坚强", "体贴", "可爱"],
+        "反派": ["阴险", "冷酷", "残忍", "狡猾"],
+        "朋友": ["真诚", "友善", "风趣", "可靠"],
+        "恋人": ["温柔", "体贴", "善解人意", "活泼"],
+        "对手": ["骄傲", "顽强", "机智", "执着"]
+    },
+    "default_personalities": ["神秘", "复杂", "普通", "独特"],
+
+    "relationships": {
+        "师父": "{name}的师父",
+        "师兄": "{name}的师兄",
+        "师姐": "{name}的师姐",
+        "朋友": "{name}的朋友",
+        "恋人": "{name}的恋人",
+        "反派": "{name}的对手",
+        "对手": "{name}的竞争者",
+        "家人": "{name}的家人"
+    },
+    "default_relationship": "与{name}相识",
+
+    "roles": {
+        "师父": "引导主角成长",
+        "朋友": "陪伴主角冒险",
+        "恋人": "发展感情线",
+        "反派": "制造冲突",
+        "对手": "促使主角进步",
+        "家人": "提供情感支持"
+    },
+    "default_role": "推动剧情发展"
+}
+
+PROFILES = {
+    "full": FULL_RULES,
+    "simple": SIMPLE_RULES
+}
+
+
+class AttributeTable:
+    """某一题材、某一角色类型的属性表
+
+    每项属性编译为候选元组（或固定值），生成时只做一次随机选择。
+    """
+
+    __slots__ = ("fixed_gender", "ages", "personalities", "backgrounds",
+                 "appearances", "relationship_template", "role")
+
+    def __init__(self, rules: Dict, genre: str, char_type: str):
+        if char_type in rules["male"]:
+            self.fixed_gender = "男"
+        elif char_type in rules["female"]:
+            self.fixed_gender = "女"
+        else:
+            self.fixed_gender = None
+
+        self.ages = _exact_match(rules.get("ages", []), char_type, rules.get("default_ages", ()))
+        self.personalities = tuple(_keyword_match(
+            rules["personalities"], char_type, rules["default_personalities"]))
+        self.backgrounds = tuple(_keyword_match(
+            rules.get("backgrounds", {}).get(genre, {}), char_type, rules.get("default_backgrounds", ())))
+        self.appearances = tuple(_keyword_match(
+            next((group for genres, group in rules.get("appearances", []) if genre in genres), {}),
+            char_type, rules.get("default_appearances", ())))
+        self.relationship_template = Template(_keyword_match(
+            rules["relationships"], char_type, rules["default_relationship"]))
+        self.role = _keyword_match(rules["roles"], char_type, rules["default_role"])
+
+    def gender(self, rng: random.Random) -> str:
+        """性别（类型不明确时随机）"""
+        return self.fixed_gender or rng.choice(GENDERS)
+
+    def age(self, rng: random.Random) -> str:
+        return rng.choice(self.ages)
+
+    def personality(self, rng: random.Random) -> str:
+        return rng.choice(self.personalities)
+
+    def background(self, rng: random.Random) -> str:
+        return rng.choice(self.backgrounds)
+
+    def appearance(self, rng: random.Random) -> str:
+        return rng.choice(self.appearances)
+
+    def relationship(self, protagonist_name: str) -> str:
+        """与主角的关系"""
+        return self.relationship_template.render({"name": protagonist_name})
+
+
+def _exact_match(rules, char_type: str, default) -> Tuple[str, ...]:
+    """按角色类型完全匹配"""
+    for types, values in rules:
+        if char_type in types:
+            return tuple(values)
+    return tuple(default)
+
+
+def _keyword_match(rules: Dict, char_type: str, default):
+    """角色类型包含关键字即命中，按定义顺序取第一个"""
+    for key, value in rules.items():
+        if key in char_type:
+            return value
+    return default
+
+
+@lru_cache(maxsize=4096)
+def attribute_table(profile: str, genre: str, char_type: str) -> AttributeTable:
+    """取属性表（按规则集、题材、角色类型缓存）"""
+    return AttributeTable(PROFILES[profile], genre, char_type)
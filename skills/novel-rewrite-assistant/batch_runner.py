@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+批量分析模块
+在进程池中并行分析URL列表，结果写入JSONL，支持断点续跑
+"""
+
+import io
+import sys
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from analyzer import NovelAnalyzer
+
+
+# 工作进程内的分析器（每个进程只初始化一次）
+_worker_analyzer = None
+
+
+def _init_worker(config: Dict):
+    """工作进程初始化"""
+    global _worker_analyzer
+    _worker_analyzer = NovelAnalyzer(config)
+
+
+def _analyze_url(url: str) -> Dict:
+    """在工作进程中分析一个URL，分析日志不输出到终端"""
+    start = time.time()
+    log = io.StringIO()
+    try:
+        with redirect_stdout(log):
+            result = _worker_analyzer.analyze(url)
+    except Exception as e:
+        result = None
+        log.write(f"{e}\n")
+
+    entry = {"url": url, "elapsed": round(time.time() - start, 3)}
+    if result:
+        entry["status"] = "ok"
+        entry["result"] = result
+    else:
+        # 取分析日志的最后一行作为错误原因
+        lines = [line for line in log.getvalue().splitlines() if line.strip()]
+        entry["status"] = "error"
+        entry["error"] = lines[-1] if lines else "分析失败"
+    return entry
+
+
+def load_urls(source: str) -> List[str]:
+    """从文件或标准输入（-）读取URL，忽略空行和#注释，去重保序"""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    urls = []
+    seen = set()
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith('#') and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+class Checkpoint:
+    """已完成URL的检查点文件（每行一个URL，完成一个追加一行）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.completed = self._load()
+
+    def _load(self) -> Set[str]:
+        if not self.path.exists():
+            return set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.completed
+
+    def mark(self, url: str):
+        """记录一个已完成的URL"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(url + "\n")
+        self.completed.add(url)
+
+    def reset(self):
+        """清空检查点"""
+        if self.path.exists():
+            self.path.unlink()
+        self.completed = set()
+
+
+class BatchRunner:
+    """批量分析器
+
+    结果按完成顺序逐行写入JSONL，写入后才记入检查点，
+    进程崩溃后重新运行会跳过检查点中的URL；失败的URL不记入检查点，下次会重试。
+    """
+
+    def __init__(self, config: Dict, output: Path, checkpoint: Optional[Path] = None,
+                 workers: int = 4):
+        self.config = config
+        self.output = Path(output)
+        self.checkpoint = Checkpoint(checkpoint or self.output.with_name(self.output.name + ".done"))
+        self.workers = max(1, workers)
+
+    def run(self, urls: Iterable[str]) -> Dict:
+        """分析URL列表，返回统计信息"""
+        urls = list(urls)
+        pending_urls = [url for url in urls if url not in self.checkpoint]
+        skipped = len(urls) - len(pending_urls)
+        if skipped:
+            print(f"跳过已完成的{skipped}个URL")
+
+        stats = {"total": len(pending_urls), "succeeded": 0, "failed": 0, "skipped": skipped}
+        if not pending_urls:
+            stats.update({"elapsed": 0.0, "novels_per_minute": 0.0})
+            return stats
+
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        print(f"批量分析{len(pending_urls)}个URL（{self.workers}个进程）...")
+        start = time.time()
+
+        # 同时在途的任务不超过 2 * workers
+        window = self.workers * 2
+        url_iter = iter(pending_urls)
+        with open(self.output, 'a', encoding='utf-8') as out, \
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                    initargs=(self.config,)) as executor:
+            running = set()
+            try:
+                while True:
+                    for url in url_iter:
+                        running.add(executor.submit(_analyze_url, url))
+                        if len(running) >= window:
+                            break
+                    if not running:
+                        break
+
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._record(future.result(), out, stats, start)
+            except KeyboardInterrupt:
+                print("\n已中断，重新运行同样的命令即可从检查点继续")
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        stats["elapsed"] = round(time.time() - start, 3)
+        stats["novels_per_minute"] = round(self._throughput(stats, start), 2)
+        print(f"批量分析完成: 成功{stats['succeeded']}，失败{stats['failed']}，"
+              f"耗时{stats['elapsed']:.1f}秒，速度{stats['novels_per_minute']:.1f}本/分钟")
+        return stats
+
+    def _record(self, entry: Dict, out, stats: Dict, start: float):
+        """写入一条结果并更新检查点"""
+        out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        out.flush()
+
+        if entry["status"] == "ok":
+            self.checkpoint.mark(entry["url"])
+            stats["succeeded"] += 1
+            status = "完成"
+        else:
+            stats["failed"] += 1
+            status = f"失败: {entry['error']}"
+
+        finished = stats["succeeded"] + stats["failed"]
+        print(f"[{finished}/{stats['total']}] {entry['url']} {status} "
+              f"({entry['elapsed']:.1f}秒, {self._throughput(stats, start):.1f}本/分钟)")
+
+    @staticmethod
+    def _throughput(stats: Dict, start: float) -> float:
+        """每分钟完成的小说数"""
+        elapsed = time.time() - start
+        return (stats["succeeded"] + stats["failed"]) * 60 / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+性能基准模块
+用本地生成的HTML样本（本地HTTP服务或直接读文件）分阶段计时：
+抓取、解析、章节提取、角色提取、风格分析、大纲、章节创作、保存，
+每个阶段在多个输入规模下测量每秒次数和内存峰值，结果为JSON，可与上一次结果比较
+"""
+
+import gc
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from novel_rewriter import NovelRewriter
+from analyzer import NovelAnalyzer
+from character_generator import CharacterGenerator
+from story_writer import StoryWriter
+from story_sink import SINKS, create_sink
+from rng import RngContext
+
+
+# 结果格式版本，比较时要求一致
+SCHEMA_VERSION = 1
+
+# 全部阶段（按流水线顺序）
+STAGES = [
+    "fetch", "parse", "extract_chapters", "extract_characters",
+    "analyze_writing_style", "outline", "write_chapters", "save"
+]
+
+# 默认输入规模：参考小说的章节数
+DEFAULT_SIZES = [10, 50, 100]
+
+# 固定种子，样本和创作结果每次相同
+SEED = 20240601
+
+# 样本用字
+SURNAMES = "赵钱孙李周吴郑王冯陈褚卫林萧叶"
+GIVEN_CHARS = "伟强杰明峰云天婷娜芳雪玲浩然轩逸"
+TITLE_WORDS = ["初入宗门", "山中奇遇", "危机四伏", "决战之夜", "重逢", "转折", "秘境探险", "高潮迭起"]
+ACTIONS = ["走进了大殿", "抬头望向远方", "握紧了手中的剑", "沉默了片刻", "缓缓点头", "冷笑一声"]
+LINES = ["此事绝不简单", "我们必须尽快离开", "你终于来了", "师父早有安排", "这一战避无可避"]
+
+
+def build_fixture(chapter_count: int, paragraphs: int = 12, seed: int = SEED) -> str:
+    """生成单页小说样本：目录（章节链接）和全部章节正文，规模与章节数成正比"""
+    rng = random.Random(f"{seed}:{chapter_count}")
+    cast = [rng.choice(SURNAMES) + "".join(rng.choice(GIVEN_CHARS) for _ in range(rng.randint(1, 2)))
+            for _ in range(12)]
+
+    parts = [
+        '<!DOCTYPE html><html><head><meta charset="utf-8">',
+        '<meta name="author" content="基准样本"><title>基准样本</title></head><body>',
+        '<h1>基准样本小说</h1><div class="author">基准样本</div><ul class="toc">'
+    ]
+    for number in range(1, chapter_count + 1):
+        parts.append(f'<li><a href="chapter/{number}.html">第{number}章 {rng.choice(TITLE_WORDS)}</a></li>')
+    parts.append('</ul><div id="content">')
+
+    for number in range(1, chapter_count + 1):
+        parts.append(f'<h2>第{number}章</h2>')
+        for _ in range(paragraphs):
+            speaker, listener = rng.sample(cast, 2)
+            parts.append(
+                f'<p>{speaker}{rng.choice(ACTIONS)}，对{listener}说道：“{rng.choice(LINES)}。”'
+                f'{listener}{rng.choice(ACTIONS)}，心中暗想{rng.choice(LINES)}。</p>'
+            )
+    parts.append('</div></body></html>')
+    return "\n".join(parts)
+
+
+def write_fixtures(directory: Path, sizes: List[int]) -> Dict[int, Path]:
+    """把各规模的样本写入目录，返回 {规模: 文件}"""
+    directory.mkdir(parents=True, exist_ok=True)
+    files = {}
+    for size in sizes:
+        path = directory / f"novel_{size}.html"
+        path.write_text(build_fixture(size), encoding='utf-8')
+        files[size] = path
+    return files
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """样本服务：声明utf-8编码，不输出访问日志"""
+
+    extensions_map = {".html": "text/html; charset=utf-8"}
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: Path) -> Iterator[str]:
+    """在后台线程中提供本地HTTP服务，产出服务地址"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_FixtureHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def measure(func: Callable, min_time: float, min_runs: int, max_runs: int) -> Dict:
+    """重复调用直到累计耗时达到min_time（至少min_runs次），另外单独调用一次测量内存峰值
+
+    计时和内存分开测量，tracemalloc的开销不计入耗时。
+    """
+    func()  # 预热（导入、编译模板、建立连接等）
+    gc.collect()
+
+    times = []
+    while len(times) < max_runs and (len(times) < min_runs or sum(times) < min_time):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times.sort()
+    total = sum(times)
+    return {
+        "runs": len(times),
+        "ops_per_sec": round(len(times) / total, 3) if total > 0 else None,
+        "mean_ms": round(total / len(times) * 1000, 3),
+        "median_ms": round(times[len(times) // 2] * 1000, 3),
+        "min_ms": round(times[0] * 1000, 3),
+        "peak_memory_bytes": peak
+    }
+
+
+class PipelineBenchmark:
+    """按阶段测量分析与创作流水线
+
+    每个阶段的输入由上一阶段预先算好，只计时本阶段本身：
+    抓取不经过原始页面存储，创作不使用章节缓存，创作和保存的输出不写到终端。
+    """
+
+    def __init__(self, config: Dict, work_dir: Path, output_format: str = "json",
+                 min_time: float = 0.5, min_runs: int = 3, max_runs: int = 1000):
+        self.config = config
+        self.work_dir = Path(work_dir)
+        self.output_format = output_format
+        self.min_time = min_time
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.analyzer = NovelAnalyzer(config)
+
+    def run(self, fixtures: Dict[int, Path], base_url: Optional[str] = None,
+            stages: Optional[List[str]] = None) -> List[Dict]:
+        """测量每个规模下的各阶段；base_url为空时抓取阶段直接读文件"""
+        stages = stages or STAGES
+        results = []
+        for size, path in sorted(fixtures.items()):
+            url = f"{base_url}/{path.name}" if base_url else None
+            for stage, func, input_bytes in self._stages(size, path, url):
+                if stage not in stages:
+                    continue
+                print(f"  {stage} @ {size}章 ...", file=sys.stderr)
+                entry = {"stage": stage, "size": size, "input_bytes": input_bytes}
+                entry.update(measure(func, self.min_time, self.min_runs, self.max_runs))
+                results.append(entry)
+        return results
+
+    def _stages(self, size: int, path: Path, url: Optional[str]):
+        """依次产出 (阶段名, 被测函数, 输入字节数)，并准备下一阶段的输入"""
+        analyzer = self.analyzer
+        analyzer.config["analysis"]["max_chapters"] = size
+
+        if url:
+            fetch = partial(self._fetch, url)
+        else:
+            fetch = partial(path.read_text, encoding='utf-8')
+        content = fetch()
+        content_bytes = len(content.encode('utf-8'))
+        yield "fetch", fetch, content_bytes
+
+        yield "parse", partial(analyzer.parser.parse, content), content_bytes
+        document = analyzer.parser.parse(content)
+
+        yield "extract_chapters", partial(analyzer._extract_chapters, document, content), content_bytes
+        chapters = analyzer._extract_chapters(document, content)
+
+        yield "extract_characters", partial(analyzer._extract_characters, content, chapters), content_bytes
+        yield "analyze_writing_style", partial(analyzer._analyze_writing_style, content, chapters), content_bytes
+
+        analysis = {
+            "title": "基准样本小说",
+            "chapters": chapters,
+            "writing_style": analyzer._analyze_writing_style(content, chapters),
+            "main_characters": analyzer._extract_characters(content, chapters),
+            "plot_structure": analyzer._analyze_plot_structure(chapters)
+        }
+
+        # 创作章节数与参考小说章节数相同（大纲最多100章）
+        writing = self.config["writing"]
+        writing["min_chapters"] = writing["max_chapters"] = size
+        rng = RngContext(SEED)
+        framework = {"title": f"基准创作{size}", "genre": "玄幻", "main_plot": "少年修仙"}
+        protagonist = {"name": "林风", "age": 16, "personality": "坚韧", "background": "山村少年"}
+        supporting = CharacterGenerator(self.config, rng).generate_supporting_characters(
+            analysis, protagonist, framework)
+        writer = StoryWriter(self.config, rng)
+
+        outline_args = (analysis, framework, protagonist, supporting)
+        yield "outline", partial(writer.generate_outline, *outline_args), None
+        outline = writer.generate_outline(*outline_args)
+
+        write = partial(self._quiet, writer.write_chapters, outline, analysis, protagonist, supporting)
+        yield "write_chapters", write, None
+        story = {
+            "title": framework["title"],
+            "author": "基准样本",
+            "protagonist": protagonist,
+            "supporting_characters": supporting,
+            "story_outline": outline,
+            "metadata": {"original_novel": analysis["title"], "seed": SEED},
+        }
+        chapters_written = write()
+
+        output_file = self.work_dir / f"bench_{size}.{self.output_format}"
+        yield "save", partial(self._save, story, chapters_written, output_file), None
+
+    def _fetch(self, url: str) -> str:
+        response = self.analyzer.http.get(url)
+        if not response or response["text"] is None:
+            raise RuntimeError(f"获取样本失败: {url}")
+        return response["text"]
+
+    def _save(self, story: Dict, chapters: List[Dict], output_file: Path):
+        with create_sink(self.output_format, output_file) as sink:
+            sink.open(story)
+            sink.write_chapters(chapters)
+
+    @staticmethod
+    def _quiet(func: Callable, *args):
+        """调用时丢弃逐章进度输出"""
+        with redirect_stdout(io.StringIO()):
+            return func(*args)
+
+
+def benchmark_config(work_dir: Path, html_parser: str = "auto") -> Dict:
+    """基准测试用配置：默认配置，关闭缓存和抓取，缓存目录放在临时目录"""
+    config = NovelRewriter.load_config("")
+    config["analysis"]["html_parser"] = html_parser
+    config["cache"].update({"enabled": False, "cache_dir": str(work_dir / "cache")})
+    config["crawl"]["enabled"] = False
+    config["writing"].update({"seed": SEED, "workers": 1})
+    config["output"]["search_index"] = False
+    return config
+
+
+def environment() -> Dict:
+    """运行环境信息，比较不同机器的结果时参考"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """与基线比较同一阶段、同一规模的结果，返回每项的变化及是否退化
+
+    每秒次数下降或内存峰值上升超过threshold（比例）即视为退化。
+    """
+    if baseline.get("schema") != current.get("schema"):
+        raise ValueError(f"结果格式版本不同: {baseline.get('schema')} != {current.get('schema')}")
+
+    previous = {(entry["stage"], entry["size"]): entry for entry in baseline["results"]}
+    changes = []
+    for entry in current["results"]:
+        before = previous.get((entry["stage"], entry["size"]))
+        if before is None or not before.get("ops_per_sec") or not entry.get("ops_per_sec"):
+            continue
+        speed = entry["ops_per_sec"] / before["ops_per_sec"]
+        memory = (entry["peak_memory_bytes"] / before["peak_memory_bytes"]
+                  if before["peak_memory_bytes"] else 1.0)
+        changes.append({
+            "stage": entry["stage"],
+            "size": entry["size"],
+            "speed_ratio": round(speed, 3),
+            "memory_ratio": round(memory, 3),
+            "regression": speed < 1 - threshold or memory > 1 + threshold
+        })
+    return changes
+
+
+def print_table(results: List[Dict], changes: Optional[List[Dict]] = None):
+    """输出可读的结果表（标准错误）"""
+    ratios = {(change["stage"], change["size"]): change for change in changes or []}
+    print(f"{'stage':<24}{'size':>6}{'ops/sec':>12}{'median ms':>12}{'peak KB':>12}", file=sys.stderr)
+    for entry in results:
+        line = (f"{entry['stage']:<24}{entry['size']:>6}{entry['ops_per_sec'] or 0:>12.1f}"
+                f"{entry['median_ms']:>12.3f}{entry['peak_memory_bytes'] / 1024:>12.1f}")
+        change = ratios.get((entry["stage"], entry["size"]))
+        if change:
+            line += f"  速度x{change['speed_ratio']:.2f} 内存x{change['memory_ratio']:.2f}"
+            if change["regression"]:
+                line += "  ⚠️ 退化"
+        print(line, file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="小说仿写流水线性能基准")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                       help="输入规模（参考小说章节数，逗号分隔）")
+    parser.add_argument("--stages", default=",".join(STAGES), help="要测量的阶段（逗号分隔）")
+    parser.add_argument("--fixtures", help="样本目录（默认生成到临时目录；已有的novel_<规模>.html直接使用）")
+    parser.add_argument("--no-server", action="store_true", help="抓取阶段直接读文件，不启动本地HTTP服务")
+    parser.add_argument("--parser", default="auto", choices=["auto", "lxml", "html.parser"], help="HTML解析后端")
+    parser.add_argument("--format", "-f", default="json", choices=list(SINKS), help="保存阶段的输出格式")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每项累计计时下限（秒）")
+    parser.add_argument("--min-runs", type=int, default=3, help="每项最少运行次数")
+    parser.add_argument("--max-runs", type=int, default=1000, help="每项最多运行次数")
+    parser.add_argument("--output", "-o", help="结果JSON文件（默认输出到标准输出）")
+    parser.add_argument("--compare", help="与之前的结果JSON比较")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                       help="退化阈值（比例，默认0.1即变慢或内存增加超过10%%）")
+
+    args = parser.parse_args(argv)
+
+    sizes = sorted({int(size) for size in args.sizes.split(",") if size.strip()})
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}（可选: {', '.join(STAGES)}）")
+
+    with tempfile.TemporaryDirectory(prefix="novel_bench_") as temp:
+        work_dir = Path(temp)
+        fixture_dir = Path(args.fixtures) if args.fixtures else work_dir / "fixtures"
+        fixtures = {size: fixture_dir / f"novel_{size}.html" for size in sizes}
+        missing = [size for size, path in fixtures.items() if not path.exists()]
+        fixtures.update(write_fixtures(fixture_dir, missing))
+
+        config = benchmark_config(work_dir, args.parser)
+        with redirect_stdout(sys.stderr):
+            bench = PipelineBenchmark(config, work_dir, args.format,
+                                      args.min_time, args.min_runs, args.max_runs)
+            if args.no_server:
+                results = bench.run(fixtures, stages=stages)
+            else:
+                with serve_directory(fixture_dir) as base_url:
+                    results = bench.run(fixtures, base_url, stages)
+            bench.analyzer.http.close()
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "settings": {
+            "parser": bench.analyzer.parser.name,
+            "fetch": "file" if args.no_server else "http",
+            "output_format": args.format,
+            "chapter_length": config["writing"]["chapter_length"],
+            "seed": SEED,
+            "min_time": args.min_time,
+            "min_runs": args.min_runs
+        },
+        "results": results
+    }
+
+    changes = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ("parser", "fetch", "output_format", "chapter_length"):
+            if baseline.get("settings", {}).get(key) != report["settings"][key]:
+                print(f"警告: 基线的{key}设置不同（{baseline.get('settings', {}).get(key)}），比较结果仅供参考",
+                      file=sys.stderr)
+        changes = compare(baseline, report, args.threshold)
+        report["comparison"] = {"baseline": args.compare, "threshold": args.threshold, "changes": changes}
+
+    print_table(results, changes)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding='utf-8')
+        print(f"结果已保存: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if changes and any(change["regression"] for change in changes):
+        print(f"发现{sum(change['regression'] for change in changes)}项性能退化", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+缓存模块
+进程内LRU + 按字节数限制大小的磁盘缓存
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class LRUCache:
+    """进程内LRU缓存"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def get(self, key: str):
+        """读取并标记为最近使用"""
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def set(self, key: str, value) -> int:
+        """写入，返回淘汰的条目数"""
+        if self.max_entries <= 0:
+            return 0
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+        evicted = 0
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        """删除条目"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """清空"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """按字节数限制大小的磁盘缓存
+
+    每个条目一个紧凑JSON文件：{"meta": {...}, "data": {...}}。
+    文件mtime即写入/续期时间，用于TTL；访问顺序保存在内存索引中，用于LRU淘汰。
+    """
+
+    SUFFIX = ".cache.json"
+
+    def __init__(self, cache_dir: Path, max_size: int = 1000000, ttl: int = 86400):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+
+        # key -> (字节数, mtime)，按访问先后排序
+        self._index = None
+        self._total_size = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.SUFFIX}"
+
+    def _load_index(self):
+        """首次使用时扫描缓存目录"""
+        if self._index is not None:
+            return
+
+        entries = []
+        for path in self.cache_dir.glob(f"*{self.SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            key = path.name[:-len(self.SUFFIX)]
+            entries.append((stat.st_mtime, key, stat.st_size))
+
+        # 启动时以mtime近似访问顺序
+        entries.sort()
+        self._index = OrderedDict((key, (size, mtime)) for mtime, key, size in entries)
+        self._total_size = sum(size for size, _ in self._index.values())
+
+    def stored_at(self, key: str) -> float:
+        """条目写入/续期时间"""
+        self._load_index()
+        return self._index[key][1] if key in self._index else 0.0
+
+    def is_expired(self, key: str) -> bool:
+        """条目是否已超过TTL"""
+        self._load_index()
+        if key not in self._index:
+            return True
+        return time.time() - self._index[key][1] >= self.ttl
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[Dict]:
+        """读取条目，返回 {"meta", "data"}"""
+        self._load_index()
+        if key not in self._index:
+            return None
+        if not ignore_ttl and self.is_expired(key):
+            return None
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+
+        self._index.move_to_end(key)
+        return entry
+
+    def set(self, key: str, data: Dict, meta: Optional[Dict] = None):
+        """写入条目并按大小淘汰"""
+        self._load_index()
+        payload = json.dumps({"meta": meta or {}, "data": data},
+                             ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        # 单条超过上限时不缓存
+        if len(payload) > self.max_size:
+            return
+
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        if key in self._index:
+            self._total_size -= self._index[key][0]
+        self._index[key] = (len(payload), time.time())
+        self._index.move_to_end(key)
+        self._total_size += len(payload)
+
+        self._enforce_size(keep=key)
+
+    def touch(self, key: str):
+        """刷新TTL"""
+        self._load_index()
+        if key not in self._index:
+            return
+        try:
+            self._path(key).touch()
+        except OSError:
+            return
+        size, _ = self._index[key]
+        self._index[key] = (size, time.time())
+        self._index.move_to_end(key)
+
+    def delete(self, key: str):
+        """删除条目"""
+        self._load_index()
+        self._remove(key)
+
+    def _remove(self, key: str):
+        if key in self._index:
+            self._total_size -= self._index.pop(key)[0]
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _enforce_size(self, keep: Optional[str] = None):
+        """超出max_size时先淘汰过期条目，再按LRU淘汰"""
+        if self._total_size <= self.max_size:
+            return
+
+        now = time.time()
+        expired = [key for key, (_, mtime) in self._index.items()
+                   if key != keep and now - mtime >= self.ttl]
+        for key in expired:
+            if self._total_size <= self.max_size:
+                return
+            self._remove(key)
+            self.evictions += 1
+
+        for key in list(self._index):
+            if self._total_size <= self.max_size:
+                return
+            if key == keep:
+                continue
+            self._remove(key)
+            self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """删除所有过期条目"""
+        self._load_index()
+        now = time.time()
+        expired = [key for key, (_, mtime) in self._index.items() if now - mtime >= self.ttl]
+        for key in expired:
+            self._remove(key)
+        self.evictions += len(expired)
+        return len(expired)
+
+    @property
+    def size(self) -> int:
+        """当前占用字节数"""
+        self._load_index()
+        return self._total_size
+
+    def __len__(self) -> int:
+        self._load_index()
+        return len(self._index)
+
+
+class TwoLevelCache:
+    """两级缓存：进程内LRU在前，磁盘缓存在后"""
+
+    def __init__(self, cache_config: Dict, cache_dir: Optional[Path] = None):
+        self.enabled = cache_config.get("enabled", True)
+        self.ttl = cache_config.get("ttl", 86400)
+        self.memory = LRUCache(cache_config.get("memory_entries", 128))
+        self.disk = DiskCache(
+            cache_dir or Path(cache_config.get("cache_dir", "cache")),
+            max_size=cache_config.get("max_size", 1000000),
+            ttl=self.ttl
+        )
+
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0}
+
+    def get(self, key: str, ignore_ttl: bool = False) -> Optional[Dict]:
+        """读取缓存数据"""
+        entry = self.get_entry(key, ignore_ttl)
+        return entry["data"] if entry else None
+
+    def get_meta(self, key: str) -> Optional[Dict]:
+        """读取条目元数据（不论是否过期）"""
+        entry = self.get_entry(key, ignore_ttl=True, count=False)
+        return entry["meta"] if entry else None
+
+    def get_entry(self, key: str, ignore_ttl: bool = False, count: bool = True) -> Optional[Dict]:
+        """读取完整条目 {"meta", "data"}"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            cached = self.memory.get(key)
+            if cached is not None:
+                entry, stored_at = cached
+                if ignore_ttl or time.time() - stored_at < self.ttl:
+                    if count:
+                        self._stats["memory_hits"] += 1
+                    return entry
+
+            entry = self.disk.get(key, ignore_ttl)
+            if entry is None:
+                if count:
+                    self._stats["misses"] += 1
+                return None
+
+            if count:
+                self._stats["disk_hits"] += 1
+            self._remember(key, entry, self.disk.stored_at(key))
+            return entry
+
+    def set(self, key: str, data: Dict, meta: Optional[Dict] = None):
+        """写入两级缓存"""
+        if not self.enabled:
+            return
+
+        entry = {"meta": meta or {}, "data": data}
+        with self._lock:
+            try:
+                self.disk.set(key, data, meta)
+            except OSError as e:
+                print(f"写入缓存失败: {e}")
+            self._remember(key, entry, time.time())
+
+    def touch(self, key: str):
+        """刷新TTL"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.disk.touch(key)
+            cached = self.memory.get(key)
+            if cached is not None:
+                self.memory.set(key, (cached[0], time.time()))
+
+    def delete(self, key: str):
+        """删除条目"""
+        with self._lock:
+            self.memory.delete(key)
+            self.disk.delete(key)
+
+    def _remember(self, key: str, entry: Dict, stored_at: float):
+        self._stats["memory_evictions"] += self.memory.set(key, (entry, stored_at))
+
+    def stats(self) -> Dict:
+        """命中/未命中/淘汰统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["disk_evictions"] = self.disk.evictions
+            stats["memory_entries"] = len(self.memory)
+            stats["disk_entries"] = len(self.disk)
+            stats["disk_bytes"] = self.disk.size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
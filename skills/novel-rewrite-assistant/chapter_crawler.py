@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+章节抓取模块
+并发下载章节正文，共享长连接会话并按站点限制并发
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+from html_parser import IGNORED_TAGS, create_backend
+
+
+class ChapterCrawler:
+    """章节并发抓取器"""
+
+    # 需要重试的HTTP状态码
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    # 常见的正文容器
+    CONTENT_SELECTORS = [
+        '#content', '#chaptercontent', '#chapter-content', '.read-content',
+        '.chapter-content', '.content', 'article'
+    ]
+
+    def __init__(self, config: Dict, headers: Dict, session: Optional[requests.Session] = None,
+                 page_store=None, parser=None):
+        crawl_config = config.get("crawl", {})
+        self.timeout = config.get("analysis", {}).get("timeout", 30)
+        self.max_workers = max(1, crawl_config.get("max_workers", 8))
+        self.per_host_limit = max(1, crawl_config.get("per_host_limit", 4))
+        self.max_retries = crawl_config.get("max_retries", 3)
+        self.backoff = crawl_config.get("backoff", 0.5)
+
+        self.session = session or self._create_session(headers)
+
+        # 原始网页存储（可选），已存储的章节不再下载
+        self.page_store = page_store
+        
+        # HTML解析后端（可与分析器共享）
+        self.parser = parser or create_backend(config.get("analysis", {}).get("html_parser", "auto"))
+        self.content_selectors = self.parser.compile(self.CONTENT_SELECTORS)
+
+        # 每个站点一个信号量
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    def _create_session(self, headers: Dict) -> requests.Session:
+        """创建长连接会话"""
+        session = requests.Session()
+        session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取站点并发槽位"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def fetch_chapters(self, chapters: List[Dict], base_url: str) -> List[Optional[str]]:
+        """并发抓取章节正文，按章节顺序返回（失败为None）"""
+        return [text for _, text in self.iter_chapters(chapters, base_url)]
+
+    def iter_chapters(self, chapters: List[Dict], base_url: str) -> Iterator[Tuple[Dict, Optional[str]]]:
+        """并发抓取章节正文，按章节顺序逐章产出 (章节, 正文)
+
+        同时在途的请求不超过 2 * max_workers，消费方处理完一章后才继续提交，
+        已产出的正文不会被保留。
+        """
+        urls = [urljoin(base_url, chapter["url"]) if chapter.get("url") else "" for chapter in chapters]
+        if not any(urls):
+            for chapter in chapters:
+                yield chapter, None
+            return
+
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            pending = deque()
+            for chapter, url in zip(chapters, urls):
+                pending.append((chapter, executor.submit(self.fetch_chapter_text, url)))
+                if len(pending) >= window:
+                    chapter_done, future = pending.popleft()
+                    yield chapter_done, future.result()
+            while pending:
+                chapter_done, future = pending.popleft()
+                yield chapter_done, future.result()
+
+    def fetch_chapter_text(self, url: str) -> Optional[str]:
+        """抓取单章并提取正文"""
+        if not url:
+            return None
+
+        html = None
+        if self.page_store is not None:
+            record = self.page_store.latest(url)
+            if record:
+                html = self.page_store.load(record)
+
+        if html is None:
+            html = self._fetch_with_retry(url)
+            if html is None:
+                return None
+            if self.page_store is not None:
+                self.page_store.put(url, html, kind="chapter")
+
+        return self.extract_text(html)
+
+    def _fetch_with_retry(self, url: str) -> Optional[str]:
+        """带重试和退避的请求"""
+        slot = self._host_slot(url)
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                with slot:
+                    response = self.session.get(url, timeout=self.timeout)
+
+                if response.status_code not in self.RETRY_STATUS:
+                    response.raise_for_status()
+                    if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+                        response.encoding = response.apparent_encoding or 'utf-8'
+                    return response.text
+
+                retry_after = response.headers.get('Retry-After')
+            except requests.HTTPError as e:
+                print(f"抓取章节失败: {url} ({e})")
+                return None
+            except requests.RequestException as e:
+                if attempt >= self.max_retries:
+                    print(f"抓取章节失败: {url} ({e})")
+                    return None
+
+            if attempt < self.max_retries:
+                time.sleep(self._backoff_delay(attempt, retry_after))
+
+        print(f"抓取章节失败: {url} (重试{self.max_retries}次)")
+        return None
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """计算退避时间"""
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+
+        # 指数退避加随机抖动
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def extract_text(self, html: str) -> str:
+        """提取章节正文"""
+        document = self.parser.parse(html)
+        document.remove(IGNORED_TAGS)
+
+        text = document.block_text(self.content_selectors)
+        if text is None:
+            text = document.body_text()
+        return self._normalize_text(text)
+
+    def _normalize_text(self, text: str) -> str:
+        """整理正文空白"""
+        lines = [line.strip() for line in text.splitlines()]
+        return '\n'.join(line for line in lines if line)
+
+    def close(self):
+        """关闭会话"""
+        self.session.close()
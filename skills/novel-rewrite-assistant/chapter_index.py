@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+章节索引模块
+用一个由前缀树编译的正则对章节正文做一次扫描，同时得到句子位置、事件关键词命中、
+角色出现位置和字数；导出、摘要、检索等后续环节直接读索引，不再重复扫描正文
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Pattern, Tuple
+
+from text_automaton import Trie
+
+
+# 事件关键词：包含这些词的句子视为关键事件
+EVENT_KEYWORDS = ["遇到", "发现", "遭遇", "获得", "面对", "挑战", "经历", "陷入"]
+
+# 句子结束符（与 re.split(r'[。！？!?]') 的切分一致）
+SENTENCE_END = "[。！？!?]"
+
+
+@lru_cache(maxsize=1024)
+def _compile(events: Tuple[str, ...], names: Tuple[str, ...]) -> Pattern:
+    """编译扫描用的正则
+
+    句子结束符直接匹配；事件词和人名放在前瞻中，只记录位置不消耗字符，
+    人名和紧随其后的事件词（如"张遇"+"遇到"）不会互相遮挡，同一位置两者都会记录。
+    开头先用所有词的首字过滤，其余位置不再逐个尝试各分支。
+    """
+    event = Trie(events).pattern()
+    name = Trie(names).pattern()
+    first_chars = "".join(re.escape(char) for char in sorted({word[0] for word in events + names if word}))
+    return re.compile(f"(?=[。！？!?{first_chars}])"
+                      f"(?:(?P<end>{SENTENCE_END})|(?=(?P<event>{event})|{name})(?=(?P<name>{name}))?)")
+
+
+class ChapterIndexer:
+    """章节索引器
+
+    index(content, names) 返回：
+        word_count: 字数
+        sentences:  每句的 [起始, 结束) 位置（不含句末标点）
+        events:     事件命中 [句子序号, 关键词]，按出现顺序
+        mentions:   {人名: [出现位置, ...]}
+    """
+
+    def __init__(self, event_keywords: Iterable[str] = EVENT_KEYWORDS):
+        self.event_keywords = tuple(dict.fromkeys(event_keywords))
+
+    def index(self, content: str, names: Iterable[str] = ()) -> Dict:
+        """扫描一遍正文生成索引"""
+        names = tuple(dict.fromkeys(name for name in names if name))
+        pattern = _compile(self.event_keywords, names)
+
+        sentences = []
+        events = []
+        mentions = {name: [] for name in names}
+        start = 0
+        for match in pattern.finditer(content):
+            group = match.lastgroup
+            if group == "end":
+                end = match.start()
+                sentences.append([start, end])
+                start = end + 1
+                continue
+            if group == "name":
+                mentions[match["name"]].append(match.start())
+            event = match["event"]
+            if event:
+                events.append([len(sentences), event])
+        sentences.append([start, len(content)])
+
+        return {
+            "word_count": len(content),
+            "sentences": sentences,
+            "events": events,
+            "mentions": mentions
+        }
+
+
+def sentence_text(content: str, index: Dict, number: int) -> str:
+    """索引中第number句的文字（去掉首尾空白）"""
+    start, end = index["sentences"][number]
+    return content[start:end].strip()
+
+
+def key_events(content: str, index: Dict, limit: int = 3) -> List[str]:
+    """包含事件关键词的句子，按出现顺序最多取limit句"""
+    events = []
+    for number in dict.fromkeys(number for number, _ in index["events"]):
+        if len(events) >= limit:
+            break
+        events.append(sentence_text(content, index, number))
+    return events
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+章节缓存模块
+按章节实际依赖的输入计算指纹，输入不变的章节直接复用，不再重新生成
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from cache import TwoLevelCache
+
+
+class ChapterStore:
+    """生成章节的内容寻址缓存
+
+    键为输入指纹（章节号、种子、本章情节点、主角、本章出场角色、风格等的哈希），
+    值只包含由输入决定的字段（正文、字数、关键事件），章节号和标题在取出时补上。
+    """
+
+    # 章节生成结果不会过期，只按大小淘汰
+    TTL = 10 * 365 * 86400
+
+    def __init__(self, cache_dir: Path, max_size: int = 20000000,
+                 memory_entries: int = 256, enabled: bool = True):
+        self.cache = TwoLevelCache({
+            "enabled": enabled,
+            "ttl": self.TTL,
+            "max_size": max_size,
+            "memory_entries": memory_entries
+        }, Path(cache_dir))
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "ChapterStore":
+        """按配置创建（cache.cache_dir/chapters）"""
+        cache_config = config.get("cache", {})
+        return cls(
+            Path(cache_config.get("cache_dir", "cache")) / "chapters",
+            max_size=cache_config.get("chapter_max_size", 20000000),
+            memory_entries=cache_config.get("memory_entries", 128),
+            enabled=cache_config.get("enabled", True)
+        )
+
+    @staticmethod
+    def fingerprint(inputs: Dict) -> str:
+        """计算输入指纹（键排序后的JSON的sha256）"""
+        payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取已生成的章节字段"""
+        return self.cache.get(key, ignore_ttl=True)
+
+    def put(self, key: str, chapter: Dict):
+        """保存章节字段"""
+        self.cache.set(key, chapter)
+
+    def stats(self) -> Dict:
+        """缓存命中统计"""
+        return self.cache.stats()
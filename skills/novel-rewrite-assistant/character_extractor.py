@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+角色名提取模块
+用姓氏前缀树编译出的自动机一次扫描全文，统计所有候选人名的出现次数；
+再用人名出现位置索引和预编译的身份关键词判断角色身份
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from text_automaton import Trie
+
+
+# 单字姓氏（百家姓）
+SURNAMES = (
+    '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜戚谢邹喻柏水窦章云苏潘葛奚范彭郎鲁韦'
+    '昌马苗凤花方俞任袁柳酆鲍史唐费廉岑薛雷贺倪汤滕殷罗毕郝邬安常乐于时傅皮卞齐康伍余元卜顾孟平黄和穆萧尹'
+    '姚邵湛汪祁毛禹狄米贝明臧计伏成戴谈宋茅庞熊纪舒屈项祝董梁杜阮蓝闵席季麻强贾路娄危江童颜郭梅盛林刁钟徐'
+    '邱骆高夏蔡田樊胡凌霍虞万支柯昝管卢莫经房裘缪干解应宗丁宣贲邓郁单杭洪包诸左石崔吉钮龚程嵇邢滑裴陆荣翁'
+    '荀羊於惠甄曲家封芮羿储靳汲邴糜松井段富巫乌焦巴弓牧隗山谷车侯宓蓬全郗班仰秋仲伊宫宁仇栾暴甘钭厉戎祖武'
+    '符刘景詹束龙叶幸司韶郜黎蓟薄印宿白怀蒲邰从鄂索咸籍赖卓蔺屠蒙池乔阴鬱胥能苍双闻莘党翟谭贡劳逄姬申扶堵'
+    '冉宰郦雍卻璩桑桂濮牛寿通边扈燕冀郏浦尚农温别庄晏柴瞿阎充慕连茹习宦艾鱼容向古易慎戈廖庾终暨居衡步都耿'
+    '满弘匡国文寇广禄阙东欧殳沃利蔚越夔隆师巩厍聂晁勾敖融冷訾辛阚那简饶空曾毋沙乜养鞠须丰巢关蒯相查后荆红'
+    '游竺权逯盖益桓公'
+)
+
+# 复姓
+COMPOUND_SURNAMES = [
+    '欧阳', '司马', '上官', '诸葛', '东方', '独孤', '南宫', '慕容', '令狐', '皇甫',
+    '公孙', '长孙', '宇文', '司徒', '夏侯', '轩辕', '端木', '西门', '百里', '尉迟'
+]
+
+
+# 角色身份关键词（按优先级排列，同时命中时取靠前的身份）
+ROLE_KEYWORDS = {
+    "主角": ["主角", "主人公", "主要人物", "英雄", "侠客", "少年", "少女"],
+    "反派": ["反派", "恶人", "敌人", "对手", "魔王", "妖怪", "恶霸"],
+    "导师": ["师父", "师傅", "老师", "导师", "前辈", "长老", "仙人"],
+    "伙伴": ["朋友", "伙伴", "兄弟", "姐妹", "同伴", "队友", "同盟"],
+    "恋人": ["爱人", "恋人", "情侣", "夫妻", "娘子", "相公", "心上人"],
+    "配角": ["配角", "次要人物", "路人", "群众", "村民", "士兵", "仆人"]
+}
+
+ROLE_NAMES = list(ROLE_KEYWORDS)
+
+# 所有身份关键词合成一个正则，分组名 r0, r1... 对应 ROLE_NAMES 的下标
+ROLE_PATTERN = re.compile('|'.join(
+    f"(?P<r{rank}>{Trie(ROLE_KEYWORDS[role]).pattern()})" for rank, role in enumerate(ROLE_NAMES)
+))
+
+
+class CharacterExtractor:
+    """候选人名统计引擎
+
+    姓氏前缀树编译成正则自动机后做两次C层线性扫描：
+    - 发现：非重叠贪婪匹配“姓+1~2字”，与原先的正则提取结果一致；
+    - 计数：前瞻匹配每个姓氏出现的位置，得到所有“姓+1字”“姓+2字”的出现次数，
+      等价于对每个候选调用 content.count(name)，但不再随候选数量线性放大。
+    """
+
+    def __init__(self, surnames: Optional[Iterable[str]] = None,
+                 compound_surnames: Optional[Iterable[str]] = None):
+        trie = Trie(surnames if surnames is not None else SURNAMES)
+        for surname in (compound_surnames if compound_surnames is not None else COMPOUND_SURNAMES):
+            trie.add(surname)
+        surname_pattern = trie.pattern()
+        self.candidate_pattern = re.compile(f'(?:{surname_pattern})[\u4e00-\u9fa5]{{1,2}}')
+        self.count_pattern = re.compile(f'(?=({surname_pattern})([\u4e00-\u9fa5]{{1,2}}))')
+
+    def scan(self, text: str, counter: Optional[Counter] = None,
+             candidates: Optional[set] = None) -> Tuple[Counter, set]:
+        """扫描文本，返回 (出现次数计数器, 候选人名集合)，可累加到已有结果上"""
+        if counter is None:
+            counter = Counter()
+        if candidates is None:
+            candidates = set()
+
+        candidates.update(self.candidate_pattern.findall(text))
+
+        # 先按 (姓, 名) 聚合，再展开成两字/三字计数，循环次数只与不同组合数相关
+        pairs = Counter(self.count_pattern.findall(text))
+        for (surname, given), count in pairs.items():
+            counter[surname + given[0]] += count
+            if len(given) == 2:
+                counter[surname + given] += count
+
+        return counter, candidates
+
+    def top_names(self, counter: Counter, candidates: set, limit: int = 10,
+                  min_frequency: int = 3) -> List[Tuple[str, int]]:
+        """按出现次数取前若干个候选"""
+        names = []
+        for name in candidates:
+            freq = counter.get(name, 0)
+            if freq >= min_frequency and 2 <= len(name) <= 4:
+                names.append((name, freq))
+        names.sort(key=lambda item: (-item[1], item[0]))
+        return names[:limit]
+
+    def extract(self, text: str, limit: int = 10, min_frequency: int = 3) -> List[Tuple[str, int]]:
+        """一次性提取文本中的主要人名"""
+        counter, candidates = self.scan(text)
+        return self.top_names(counter, candidates, limit, min_frequency)
+
+
+class MentionIndex:
+    """人名出现位置索引
+
+    一次扫描记录每个人名的所有出现位置，之后按位置直接切出上下文窗口，
+    不必为每个名字重新编译正则、重新扫描全文。
+    """
+
+    def __init__(self, text: str, names: Iterable[str]):
+        self.text = text
+        self.offsets = {name: [] for name in names}
+        if not self.offsets:
+            return
+
+        # 前瞻匹配每个位置，同一位置取最长的名字，较短的前缀名字也记一次出现
+        pattern = re.compile(f'(?=({Trie(self.offsets).pattern()}))')
+        for match in pattern.finditer(text):
+            found = match.group(1)
+            start = match.start()
+            for length in range(2, len(found) + 1):
+                prefix = found[:length]
+                if prefix in self.offsets:
+                    self.offsets[prefix].append(start)
+
+    def mentions(self, name: str) -> List[int]:
+        """人名出现的起始位置"""
+        return self.offsets.get(name, [])
+
+    def context_spans(self, name: str, window: int = 50) -> Iterator[Tuple[int, int]]:
+        """人名前后各window个字符的上下文范围（不跨行）"""
+        text = self.text
+        for start in self.mentions(name):
+            end = start + len(name)
+            left = max(0, start - window)
+            newline = text.rfind('\n', left, start)
+            if newline != -1:
+                left = newline + 1
+            right = min(len(text), end + window)
+            newline = text.find('\n', end, right)
+            if newline != -1:
+                right = newline
+            yield left, right
+
+    def contexts(self, name: str, window: int = 50) -> Iterator[str]:
+        """人名的上下文文本"""
+        for left, right in self.context_spans(name, window):
+            yield self.text[left:right]
+
+
+class RoleClassifier:
+    """根据人名上下文中的身份关键词判断角色身份"""
+
+    def __init__(self, window: int = 50):
+        self.window = window
+
+    def keyword_hits(self, text: str) -> Tuple[List[int], List[int], List[int]]:
+        """一次扫描找出全部身份关键词，返回 (起点列表, 终点列表, 身份下标列表)"""
+        starts, ends, ranks = [], [], []
+        for match in ROLE_PATTERN.finditer(text):
+            starts.append(match.start())
+            ends.append(match.end())
+            ranks.append(int(match.lastgroup[1:]))
+        return starts, ends, ranks
+
+    def best_rank(self, index: MentionIndex, name: str, hits: Tuple[List[int], List[int], List[int]]) -> Optional[int]:
+        """人名所有上下文中命中的最高优先级身份下标"""
+        starts, ends, ranks = hits
+        best = None
+        for left, right in index.context_spans(name, self.window):
+            position = bisect_left(starts, left)
+            while position < len(starts) and starts[position] < right:
+                if ends[position] <= right and (best is None or ranks[position] < best):
+                    best = ranks[position]
+                    if best == 0:
+                        return best
+                position += 1
+        return best
+
+    def classify(self, text: str, names: Iterable[str]) -> Dict[str, str]:
+        """判断每个人名的身份，未命中关键词的为“未知”"""
+        names = list(names)
+        index = MentionIndex(text, names)
+        hits = self.keyword_hits(text)
+
+        roles = {}
+        for name in names:
+            rank = self.best_rank(index, name, hits)
+            roles[name] = ROLE_NAMES[rank] if rank is not None else "未知"
+        return roles
@@ -4,20 +4,38 @@
 自动生成配角名字和角色关系
 """
 
-import json
 import random
-from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import re
 
+from rng import RngContext
+from name_sampler import NamePattern, NameSampler, NameSpaceExhausted
+from name_store import NameStore
+from name_registry import NameRegistry
+from attribute_tables import attribute_table
+from relationship_graph import RelationshipGraph
+
+
+# 配角之间的关系规则：(本人类型关键字, 对象类型关键字, 关系类型, 关系描述)
+CHARACTER_LINK_RULES = [
+    (("师兄", "师姐", "师弟", "师妹", "弟子"), ("师父", "长老", "掌门"), "师徒", "{partner}的弟子"),
+    (("师弟", "师妹"), ("师兄", "师姐"), "同门", "{partner}的同门"),
+    (("对手", "魔头", "妖王", "手下"), ("反派",), "勾结", "{partner}的帮凶"),
+    (("情敌", "前任"), ("恋人",), "情敌", "与{partner}争夺感情"),
+    (("闺蜜",), ("恋人",), "闺蜜", "{partner}的闺蜜"),
+    (("伙伴", "盟友"), ("朋友", "伙伴", "盟友"), "同伴", "与{partner}并肩作战"),
+    (("家人",), ("家人",), "亲属", "{partner}的亲人")
+]
+
 
 class CharacterGenerator:
     """角色生成器"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, rng: Optional[RngContext] = None):
         self.config = config
-        self.name_db_path = Path(config["generation"].get("name_database", "name_database"))
-        self.name_db = self._load_name_database()
+        
+        # 随机数上下文（每个角色、每条关系使用独立的随机数流）
+        self.rng = rng or RngContext.from_config(config)
         
         # 常见姓氏
         self.common_surnames = [
@@ -59,25 +77,18 @@ class CharacterGenerator:
             '紫', '金', '银', '墨', '夜', '星', '月', '日', '辰', '曦',
             '风', '云', '雷', '电', '雨', '雪', '霜', '雾', '露', '虹'
         ]
-    
-    def _load_name_database(self) -> Dict:
-        """加载名字数据库"""
-        db_file = self.name_db_path / "names.json"
-        if db_file.exists():
-            try:
-                with open(db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                pass
         
-        # 返回空数据库
-        return {
-            "surnames": self.common_surnames,
-            "male_names": self.male_chars,
-            "female_names": self.female_chars,
-            "fantasy_names": self.fantasy_chars,
-            "generated_names": []
-        }
+        # 名字库（首次生成名字时才打开；没有时使用上面的默认字表）
+        self.name_store = NameStore.from_config(config)
+        
+        # 是否把生成的名字记入名字库，使名字跨运行、跨进程保持唯一
+        self.persist_names = config["generation"].get("persist_names", False)
+        
+        # 跨进程名字登记表（可选），同一世界观的并行创作互不重名
+        self.name_registry = NameRegistry.from_config(config)
+        
+        # 各名字结构的批量采样器（按需构建）
+        self._name_samplers = {}
     
     def generate_supporting_characters(self, 
                                      analysis_result: Dict,
@@ -90,30 +101,44 @@ class CharacterGenerator:
         # 确定需要生成的配角类型
         character_types = self._determine_character_types(genre, analysis_result)
         
-        # 生成配角
+        # 生成配角（记入名字库时，库中已有的名字也不再使用）
         supporting_chars = []
         used_names = {protagonist["name"]}
+        if self.persist_names:
+            used_names.update(self.name_store.used_names())
         
-        for char_type in character_types[:max_chars]:
+        for index, char_type in enumerate(character_types[:max_chars]):
+            rng = self.rng.stream("character", index, char_type)
+            table = attribute_table("full", genre, char_type)
+            
             # 生成名字
-            name = self._generate_name(char_type, genre, used_names)
+            try:
+                name = self._generate_name(char_type, genre, used_names, rng)
+            except NameSpaceExhausted as e:
+                print(f"警告: {e}，停止生成配角")
+                break
             used_names.add(name)
             
             # 生成角色信息
             character = {
                 "name": name,
                 "type": char_type,
-                "gender": self._determine_gender(char_type),
-                "age": self._generate_age(char_type),
-                "personality": self._generate_personality(char_type),
-                "background": self._generate_background(char_type, genre),
-                "relationship": self._generate_relationship(char_type, protagonist["name"]),
-                "role": self._get_role_description(char_type),
-                "appearance": self._generate_appearance(char_type, genre)
+                "gender": table.gender(rng),
+                "age": table.age(rng),
+                "personality": table.personality(rng),
+                "background": table.background(rng),
+                "relationship": table.relationship(protagonist["name"]),
+                "role": table.role,
+                "appearance": table.appearance(rng)
             }
             
             supporting_chars.append(character)
         
+        if self.persist_names:
+            style = self._name_style(genre)
+            for character in supporting_chars:
+                self.name_store.add_names([character["name"]], character["gender"], style, character["type"])
+        
         return supporting_chars
     
     def _determine_character_types(self, genre: str, analysis_result: Dict) -> List[str]:
@@ -144,228 +169,149 @@ class CharacterGenerator:
         if original_chars:
             # 提取原作的配角类型
             original_types = [char.get("role", "") for char in original_chars]
-            types = list(set(types + original_types))
+            # 去重并保持顺序（set的顺序随字符串哈希变化，无法复现）
+            types = list(dict.fromkeys(types + original_types))
         
         return types[:15]  # 限制类型数量
     
-    def _generate_name(self, char_type: str, genre: str, used_names: set) -> str:
+    def _generate_name(self, char_type: str, genre: str, used_names: set, rng: random.Random) -> str:
         """生成名字"""
-        max_attempts = 20
-        
-        for _ in range(max_attempts):
-            # 选择姓氏
-            surname = random.choice(self.common_surnames)
-            
-            # 根据角色类型和题材选择名字风格
-            if genre in ["玄幻", "仙侠", "武侠"]:
-                # 仙侠风格名字
-                if char_type in ["师父", "长老", "掌门", "仙人"]:
-                    # 长辈或高人：单字名
-                    given = random.choice(self.fantasy_chars)
-                    name = f"{surname}{given}"
-                else:
-                    # 普通角色：双字名
-                    given1 = random.choice(self.fantasy_chars)
-                    given2 = random.choice(self.male_chars + self.female_chars)
-                    name = f"{surname}{given1}{given2}"
-            else:
-                # 普通风格名字
-                gender = self._determine_gender(char_type)
-                if gender == "男":
-                    given_chars = self.male_chars
-                else:
-                    given_chars = self.female_chars
-                
-                # 随机选择1-2个字
-                given_length = random.choice([1, 2])
-                if given_length == 1:
-                    given = random.choice(given_chars)
-                    name = f"{surname}{given}"
-                else:
-                    given1 = random.choice(given_chars)
-                    given2 = random.choice(given_chars)
-                    name = f"{surname}{given1}{given2}"
-            
-            # 检查名字是否已使用
-            if name not in used_names:
-                return name
-        
-        # 如果所有尝试都失败，生成随机名字
-        return f"{random.choice(self.common_surnames)}某"
-    
-    def _determine_gender(self, char_type: str) -> str:
-        """确定角色性别"""
-        # 明显男性角色
-        male_types = ["师父", "师兄", "师弟", "长老", "掌门", "魔头",
-                     "妖王", "上司", "兄弟", "科学家", "军官", "指挥官"]
-        
-        # 明显女性角色
-        female_types = ["师姐", "师妹", "恋人", "情敌", "闺蜜", "前任"]
-        
-        if char_type in male_types:
-            return "男"
-        elif char_type in female_types:
-            return "女"
-        else:
-            # 随机选择
-            return random.choice(["男", "女"])
-    
-    def _generate_age(self, char_type: str) -> str:
-        """生成年龄"""
-        if char_type in ["师父", "长老", "掌门", "仙人", "长辈"]:
-            return random.choice(["50多岁", "60多岁", "70多岁", "百岁高龄"])
-        elif char_type in ["师兄", "师姐", "同事", "朋友"]:
-            return random.choice(["20多岁", "30多岁", "40多岁"])
-        elif char_type in ["师弟", "师妹", "学生", "晚辈"]:
-            return random.choice(["10多岁", "20岁左右", "20出头"])
+        # 普通风格名字按角色性别选字
+        if genre in ["玄幻", "仙侠", "武侠"]:
+            gender = None
         else:
-            return random.choice(["20多岁", "30多岁", "40多岁"])
+            gender = attribute_table("full", genre, char_type).gender(rng)
+        return self._claim_names(self._name_sampler(char_type, genre, gender), rng, 1, used_names)[0]
     
-    def _generate_personality(self, char_type: str) -> str:
-        """生成性格"""
-        personalities = {
-            "导师": ["严肃认真", "慈祥和蔼", "深藏不露", "严格苛刻", "智慧深邃"],
-            "伙伴": ["忠诚可靠", "幽默风趣", "冷静沉着", "热情开朗", "勇敢无畏"],
-            "恋人": ["温柔体贴", "坚强独立", "善解人意", "活泼可爱", "成熟稳重"],
-            "反派": ["阴险狡诈", "冷酷无情", "野心勃勃", "残忍暴戾", "工于心计"],
-            "盟友": ["正直守信", "精明能干", "豪爽大方", "谨慎小心", "果断坚决"],
-            "对手": ["骄傲自负", "顽强不屈", "机智过人", "冷酷傲慢", "执着坚定"],
-            "家人": ["慈爱关怀", "严格管教", "支持鼓励", "保护过度", "理解包容"],
-            "朋友": ["真诚友善", "乐于助人", "风趣幽默", "可靠信任", "共同成长"]
-        }
+    def generate_names(self, count: int,
+                       char_type: str = "路人",
+                       genre: str = "玄幻",
+                       used_names: Iterable[str] = (),
+                       rng: Optional[random.Random] = None,
+                       gender: Optional[str] = None) -> List[str]:
+        """一次生成count个互不重复的名字（用于大量路人、NPC）
         
-        # 查找匹配的性格
-        for key, traits in personalities.items():
-            if key in char_type:
-                return random.choice(traits)
-        
-        # 默认性格
-        default_traits = ["神秘莫测", "性格复杂", "多重性格", "难以捉摸", "普通平凡"]
-        return random.choice(default_traits)
-    
-    def _generate_background(self, char_type: str, genre: str) -> str:
-        """生成背景故事"""
-        backgrounds = {
-            "玄幻": {
-                "师父": ["隐世高人", "宗门长老", "散修强者", "转世仙人"],
-                "伙伴": ["同门师兄弟", "冒险途中结识", "救命恩人", "志同道合"],
-                "反派": ["魔道巨擘", "宗门叛徒", "妖族王者", "邪修高手"]
-            },
-            "都市": {
-                "上司": ["公司高管", "部门主管", "创业伙伴", "行业前辈"],
-                "同事": ["同期入职", "项目搭档", "竞争对手", "职场好友"],
-                "恋人": ["青梅竹马", "工作相识", "偶然邂逅", "朋友介绍"]
-            },
-            "言情": {
-                "恋人": ["校园初恋", "职场精英", "家族联姻", "意外相遇"],
-                "情敌": ["前任恋人", "暗恋对象", "商业对手", "家族世仇"],
-                "家人": ["严格父亲", "温柔母亲", "关心兄长", "调皮妹妹"]
-            }
-        }
+        开启 generation.persist_names 时跳过名字库中已有的名字，并把新名字记入名字库；
+        配置了 generation.name_registry 时名字在登记表中预留，其他进程不会再用到。
+        名字空间不够时抛出 NameSpaceExhausted。
+        """
+        if rng is None:
+            rng = self.rng.stream("names", char_type, genre, count)
         
-        # 根据题材和角色类型选择背景
-        if genre in backgrounds:
-            genre_bg = backgrounds[genre]
-            for key, bg_list in genre_bg.items():
-                if key in char_type:
-                    return random.choice(bg_list)
+        sampler = self._name_sampler(char_type, genre, gender)
+        used_names = set(used_names)
+        if self.persist_names:
+            used_names.update(self.name_store.used_names(lengths=sampler.lengths))
         
-        # 默认背景
-        default_bg = [
-            "来历神秘", "普通出身", "世家子弟", "寒门学子",
-            "江湖游侠", "职场精英", "学院天才", "平凡之人"
-        ]
-        return random.choice(default_bg)
+        names = self._claim_names(sampler, rng, count, used_names)
+        if self.persist_names:
+            self.name_store.add_names(names, gender, self._name_style(genre), char_type)
+        return names
     
-    def _generate_relationship(self, char_type: str, protagonist_name: str) -> str:
-        """生成与主角的关系"""
-        relationships = {
-            "师父": f"{protagonist_name}的授业恩师",
-            "师兄": f"{protagonist_name}的师兄，关系密切",
-            "师姐": f"{protagonist_name}的师姐，照顾有加",
-            "师弟": f"{protagonist_name}的师弟，尊敬师兄",
-            "师妹": f"{protagonist_name}的师妹，仰慕师兄",
-            "恋人": f"{protagonist_name}的爱人，感情深厚",
-            "朋友": f"{protagonist_name}的挚友，生死之交",
-            "反派": f"{protagonist_name}的主要对手，势不两立",
-            "家人": f"{protagonist_name}的亲人，血浓于水",
-            "盟友": f"{protagonist_name}的合作伙伴，利益一致"
-        }
+    def _claim_names(self, sampler: NameSampler, rng: random.Random, count: int,
+                     used_names: Iterable[str]) -> List[str]:
+        """抽取名字，配置了登记表时再原子地预留
         
-        # 查找匹配的关系
-        for key, relation in relationships.items():
-            if key in char_type:
-                return relation
+        登记表中的名字不预先载入：每个名字只做一次主键检查，被占用的名字排除后重新抽取。
+        """
+        names = sampler.sample(rng, count, used_names)
+        if self.name_registry is None:
+            return names
         
-        # 默认关系
-        return f"与{protagonist_name}有复杂关系"
+        claimed = self.name_registry.reserve(names)
+        try:
+            while len(claimed) < count:
+                # 部分名字已被预留，排除本轮抽到的名字后继续用同一随机数流补足，
+                # 登记表状态相同时结果相同
+                used_names = set(used_names) | set(names)
+                names = sampler.sample(rng, count - len(claimed), used_names)
+                claimed += self.name_registry.reserve(names)
+        except NameSpaceExhausted:
+            # 凑不够数量时不返回任何名字，已预留的释放，留给其他调用和进程
+            self.name_registry.release(claimed)
+            raise
+        return claimed
     
-    def _get_role_description(self, char_type: str) -> str:
-        """获取角色作用描述"""
-        roles = {
-            "导师": "引导主角成长，传授知识和技能",
-            "伙伴": "陪伴主角冒险，共同面对挑战",
-            "恋人": "与主角发展感情线，提供情感支持",
-            "反派": "制造冲突和障碍，推动剧情发展",
-            "盟友": "在关键时刻提供帮助和支持",
-            "对手": "与主角竞争，促使主角进步",
-            "家人": "提供家庭背景和情感纽带",
-            "朋友": "日常互动，丰富主角生活"
-        }
-        
-        for key, role in roles.items():
-            if key in char_type:
-                return role
-        
-        return "推动剧情发展的重要角色"
+    def _name_style(self, genre: str) -> str:
+        """名字风格"""
+        return "fantasy" if genre in ["玄幻", "仙侠", "武侠"] else "normal"
     
-    def _generate_appearance(self, char_type: str, genre: str) -> str:
-        """生成外貌描述"""
-        if genre in ["玄幻", "仙侠", "武侠"]:
-            appearances = {
-                "师父": ["仙风道骨", "白发苍苍", "目光如电", "气质超凡"],
-                "师兄": ["英俊潇洒", "气宇轩昂", "剑眉星目", "风度翩翩"],
-                "师姐": ["清丽脱俗", "貌美如花", "气质冷艳", "温婉动人"],
-                "反派": ["面目狰狞", "眼神阴冷", "气势逼人", "邪气凛然"]
-            }
-        elif genre in ["都市", "现代"]:
-            appearances = {
-                "上司": ["西装革履", "精明干练", "气场强大", "严肃认真"],
-                "同事": ["普通打扮", "亲切随和", "专业形象", "时尚潮流"],
-                "恋人": ["阳光帅气", "美丽动人", "气质独特", "引人注目"]
-            }
+    def _name_sampler(self, char_type: str, genre: str, gender: Optional[str]) -> NameSampler:
+        """按题材、角色类型和性别选择名字结构（同一结构的采样器只构建一次）"""
+        if self._name_style(genre) == "fantasy":
+            # 仙侠风格名字：长辈或高人单字名，普通角色双字名
+            key = ("fantasy", char_type in ["师父", "长老", "掌门", "仙人"])
         else:
-            appearances = {}
+            key = ("normal", gender)
         
-        # 查找匹配的外貌
-        for key, appear_list in appearances.items():
-            if key in char_type:
-                return random.choice(appear_list)
+        if key not in self._name_samplers:
+            # 优先使用名字库中的字表
+            surnames = self.name_store.chars("surname") or self.common_surnames
+            male_chars = self.name_store.chars("male") or self.male_chars
+            female_chars = self.name_store.chars("female") or self.female_chars
+            fantasy_chars = self.name_store.chars("fantasy") or self.fantasy_chars
+            
+            if key == ("fantasy", True):
+                patterns = [(1, NamePattern(surnames, fantasy_chars))]
+            elif key == ("fantasy", False):
+                patterns = [(1, NamePattern(surnames, fantasy_chars, male_chars + female_chars))]
+            else:
+                # 普通风格名字：单字名、双字名各占一半
+                if gender == "男":
+                    given_chars = male_chars
+                elif gender == "女":
+                    given_chars = female_chars
+                else:
+                    given_chars = male_chars + female_chars
+                patterns = [(1, NamePattern(surnames, given_chars)),
+                            (1, NamePattern(surnames, given_chars, given_chars))]
+            self._name_samplers[key] = NameSampler(patterns)
         
-        # 默认外貌
-        default_appear = [
-            "相貌普通", "长相清秀", "外貌出众", "气质独特",
-            "身材匀称", "眼神明亮", "笑容亲切", "姿态优雅"
-        ]
-        return random.choice(default_appear)
+        return self._name_samplers[key]
     
     def build_relationships(self, 
                           protagonist: Dict,
                           supporting_chars: List[Dict],
                           analysis_result: Dict) -> Dict:
         """构建角色关系网络"""
-        relationships = {
-            "protagonist": protagonist["name"],
-            "character_network": [],
-            "relationship_map": {}
-        }
+        return self.build_relationship_graph(protagonist, supporting_chars).to_dict(protagonist["name"])
+    
+    def build_relationship_graph(self, protagonist: Dict, supporting_chars: List[Dict]) -> RelationshipGraph:
+        """构建角色关系图：主角与每个配角，以及配角之间（generation.auto_relationships）"""
+        graph = RelationshipGraph.from_cast(protagonist, supporting_chars)
         
-        # 构建主角与其他角色的关系
-        for char in supporting_chars:
-            relation = {
-                "from": protagonist["name"],
-                "to": char["name"],
-                "type": char["relationship"],
-                "strength": random.choice(["强", "中", "弱"]),
-                "nature": random.choice(["正面", "负面", "复杂"])
-            }
+        # 主角与配角的关系强度和性质
+        for other in graph.neighbors(protagonist["name"]):
+            rng = self.rng.stream("relationship", protagonist["name"], other)
+            graph.relation(protagonist["name"], other).update({
+                "strength": rng.choice(["强", "中", "弱"]),
+                "nature": rng.choice(["正面", "负面", "复杂"])
+            })
+        
+        if self.config.get("generation", {}).get("auto_relationships", True):
+            self._link_characters(graph, supporting_chars)
+        
+        return graph
+    
+    def _link_characters(self, graph: RelationshipGraph, supporting_chars: List[Dict]):
+        """按类型规则建立配角之间的关系，每个配角每条规则至多一个对象"""
+        names = [char["name"] for char in supporting_chars]
+        types = {char["name"]: char["type"] for char in supporting_chars}
+        
+        for members, partners, kind, label in CHARACTER_LINK_RULES:
+            candidates = [name for name in names if any(key in types[name] for key in partners)]
+            if not candidates:
+                continue
+            for name in names:
+                if not any(key in types[name] for key in members):
+                    continue
+                choices = [other for other in candidates
+                           if other != name and not graph.has_relation(name, other)]
+                if not choices:
+                    continue
+                rng = self.rng.stream("link", kind, name)
+                partner = rng.choice(choices)
+                graph.add_relation(name, partner, kind,
+                                   type=label.format(partner=partner),
+                                   strength=rng.choice(["强", "中", "弱"]),
+                                   nature=rng.choice(["正面", "负面", "复杂"]))
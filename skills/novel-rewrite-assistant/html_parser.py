@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+HTML解析后端模块
+优先使用lxml（C实现），未安装时回退到BeautifulSoup的html.parser
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    lxml = None
+    CSSSelector = None
+
+from bs4 import BeautifulSoup
+import soupsieve
+
+
+# lxml无法解析的空白输入按此空文档处理
+EMPTY_DOCUMENT = b"<html><body></body></html>"
+
+# 正文提取时忽略的标签
+IGNORED_TAGS = ['script', 'style', 'noscript']
+
+
+class SelectorSet:
+    """预编译的选择器组
+
+    meta 选择器取 content 属性，其余取元素文本；按顺序返回第一个非空结果。
+    """
+
+    def __init__(self, selectors: List[str], compiled: List):
+        self.selectors = selectors
+        self.compiled = compiled
+        self.is_meta = [selector.startswith('meta') for selector in selectors]
+
+
+class SoupDocument:
+    """BeautifulSoup文档"""
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+
+    def first_text(self, selector_set: SelectorSet) -> Optional[str]:
+        for compiled, is_meta in zip(selector_set.compiled, selector_set.is_meta):
+            element = compiled.select_one(self.soup)
+            if element is None:
+                continue
+            value = element.get('content') if is_meta else element.text
+            if value and value.strip():
+                return value.strip()
+        return None
+
+    def iter_links(self) -> Iterator[Tuple[str, str]]:
+        for link in self.soup.find_all('a', href=True):
+            yield link.text.strip(), link['href']
+
+    def block_text(self, selector_set: SelectorSet) -> Optional[str]:
+        for compiled in selector_set.compiled:
+            element = compiled.select_one(self.soup)
+            if element is not None and element.get_text(strip=True):
+                return element.get_text('\n')
+        return None
+
+    def body_text(self) -> str:
+        return (self.soup.body or self.soup).get_text('\n')
+
+    def remove(self, tags: List[str]):
+        for tag in self.soup(tags):
+            tag.decompose()
+
+
+class LxmlDocument:
+    """lxml文档"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def first_text(self, selector_set: SelectorSet) -> Optional[str]:
+        for compiled, is_meta in zip(selector_set.compiled, selector_set.is_meta):
+            elements = compiled(self.root)
+            if not elements:
+                continue
+            element = elements[0]
+            value = element.get('content') if is_meta else element.text_content()
+            if value and value.strip():
+                return value.strip()
+        return None
+
+    def iter_links(self) -> Iterator[Tuple[str, str]]:
+        for link in self.root.iter('a'):
+            href = link.get('href')
+            if href is not None:
+                yield link.text_content().strip(), href
+
+    def block_text(self, selector_set: SelectorSet) -> Optional[str]:
+        for compiled in selector_set.compiled:
+            elements = compiled(self.root)
+            if elements:
+                text = '\n'.join(elements[0].itertext())
+                if text.strip():
+                    return text
+        return None
+
+    def body_text(self) -> str:
+        body = self.root.find('body')
+        return '\n'.join((body if body is not None else self.root).itertext())
+
+    def remove(self, tags: List[str]):
+        for element in list(self.root.iter(*tags)):
+            element.drop_tree()
+
+
+class SoupBackend:
+    """纯Python后端（BeautifulSoup + html.parser）"""
+
+    name = "html.parser"
+
+    def parse(self, html: str) -> SoupDocument:
+        return SoupDocument(BeautifulSoup(html, 'html.parser'))
+
+    def compile(self, selectors: List[str]) -> SelectorSet:
+        return SelectorSet(selectors, [soupsieve.compile(selector) for selector in selectors])
+
+
+class LxmlBackend:
+    """lxml后端"""
+
+    name = "lxml"
+
+    def __init__(self):
+        self._parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def parse(self, html: str) -> LxmlDocument:
+        # 以字节解析，避免带编码声明的字符串被lxml拒绝
+        try:
+            root = lxml.html.document_fromstring(html.encode('utf-8'), parser=self._parser)
+        except ParserError:
+            # 空白页面（如空的章节页）：与html.parser一样返回空文档，不中断分析
+            root = lxml.html.document_fromstring(EMPTY_DOCUMENT, parser=self._parser)
+        return LxmlDocument(root)
+
+    def compile(self, selectors: List[str]) -> SelectorSet:
+        return SelectorSet(selectors, [CSSSelector(selector) for selector in selectors])
+
+
+def lxml_available() -> bool:
+    """lxml和cssselect是否可用"""
+    return CSSSelector is not None
+
+
+def create_backend(name: str = "auto"):
+    """按名称创建解析后端：auto / lxml / html.parser"""
+    if name in ("auto", "lxml"):
+        if lxml_available():
+            return LxmlBackend()
+        if name == "lxml":
+            print("警告: 未安装lxml/cssselect，使用html.parser解析")
+    return SoupBackend()
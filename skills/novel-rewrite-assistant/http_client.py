@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+HTTP会话模块
+复用长连接，支持ETag/Last-Modified条件请求
+"""
+
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    """可复用的HTTP客户端"""
+
+    def __init__(self, config: Dict, headers: Dict):
+        self.timeout = config.get("analysis", {}).get("timeout", 30)
+        pool_size = max(1, config.get("crawl", {}).get("max_workers", 8))
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url: str, validators: Optional[Dict] = None) -> Optional[Dict]:
+        """获取页面，带上已有的验证信息时发起条件请求
+
+        返回 {"status", "text", "etag", "last_modified", "not_modified"}，失败返回None
+        """
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return {
+                    "status": 304,
+                    "text": None,
+                    "etag": response.headers.get('ETag') or (validators or {}).get("etag"),
+                    "last_modified": response.headers.get('Last-Modified') or (validators or {}).get("last_modified"),
+                    "not_modified": True
+                }
+
+            response.raise_for_status()
+            response.encoding = self._detect_encoding(response)
+            return {
+                "status": response.status_code,
+                "text": response.text,
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "not_modified": False
+            }
+        except Exception as e:
+            print(f"获取内容失败: {e}")
+            return None
+
+    def _detect_encoding(self, response) -> str:
+        """检测编码"""
+        # 尝试从headers中获取
+        if response.encoding:
+            return response.encoding
+
+        # 尝试从content中检测
+        try:
+            import chardet
+            encoding = chardet.detect(response.content)['encoding']
+            if encoding:
+                return encoding
+        except:
+            pass
+
+        # 默认使用utf-8
+        return 'utf-8'
+
+    def close(self):
+        """关闭会话"""
+        self.session.close()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+名字登记模块
+多个生成进程共用一个SQLite登记表，按"世界观"（同一系列作品）原子地预留名字，
+并行创作同一世界观的多部小说时不会出现重名
+"""
+
+import os
+import time
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    universe TEXT NOT NULL,
+    name TEXT NOT NULL,
+    owner TEXT,
+    reserved_at REAL NOT NULL,
+    PRIMARY KEY (universe, name)
+) WITHOUT ROWID;
+"""
+
+
+class NameRegistry:
+    """跨进程的名字预留表
+
+    (universe, name) 为主键，预留即 INSERT OR IGNORE，检查和预留都是一次主键查找。
+    预留在 BEGIN IMMEDIATE 事务中进行，同一时刻只有一个进程写入，
+    其他进程等待（最多timeout秒）后再继续。
+    """
+
+    def __init__(self, db_file: Path, universe: str = "default", timeout: float = 30):
+        self.db_file = Path(db_file)
+        self.universe = universe
+        self.timeout = timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["NameRegistry"]:
+        """按配置创建（generation.name_registry 未设置时返回None）"""
+        generation = config.get("generation", {})
+        db_file = generation.get("name_registry")
+        if not db_file:
+            return None
+        return cls(Path(db_file), generation.get("universe", "default"))
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """数据库连接（首次访问时打开）"""
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_file, timeout=self.timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def reserve(self, names: Iterable[str]) -> List[str]:
+        """原子地预留一批名字，返回预留成功的名字（已被预留的跳过）"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        now = time.time()
+        reserved = []
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name in names:
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO reservations (universe, name, owner, reserved_at) VALUES (?, ?, ?, ?)",
+                        (self.universe, name, self.owner, now)
+                    )
+                    if cursor.rowcount == 1:
+                        reserved.append(name)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return reserved
+
+    def release(self, names: Iterable[str]) -> int:
+        """释放名字，返回释放的数量"""
+        with self._lock:
+            cursor = self.conn.executemany(
+                "DELETE FROM reservations WHERE universe = ? AND name = ?",
+                [(self.universe, name) for name in names]
+            )
+        return cursor.rowcount
+
+    def is_reserved(self, name: str) -> bool:
+        """名字是否已被预留"""
+        row = self.conn.execute(
+            "SELECT 1 FROM reservations WHERE universe = ? AND name = ?", (self.universe, name)
+        ).fetchone()
+        return row is not None
+
+    def names(self) -> Set[str]:
+        """本世界观中已预留的全部名字"""
+        rows = self.conn.execute("SELECT name FROM reservations WHERE universe = ?", (self.universe,))
+        return {row[0] for row in rows}
+
+    def count(self) -> int:
+        """本世界观中已预留的名字数"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM reservations WHERE universe = ?", (self.universe,)
+        ).fetchone()[0]
+
+    def close(self):
+        """关闭数据库"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 连接不能传给其他进程，到达后重新打开
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+名字采样模块
+把名字空间看作混合进制数（姓氏 × 名字第1字 × 名字第2字 …），按编号无放回抽样，
+一次生成大量互不重复的名字，不再逐个生成、遇到重名再重试
+"""
+
+import random
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class NameSpaceExhausted(ValueError):
+    """名字空间中剩余的名字不够"""
+
+    def __init__(self, requested: int, available: int):
+        super().__init__(f"名字空间已用尽: 需要{requested}个，剩余{available}个")
+        self.requested = requested
+        self.available = available
+
+
+class NamePattern:
+    """一种名字结构，如 (姓氏, 男名用字, 男名用字)
+
+    编号 i 按混合进制拆成各位的下标：最后一位变化最快。
+    字表会去重，保证不同编号对应不同的名字。
+    """
+
+    def __init__(self, *components: Sequence[str]):
+        self.components: Tuple[Tuple[str, ...], ...] = tuple(
+            tuple(dict.fromkeys(component)) for component in components
+        )
+        self.positions: Tuple[Dict[str, int], ...] = tuple(
+            {char: i for i, char in enumerate(component)} for component in self.components
+        )
+        self.size = 1
+        for component in self.components:
+            self.size *= len(component)
+
+    def name_at(self, index: int) -> str:
+        """编号对应的名字"""
+        chars = []
+        for component in reversed(self.components):
+            index, digit = divmod(index, len(component))
+            chars.append(component[digit])
+        return "".join(reversed(chars))
+
+    def index_of(self, name: str) -> Optional[int]:
+        """名字对应的编号，不属于本结构时返回None"""
+        if len(name) != len(self.components):
+            return None
+        index = 0
+        for char, component, positions in zip(name, self.components, self.positions):
+            digit = positions.get(char)
+            if digit is None:
+                return None
+            index = index * len(component) + digit
+        return index
+
+    def sample(self, rng: random.Random, count: int, excluded: Iterable[int] = ()) -> List[str]:
+        """无放回抽取count个名字，跳过已排除的编号"""
+        excluded = sorted(set(excluded))
+        available = self.size - len(excluded)
+        if count > available:
+            raise NameSpaceExhausted(count, available)
+
+        # 在剩余名字中按名次抽样，再把名次映射回原编号：
+        # offsets[i] = excluded[i] - i，名次r之前被跳过的编号数即 bisect_right(offsets, r)
+        offsets = [index - i for i, index in enumerate(excluded)]
+        ranks = rng.sample(range(available), count)
+        return [self.name_at(rank + bisect_right(offsets, rank)) for rank in ranks]
+
+
+class NameSampler:
+    """按权重组合多种名字结构（如单字名、双字名各占一半）的批量采样器"""
+
+    def __init__(self, patterns: Sequence[Tuple[float, NamePattern]]):
+        self.patterns = [(weight, pattern) for weight, pattern in patterns if pattern.size]
+
+    @property
+    def lengths(self) -> List[int]:
+        """各结构的名字长度"""
+        return sorted({len(pattern.components) for _, pattern in self.patterns})
+
+    @property
+    def size(self) -> int:
+        """名字总数"""
+        return sum(pattern.size for _, pattern in self.patterns)
+
+    def sample(self, rng: random.Random, count: int, used_names: Iterable[str] = ()) -> List[str]:
+        """一次抽取count个互不重复、且不在used_names中的名字
+
+        先按权重决定每个名字的结构（已抽满的结构不再参与），再在各结构内无放回抽样。
+        """
+        used_names = set(used_names)
+        excluded = []
+        capacity = []
+        for _, pattern in self.patterns:
+            indexes = {pattern.index_of(name) for name in used_names}
+            indexes.discard(None)
+            excluded.append(indexes)
+            capacity.append(pattern.size - len(indexes))
+
+        available = sum(capacity)
+        if count > available:
+            raise NameSpaceExhausted(count, available)
+
+        # 每个名字所用的结构
+        choices = []
+        counts = [0] * len(self.patterns)
+        weights = [weight for weight, _ in self.patterns]
+        for _ in range(count):
+            open_weights = [weight if counts[i] < capacity[i] else 0
+                            for i, weight in enumerate(weights)]
+            if not any(open_weights):
+                open_weights = [1 if counts[i] < capacity[i] else 0 for i in range(len(weights))]
+            i = rng.choices(range(len(self.patterns)), open_weights)[0]
+            counts[i] += 1
+            choices.append(i)
+
+        # 各结构内一次抽样，再按上面的顺序排列
+        names = [iter(pattern.sample(rng, counts[i], excluded[i])) if counts[i] else iter(())
+                 for i, (_, pattern) in enumerate(self.patterns)]
+        return [next(names[i]) for i in choices]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+名字库模块
+names.json 首次使用时导入 SQLite（缓存目录中的 names.db），按性别/风格/姓氏建立索引；
+生成过的名字持久化保存，跨运行、跨进程保持唯一并提供使用统计
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+# names.json 中的字表 -> 字表类型
+CHAR_LISTS = {
+    "surnames": "surname",
+    "male_names": "male",
+    "female_names": "female",
+    "fantasy_names": "fantasy"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS chars (
+    kind TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    char TEXT NOT NULL,
+    PRIMARY KEY (kind, position)
+);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT PRIMARY KEY,
+    surname TEXT NOT NULL,
+    gender TEXT,
+    style TEXT,
+    char_type TEXT,
+    uses INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS names_by_style ON names (style, gender);
+CREATE INDEX IF NOT EXISTS names_by_gender ON names (gender);
+CREATE INDEX IF NOT EXISTS names_by_surname ON names (surname);
+"""
+
+
+class NameStore:
+    """SQLite名字库
+
+    第一次访问时才打开数据库；names.json 比上次导入时新则重新导入字表。
+    字表读取后缓存在内存中，已用名字按需查询，不整体载入。
+    """
+
+    def __init__(self, db_dir: Path, source_file: Optional[Path] = None):
+        """db_dir 为数据库所在目录；source_file 默认为 db_dir 下的 names.json"""
+        self.db_dir = Path(db_dir)
+        self.db_file = self.db_dir / "names.db"
+        self.source_file = Path(source_file) if source_file else self.db_dir / "names.json"
+
+        self._conn = None
+        self._chars = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "NameStore":
+        """按配置创建：字表取自 generation.name_database/names.json，
+        数据库放在 cache.cache_dir 中，不写入随仓库发布的名字数据目录"""
+        source_dir = Path(config.get("generation", {}).get("name_database", "name_database"))
+        cache_dir = Path(config.get("cache", {}).get("cache_dir", "cache"))
+        return cls(cache_dir, source_dir / "names.json")
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """数据库连接（首次访问时打开并按需导入names.json）"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def _open(self) -> sqlite3.Connection:
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        self._import_source(conn)
+        return conn
+
+    def _import_source(self, conn: sqlite3.Connection):
+        """names.json 有更新时导入字表和已生成的名字"""
+        if not self.source_file.exists():
+            return
+
+        mtime = str(self.source_file.stat().st_mtime)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source_mtime'").fetchone()
+        if row and row[0] == mtime:
+            return
+
+        try:
+            with open(self.source_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"警告: 无法加载名字数据库 {self.source_file}: {e}")
+            return
+
+        with conn:
+            for key, kind in CHAR_LISTS.items():
+                if key not in data:
+                    continue
+                conn.execute("DELETE FROM chars WHERE kind = ?", (kind,))
+                conn.executemany(
+                    "INSERT INTO chars (kind, position, char) VALUES (?, ?, ?)",
+                    [(kind, i, char) for i, char in enumerate(data[key])]
+                )
+
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO names (name, surname, style, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(name, name[:1], "imported", now, now) for name in data.get("generated_names", []) if name]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source_mtime', ?)", (mtime,))
+
+    @property
+    def exists(self) -> bool:
+        """数据库或names.json是否存在"""
+        return self._conn is not None or self.db_file.exists() or self.source_file.exists()
+
+    def chars(self, kind: str) -> List[str]:
+        """字表（surname/male/female/fantasy），不存在时返回空列表"""
+        if not self.exists:
+            return []
+        if kind not in self._chars:
+            rows = self.conn.execute(
+                "SELECT char FROM chars WHERE kind = ? ORDER BY position", (kind,)
+            ).fetchall()
+            self._chars[kind] = [row[0] for row in rows]
+        return self._chars[kind]
+
+    def is_used(self, name: str) -> bool:
+        """名字是否已经生成过"""
+        return self.conn.execute("SELECT 1 FROM names WHERE name = ?", (name,)).fetchone() is not None
+
+    def used_names(self, style: Optional[str] = None,
+                   gender: Optional[str] = None,
+                   surname: Optional[str] = None,
+                   lengths: Iterable[int] = ()) -> List[str]:
+        """按风格/性别/姓氏/名字长度查询已生成的名字"""
+        conditions = []
+        params = []
+        for column, value in (("style", style), ("gender", gender), ("surname", surname)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        lengths = list(lengths)
+        if lengths:
+            conditions.append(f"length(name) IN ({', '.join('?' * len(lengths))})")
+            params.extend(lengths)
+
+        sql = "SELECT name FROM names"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    def add_names(self, names: Iterable[str],
+                  gender: Optional[str] = None,
+                  style: Optional[str] = None,
+                  char_type: Optional[str] = None) -> int:
+        """记录生成的名字（已有的名字累加使用次数），返回新增数量"""
+        now = time.time()
+        names = list(names)
+        conn = self.conn
+        with self._lock, conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO names (name, surname, gender, style, char_type, uses, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                [(name, name[:1], gender, style, char_type, now, now) for name in names]
+            )
+            added = conn.total_changes - before
+            conn.executemany(
+                "UPDATE names SET uses = uses + 1, last_used = ? WHERE name = ?",
+                [(now, name) for name in names]
+            )
+        return added
+
+    def count(self, style: Optional[str] = None, gender: Optional[str] = None) -> int:
+        """已生成名字数"""
+        conditions = []
+        params = []
+        for column, value in (("style", style), ("gender", gender)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT COUNT(*) FROM names"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def stats(self, top: int = 10) -> Dict:
+        """使用统计：总数、按风格/性别分布、常用姓氏、重复使用最多的名字"""
+        conn = self.conn
+        return {
+            "total": conn.execute("SELECT COUNT(*) FROM names").fetchone()[0],
+            "uses": conn.execute("SELECT COALESCE(SUM(uses), 0) FROM names").fetchone()[0],
+            "by_style": dict(conn.execute(
+                "SELECT COALESCE(style, '未知'), COUNT(*) FROM names GROUP BY style ORDER BY COUNT(*) DESC"
+            ).fetchall()),
+            "by_gender": dict(conn.execute(
+                "SELECT COALESCE(gender, '未知'), COUNT(*) FROM names GROUP BY gender ORDER BY COUNT(*) DESC"
+            ).fetchall()),
+            "top_surnames": conn.execute(
+                "SELECT surname, COUNT(*) FROM names GROUP BY surname ORDER BY COUNT(*) DESC LIMIT ?", (top,)
+            ).fetchall(),
+            "most_used": conn.execute(
+                "SELECT name, uses FROM names WHERE uses > 1 ORDER BY uses DESC LIMIT ?", (top,)
+            ).fetchall()
+        }
+
+    def close(self):
+        """关闭数据库"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 连接不能传给其他进程，到达后重新打开
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
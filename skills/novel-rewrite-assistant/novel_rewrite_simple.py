@@ -8,6 +8,7 @@ import os
 import json
 import argparse
 from pathlib import Path
+from typing import Optional
 from datetime import datetime
 
 # 导入模块
@@ -17,6 +18,10 @@ try:
     from analyzer_complete import NovelAnalyzer
     from simple_character_gen import SimpleCharacterGenerator
     from story_writer import StoryWriter
+    from story_sink import public_fields
+    from story_container import StoryContainerWriter
+    from search_index import SearchIndex
+    from rng import RngContext
 except ImportError as e:
     print(f"导入模块失败: {e}")
     print("请确保所有依赖文件都存在")
@@ -26,22 +31,29 @@ except ImportError as e:
 class SimpleNovelRewriter:
     """简化版小说仿写器"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, compact: bool = False):
         # 基础配置
         self.config = {
             "analysis": {"max_chapters": 20},
             "generation": {"max_supporting_chars": 8},
-            "writing": {"min_chapters": 10, "max_chapters": 30, "chapter_length": 1500},
-            "cache": {"enabled": True, "ttl": 3600, "cache_dir": "cache"}
+            "writing": {"min_chapters": 10, "max_chapters": 30, "chapter_length": 1500, "seed": seed},
+            "cache": {"enabled": True, "ttl": 3600, "cache_dir": "cache"},
+            "output": {"search_index": True, "compact": compact}
         }
         
+        # 角色生成和章节创作共用一个随机数上下文，相同种子生成相同结果
+        self.rng = RngContext.from_config(self.config)
+        
         self.analyzer = NovelAnalyzer(self.config)
-        self.char_gen = SimpleCharacterGenerator()
-        self.writer = StoryWriter(self.config)
+        self.char_gen = SimpleCharacterGenerator(self.rng)
+        self.writer = StoryWriter(self.config, self.rng)
         
         # 创建工作目录
         self.workspace = Path("novel_output")
         self.workspace.mkdir(exist_ok=True)
+        
+        # 检索索引（同一作品的三种格式只索引JSON）
+        self.search_index = SearchIndex.for_directory(self.workspace) if self.config["output"]["search_index"] else None
     
     def run_interactive(self):
         """交互式运行"""
@@ -152,9 +164,22 @@ class SimpleNovelRewriter:
             "protagonist": protagonist,
             "supporting_characters": supporting_chars,
             "outline": outline,
-            "chapters": chapters
+            "chapters": [public_fields(chapter) for chapter in chapters]
         }
         
+        # 紧凑模式只保存一个容器文件，Markdown/纯文本在需要时导出
+        if self.config["output"]["compact"]:
+            story_file = self.workspace / f"{base_name}.story"
+            with StoryContainerWriter(story_file) as writer:
+                writer.open(dict(json_data, title=framework["title"]))
+                for chapter in json_data["chapters"]:
+                    writer.add_chapter(chapter)
+            if self.search_index is not None:
+                self.search_index.add_document(story_file, framework["title"], chapters)
+            print(f"✅ 结果已保存: {story_file}")
+            print(f"   导出: python novel_rewriter.py export {story_file} -f markdown")
+            return
+        
         json_file = self.workspace / f"{base_name}.json"
         with open(json_file, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, ensure_ascii=False, indent=2)
@@ -167,6 +192,9 @@ class SimpleNovelRewriter:
         txt_file = self.workspace / f"{base_name}.txt"
         self._save_as_text(txt_file, framework, chapters)
         
+        if self.search_index is not None:
+            self.search_index.add_document(json_file, framework["title"], chapters)
+        
         print(f"✅ 结果已保存:")
         print(f"   JSON数据: {json_file}")
         print(f"   Markdown: {md_file}")
@@ -239,11 +267,14 @@ def main():
     parser.add_argument("--title", default="新创作的小说", help="小说标题")
     parser.add_argument("--chapters", type=int, default=20, help="章节数量")
     parser.add_argument("--output", default="novel_output", help="输出目录")
+    parser.add_argument("--seed", type=int, help="随机种子（相同种子生成相同内容）")
+    parser.add_argument("--compact", action="store_true",
+                       help="只保存一个.story容器文件，代替JSON/Markdown/纯文本三份")
     
     args = parser.parse_args()
     
     # 创建重写器
-    rewriter = SimpleNovelRewriter()
+    rewriter = SimpleNovelRewriter(args.seed, args.compact)
     
     if args.interactive or not args.url:
         # 交互式模式
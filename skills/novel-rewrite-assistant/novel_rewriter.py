@@ -7,6 +7,7 @@
 import sys
 import os
 import json
+import time
 import argparse
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -17,6 +18,12 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from analyzer import NovelAnalyzer
 from character_generator import CharacterGenerator
 from story_writer import StoryWriter
+from batch_runner import BatchRunner, load_urls
+from story_sink import SINKS, TeeSink, create_sink, export_story
+from search_index import SearchIndex, SearchIndexSink
+from story_archive import StoryArchive
+from rng import RngContext
+from chapter_store import ChapterStore
 
 
 class NovelRewriter:
@@ -26,14 +33,26 @@ class NovelRewriter:
         """初始化"""
         self.config = self.load_config(config_path)
         self.analyzer = NovelAnalyzer(self.config)
-        self.character_gen = CharacterGenerator(self.config)
-        self.writer = StoryWriter(self.config)
+        self.set_seed(self.config["writing"].get("seed"))
         
         # 工作目录
         self.workspace = Path("workspace")
         self.workspace.mkdir(exist_ok=True)
         
-    def load_config(self, config_path: str) -> Dict:
+        # 检索索引（保存故事时逐章更新）
+        self.search_index = None
+        if self.config.get("output", {}).get("search_index", True):
+            self.search_index = SearchIndex.for_directory(self.workspace)
+        
+    def set_seed(self, seed: Optional[int] = None):
+        """设置随机种子，角色生成和章节创作共用同一个随机数上下文"""
+        self.rng = RngContext(seed)
+        self.config["writing"]["seed"] = seed
+        self.character_gen = CharacterGenerator(self.config, self.rng)
+        self.writer = StoryWriter(self.config, self.rng, ChapterStore.from_config(self.config))
+    
+    @classmethod
+    def load_config(cls, config_path: str) -> Dict:
         """加载配置文件"""
         default_config = {
             "analysis": {
@@ -41,14 +60,18 @@ class NovelRewriter:
                 "min_chapter_length": 500,
                 "extract_dialogues": True,
                 "detect_plot_points": True,
-                "timeout": 30
+                "timeout": 30,
+                "html_parser": "auto"
             },
             "generation": {
                 "name_style": "chinese",
                 "auto_relationships": True,
                 "character_depth": "medium",
                 "max_supporting_chars": 10,
-                "name_database": "name_database"
+                "name_database": "name_database",
+                "persist_names": False,
+                "name_registry": None,
+                "universe": "default"
             },
             "writing": {
                 "style_imitation": True,
@@ -57,13 +80,28 @@ class NovelRewriter:
                 "chapter_length": 3000,
                 "output_format": "markdown",
                 "min_chapters": 10,
-                "max_chapters": 100
+                "max_chapters": 100,
+                "seed": None,
+                "workers": 1,
+                "template_dir": None
+            },
+            "crawl": {
+                "enabled": False,
+                "max_workers": 8,
+                "per_host_limit": 4,
+                "max_retries": 3,
+                "backoff": 0.5
             },
             "cache": {
                 "enabled": True,
                 "ttl": 86400,
                 "max_size": 1000000,
+                "chapter_max_size": 20000000,
+                "memory_entries": 128,
                 "cache_dir": "cache"
+            },
+            "output": {
+                "search_index": True
             }
         }
         
@@ -72,17 +110,18 @@ class NovelRewriter:
                 with open(config_path, 'r', encoding='utf-8') as f:
                     user_config = json.load(f)
                     # 合并配置
-                    self.deep_update(default_config, user_config)
+                    cls.deep_update(default_config, user_config)
             except Exception as e:
                 print(f"警告: 配置文件加载失败，使用默认配置: {e}")
         
         return default_config
     
-    def deep_update(self, base: Dict, update: Dict) -> Dict:
+    @classmethod
+    def deep_update(cls, base: Dict, update: Dict) -> Dict:
         """深度更新字典"""
         for key, value in update.items():
             if key in base and isinstance(base[key], dict) and isinstance(value, dict):
-                self.deep_update(base[key], value)
+                cls.deep_update(base[key], value)
             else:
                 base[key] = value
         return base
@@ -120,7 +159,53 @@ class NovelRewriter:
     def create_new_story(self, analysis_result: Dict, 
                         protagonist: Dict,
                         story_framework: Dict) -> Dict:
-        """创建新故事"""
+        """创建新故事（全部章节保存在内存中）"""
+        story = self._prepare_story(analysis_result, protagonist, story_framework)
+        
+        # 4. 创作章节内容
+        print("创作章节内容...")
+        story["chapters"] = self.writer.write_chapters(
+            story["story_outline"], analysis_result, protagonist, story["supporting_characters"]
+        )
+        
+        return story
+    
+    def rewrite_chapters(self, story: Dict) -> Dict:
+        """修改角色或大纲后重新生成章节，输入未变的章节直接取自章节缓存"""
+        analysis_result = {"writing_style": {"style_type": story["metadata"].get("style_imitated") or "平衡型"}}
+        story["chapters"] = self.writer.write_chapters(
+            story["story_outline"], analysis_result, story["protagonist"], story["supporting_characters"]
+        )
+        return story
+    
+    def write_story(self, analysis_result: Dict,
+                    protagonist: Dict,
+                    story_framework: Dict,
+                    output_format: str = "markdown") -> Tuple[str, int]:
+        """创建新故事并逐章写入文件，返回 (文件路径, 章节数)
+        
+        每章生成后立即写入并刷新，内存中只保留当前章节。
+        """
+        story = self._prepare_story(analysis_result, protagonist, story_framework)
+        output_format = self._check_format(output_format)
+        output_file = self.workspace / f"{story['title']}.{output_format}"
+        
+        # 4. 逐章创作并写入
+        print(f"创作章节内容，逐章写入: {output_file}")
+        chapters = self.writer.iter_chapters(
+            story["story_outline"], analysis_result, protagonist, story["supporting_characters"]
+        )
+        with self._create_sink(output_format, output_file) as sink:
+            sink.open(story)
+            sink.write_chapters(chapters)
+        
+        print(f"故事已保存到: {output_file}")
+        return str(output_file), sink.chapter_count
+    
+    def _prepare_story(self, analysis_result: Dict,
+                       protagonist: Dict,
+                       story_framework: Dict) -> Dict:
+        """生成配角、角色关系和大纲，返回不含章节的故事信息"""
         print("开始创作新故事...")
         
         # 1. 生成配角
@@ -141,103 +226,47 @@ class NovelRewriter:
             analysis_result, story_framework, protagonist, supporting_chars
         )
         
-        # 4. 创作章节内容
-        print("创作章节内容...")
-        chapters = self.writer.write_chapters(
-            story_outline, analysis_result, protagonist, supporting_chars
-        )
-        
-        # 5. 组装完整故事
-        print("组装完整故事...")
-        new_story = {
+        return {
             "title": story_framework.get("title", "新创作的小说"),
             "author": protagonist.get("author", "AI创作助手"),
             "protagonist": protagonist,
             "supporting_characters": supporting_chars,
             "character_relationships": character_relationships,
             "story_outline": story_outline,
-            "chapters": chapters,
             "metadata": {
                 "original_novel": analysis_result.get("title"),
                 "created_at": analysis_result.get("analysis_time"),
-                "style_imitated": analysis_result.get("writing_style", {}).get("style_type")
+                "style_imitated": analysis_result.get("writing_style", {}).get("style_type"),
+                "seed": self.rng.seed
             }
         }
-        
-        return new_story
     
     def save_story(self, story: Dict, output_format: str = "markdown") -> str:
         """保存故事到文件"""
+        output_format = self._check_format(output_format)
         output_file = self.workspace / f"{story['title']}.{output_format}"
         
-        if output_format == "json":
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(story, f, ensure_ascii=False, indent=2)
-        elif output_format == "markdown":
-            self._save_as_markdown(story, output_file)
-        elif output_format == "txt":
-            self._save_as_text(story, output_file)
-        else:
-            print(f"警告: 不支持的格式 {output_format}，使用markdown")
-            self._save_as_markdown(story, output_file)
+        header = {key: value for key, value in story.items() if key != "chapters"}
+        with self._create_sink(output_format, output_file) as sink:
+            sink.open(header)
+            sink.write_chapters(story.get("chapters", []))
         
         print(f"故事已保存到: {output_file}")
         return str(output_file)
     
-    def _save_as_markdown(self, story: Dict, output_file: Path):
-        """保存为Markdown格式"""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # 标题
-            f.write(f"# {story['title']}\n\n")
-            
-            # 作者信息
-            f.write(f"**作者**: {story['author']}\n\n")
-            f.write(f"**创作时间**: {story['metadata']['created_at']}\n\n")
-            f.write(f"**参考作品**: {story['metadata']['original_novel']}\n\n")
-            f.write(f"**仿照风格**: {story['metadata']['style_imitated']}\n\n")
-            
-            # 主角信息
-            f.write("## 主角\n\n")
-            protagonist = story['protagonist']
-            f.write(f"**姓名**: {protagonist['name']}\n\n")
-            f.write(f"**年龄**: {protagonist.get('age', '未知')}\n\n")
-            f.write(f"**性格**: {protagonist.get('personality', '未知')}\n\n")
-            f.write(f"**背景**: {protagonist.get('background', '未知')}\n\n")
-            
-            # 配角信息
-            if story['supporting_characters']:
-                f.write("## 主要配角\n\n")
-                for char in story['supporting_characters'][:10]:  # 只显示前10个
-                    f.write(f"### {char['name']}\n\n")
-                    f.write(f"- **关系**: {char.get('relationship', '未知')}\n")
-                    f.write(f"- **性格**: {char.get('personality', '未知')}\n")
-                    f.write(f"- **作用**: {char.get('role', '未知')}\n\n")
-            
-            # 故事大纲
-            f.write("## 故事大纲\n\n")
-            outline = story['story_outline']
-            for i, point in enumerate(outline.get('main_plot_points', []), 1):
-                f.write(f"{i}. {point}\n")
-            f.write("\n")
-            
-            # 章节内容
-            f.write("## 正文\n\n")
-            for i, chapter in enumerate(story['chapters'], 1):
-                f.write(f"### 第{i}章 {chapter.get('title', f'第{i}章')}\n\n")
-                f.write(f"{chapter.get('content', '')}\n\n")
+    def _create_sink(self, output_format: str, output_file: Path):
+        """文件输出器，开启检索索引时同时写入索引"""
+        sink = create_sink(output_format, output_file)
+        if self.search_index is None:
+            return sink
+        return TeeSink(sink, SearchIndexSink(self.search_index, output_file))
     
-    def _save_as_text(self, story: Dict, output_file: Path):
-        """保存为纯文本格式"""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            # 标题
-            f.write(f"{story['title']}\n")
-            f.write("=" * 50 + "\n\n")
-            
-            # 章节内容
-            for i, chapter in enumerate(story['chapters'], 1):
-                f.write(f"第{i}章 {chapter.get('title', f'第{i}章')}\n")
-                f.write("-" * 50 + "\n\n")
-                f.write(f"{chapter.get('content', '')}\n\n")
+    def _check_format(self, output_format: str) -> str:
+        """检查输出格式"""
+        if output_format not in SINKS:
+            print(f"警告: 不支持的格式 {output_format}，使用markdown")
+            return "markdown"
+        return output_format
     
     def interactive_mode(self):
         """交互式模式"""
@@ -286,42 +315,174 @@ class NovelRewriter:
         self.config["writing"]["min_chapters"] = chapter_count
         self.config["writing"]["max_chapters"] = chapter_count
         
-        # 6. 开始创作
-        print(f"\n开始创作《{story_framework['title']}》...")
-        new_story = self.create_new_story(analysis_result, protagonist, story_framework)
+        output_format = input("输出格式（markdown/txt/json/jsonl/story，默认markdown）: ").strip().lower() or "markdown"
         
-        # 7. 保存结果
-        output_format = input("输出格式（markdown/txt/json，默认markdown）: ").strip().lower() or "markdown"
-        output_file = self.save_story(new_story, output_format)
+        # 6. 开始创作，逐章写入文件
+        print(f"\n开始创作《{story_framework['title']}》...")
+        output_file, chapter_count = self.write_story(
+            analysis_result, protagonist, story_framework, output_format
+        )
         
         print(f"\n✅ 创作完成！")
-        print(f"📖 作品: 《{new_story['title']}》")
+        print(f"📖 作品: 《{story_framework['title']}》")
         print(f"👤 主角: {protagonist['name']}")
-        print(f"📄 章节: {len(new_story['chapters'])}章")
+        print(f"📄 章节: {chapter_count}章")
         print(f"💾 文件: {output_file}")
         print(f"🎨 风格: 仿照《{analysis_result.get('title', '参考小说')}》")
 
 
+def batch_main(argv: List[str]):
+    """批量分析子命令"""
+    parser = argparse.ArgumentParser(prog="novel_rewriter.py batch", description="批量分析小说")
+    parser.add_argument("input", help="URL列表文件（每行一个），-表示从标准输入读取")
+    parser.add_argument("--output", "-o", default="workspace/batch_results.jsonl",
+                       help="结果文件（JSONL，追加写入）")
+    parser.add_argument("--checkpoint", help="检查点文件（默认为结果文件名加.done）")
+    parser.add_argument("--workers", "-j", type=int, default=os.cpu_count() or 4,
+                       help="进程数")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，全部重新分析")
+    parser.add_argument("--crawl", action="store_true",
+                       help="并发抓取章节正文进行分析")
+    parser.add_argument("--config", default="config.json", help="配置文件")
+    
+    args = parser.parse_args(argv)
+    
+    # 批量分析只需要配置，不创建角色生成器和写作器
+    config = NovelRewriter.load_config(args.config)
+    if args.crawl:
+        config["crawl"]["enabled"] = True
+    
+    urls = load_urls(args.input)
+    if not urls:
+        print("错误: 没有要分析的URL")
+        return
+    
+    runner = BatchRunner(config, Path(args.output),
+                         Path(args.checkpoint) if args.checkpoint else None, args.workers)
+    if args.restart:
+        runner.checkpoint.reset()
+    runner.run(urls)
+
+
+def search_main(argv: List[str]):
+    """全文检索子命令"""
+    parser = argparse.ArgumentParser(prog="novel_rewriter.py search", description="检索已生成的小说")
+    parser.add_argument("query", help="检索词（空格分隔的多个词需同时出现）")
+    parser.add_argument("--dir", "-d", action="append",
+                       help="输出目录（可重复，默认 workspace 和 novel_output）")
+    parser.add_argument("--limit", "-n", type=int, default=20, help="最多显示的章节数")
+    parser.add_argument("--no-update", action="store_true", help="不扫描目录更新索引，直接检索")
+    
+    args = parser.parse_args(argv)
+    
+    directories = [Path(d) for d in (args.dir or ["workspace", "novel_output"])]
+    directories = [d for d in directories if d.is_dir()]
+    if not directories:
+        print("错误: 没有可检索的输出目录")
+        return
+    
+    hits = []
+    elapsed = 0.0
+    for directory in directories:
+        index = SearchIndex.for_directory(directory)
+        if not args.no_update:
+            stats = index.update_directory(directory)
+            if stats["indexed"] or stats["removed"]:
+                print(f"更新索引 {directory}: 新增/更新{stats['indexed']}个文件（{stats['chapters']}章），"
+                      f"删除{stats['removed']}个")
+        started = time.perf_counter()
+        hits.extend(index.search(args.query, args.limit))
+        elapsed += time.perf_counter() - started
+        index.close()
+    
+    for hit in hits[:args.limit]:
+        print(f"{hit['path']}  《{hit['story'] or '未命名'}》第{hit['chapter']}章 {hit['title']}")
+        print(f"    {hit['snippet']}")
+    print(f"共{min(len(hits), args.limit)}条结果（{elapsed * 1000:.1f}毫秒）")
+
+
+def export_main(argv: List[str]):
+    """存档导出子命令"""
+    parser = argparse.ArgumentParser(prog="novel_rewriter.py export",
+                                     description="把已保存的故事（.story/.json/.jsonl）导出为其他格式")
+    parser.add_argument("input", help="故事文件（.story/.json/.jsonl）")
+    parser.add_argument("--format", "-f", default="markdown", choices=list(SINKS), help="导出格式")
+    parser.add_argument("--output", "-o", help="输出文件（默认与原文件同名，扩展名为格式名）")
+    parser.add_argument("--list", "-l", action="store_true", help="只列出章节目录")
+    parser.add_argument("--chapter", "-c", type=int, help="只输出第N章正文")
+    
+    args = parser.parse_args(argv)
+    
+    source = Path(args.input)
+    if not source.is_file():
+        print(f"错误: 文件不存在 {source}")
+        return
+    
+    if args.list:
+        with StoryArchive.open(source) as archive:
+            print(f"《{archive.title or '未命名'}》共{len(archive)}章")
+            for entry in archive.chapter_titles():
+                print(f"  第{entry['number']}章 {entry['title']}（{entry['word_count']}字）")
+        return
+    
+    if args.chapter is not None:
+        with StoryArchive.open(source) as archive:
+            if not 1 <= args.chapter <= len(archive):
+                print(f"错误: 章节不存在 {args.chapter}（共{len(archive)}章）")
+                return
+            chapter = archive.chapter(args.chapter)
+        print(f"第{args.chapter}章 {chapter.get('title', '')}\n")
+        print(chapter.get("content", ""))
+        return
+    
+    output_file = Path(args.output) if args.output else source.with_suffix(f".{args.format}")
+    if output_file.resolve() == source.resolve():
+        print(f"错误: 输出文件与原文件相同 {source}")
+        return
+    count = export_story(source, args.format, output_file)
+    print(f"已导出{count}章到: {output_file}")
+
+
 def main():
     """主函数"""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        batch_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        search_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        export_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(description="小说仿写助手")
     parser.add_argument("url", nargs="?", help="参考小说URL")
     parser.add_argument("--protagonist", help="主角信息JSON文件或字符串")
     parser.add_argument("--framework", help="剧情框架JSON文件或字符串")
     parser.add_argument("--output", "-o", default="novel.md", help="输出文件")
     parser.add_argument("--format", "-f", default="markdown", 
-                       choices=["markdown", "txt", "json"], help="输出格式")
+                       choices=list(SINKS), help="输出格式（story为紧凑容器）")
     parser.add_argument("--chapters", "-c", type=int, default=10, help="章节数量")
     parser.add_argument("--analyze-only", "-a", action="store_true", 
                        help="只分析不创作")
     parser.add_argument("--interactive", "-i", action="store_true", 
                        help="交互式模式")
+    parser.add_argument("--crawl", action="store_true",
+                       help="并发抓取章节正文进行分析")
+    parser.add_argument("--seed", type=int, help="随机种子（相同种子生成相同章节）")
+    parser.add_argument("--workers", "-j", type=int, help="创作章节的进程数（0为全部核心）")
     parser.add_argument("--config", default="config.json", help="配置文件")
     
     args = parser.parse_args()
     
     # 创建重写器
     rewriter = NovelRewriter(args.config)
+    if args.crawl:
+        rewriter.config["crawl"]["enabled"] = True
+    if args.seed is not None:
+        rewriter.set_seed(args.seed)
+    if args.workers is not None:
+        rewriter.config["writing"]["workers"] = args.workers
     
     if args.interactive:
         # 交互式模式
@@ -365,19 +526,18 @@ def main():
             analysis_result = rewriter.analyze_novel(args.url, analyze_only=False)
             
             if analysis_result:
-                # 创作新故事
-                new_story = rewriter.create_new_story(
-                    analysis_result, protagonist, story_framework
+                # 创作新故事，逐章写入文件
+                rewriter.write_story(
+                    analysis_result, protagonist, story_framework, args.format
                 )
-                
-                # 保存故事
-                rewriter.save_story(new_story, args.format)
     else:
         # 显示帮助
         parser.print_help()
         print("\n示例:")
         print("  交互式模式: python novel_rewriter.py -i")
         print("  分析小说: python novel_rewriter.py https://example.com/novel -a")
+        print("  批量分析: python novel_rewriter.py batch urls.txt -o results.jsonl -j 8")
+        print("  检索作品: python novel_rewriter.py search 关键词")
         print("  完整创作: python novel_rewriter.py https://example.com/novel \\")
         print("            --protagonist '{\"name\":\"林风\"}' \\")
         print("            --framework '{\"title\":\"新小说\"}'")
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+原始网页存储模块
+按内容哈希保存压缩后的HTML，按URL+抓取时间记录抓取历史
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+class PageStore:
+    """内容寻址的原始网页存储
+
+    目录结构：
+      objects/ab/abcdef....html.gz   压缩后的页面，以内容sha256命名
+      index/<url哈希>.jsonl          每次抓取追加一行 {url, kind, fetched_at, sha256, etag, last_modified}
+    """
+
+    def __init__(self, store_dir: Path, enabled: bool = True):
+        self.store_dir = Path(store_dir)
+        self.enabled = enabled
+        self.objects_dir = self.store_dir / "objects"
+        self.index_dir = self.store_dir / "index"
+        if enabled:
+            self.objects_dir.mkdir(parents=True, exist_ok=True)
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """计算内容哈希"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _object_path(self, sha: str) -> Path:
+        return self.objects_dir / sha[:2] / f"{sha}.html.gz"
+
+    def _index_path(self, url: str) -> Path:
+        return self.index_dir / f"{hashlib.md5(url.encode()).hexdigest()}.jsonl"
+
+    def put(self, url: str, text: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, kind: str = "novel") -> Dict:
+        """保存页面并追加抓取记录（kind: novel为小说目录页，chapter为章节页）"""
+        sha = self.content_hash(text)
+        record = {
+            "url": url,
+            "kind": kind,
+            "fetched_at": time.time(),
+            "sha256": sha,
+            "etag": etag,
+            "last_modified": last_modified
+        }
+        if not self.enabled:
+            record["text"] = text
+            return record
+
+        path = self._object_path(sha)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                f.write(text.encode('utf-8'))
+            os.replace(tmp_path, path)
+
+        self._append_record(record)
+        return record
+
+    def refresh(self, record: Dict, etag: Optional[str] = None,
+                last_modified: Optional[str] = None) -> Dict:
+        """内容未变化（304）时追加一条新的抓取记录"""
+        refreshed = dict(record)
+        refreshed["fetched_at"] = time.time()
+        refreshed["etag"] = etag or record.get("etag")
+        refreshed["last_modified"] = last_modified or record.get("last_modified")
+        if self.enabled:
+            self._append_record(refreshed)
+        return refreshed
+
+    def _append_record(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with open(self._index_path(record["url"]), 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def history(self, url: str) -> List[Dict]:
+        """URL的全部抓取记录（按时间先后）"""
+        if not self.enabled:
+            return []
+
+        path = self._index_path(url)
+        if not path.exists():
+            return []
+
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def latest(self, url: str) -> Optional[Dict]:
+        """URL最近一次抓取记录"""
+        records = self.history(url)
+        return records[-1] if records else None
+
+    def load(self, record: Dict) -> Optional[str]:
+        """读取记录对应的页面内容"""
+        if "text" in record:
+            return record["text"]
+
+        path = self._object_path(record["sha256"])
+        try:
+            with gzip.open(path, 'rb') as f:
+                return f.read().decode('utf-8')
+        except OSError:
+            return None
+
+    def iter_urls(self, kind: Optional[str] = "novel") -> Iterator[str]:
+        """遍历存储中的URL（kind为None时不过滤）"""
+        if not self.enabled:
+            return
+        for path in sorted(self.index_dir.glob("*.jsonl")):
+            with open(path, 'r', encoding='utf-8') as f:
+                first = f.readline()
+            try:
+                record = json.loads(first)
+            except ValueError:
+                continue
+            if kind is None or record.get("kind", "novel") == kind:
+                yield record["url"]
+
+    def fetch(self, http, url: str, ttl: float) -> Optional[Dict]:
+        """获取页面记录：未过期直接用存储，过期则条件请求，304时只追加记录"""
+        record, validators = self.lookup(url, ttl)
+        if record:
+            return record
+
+        page = http.get(url, validators)
+        if page and page["not_modified"] and not validators:
+            page = http.get(url)
+        return self.store_response(url, page, validators)
+
+    def lookup(self, url: str, ttl: float):
+        """查找存储：返回 (未过期的记录, 条件请求可用的旧记录)，两者至多一个非空"""
+        record = self.latest(url)
+        if not record or not self._has_object(record):
+            return None, None
+        if time.time() - record["fetched_at"] < ttl:
+            return record, None
+        return None, record
+
+    def store_response(self, url: str, page: Optional[Dict], validators: Optional[Dict]) -> Optional[Dict]:
+        """保存HTTP响应（HttpClient.get的返回值），304时只续期旧记录"""
+        if page is None:
+            return None
+        if page["not_modified"]:
+            if not validators:
+                return None
+            return self.refresh(validators, page.get("etag"), page.get("last_modified"))
+        return self.put(url, page["text"], page.get("etag"), page.get("last_modified"))
+
+    def _has_object(self, record: Dict) -> bool:
+        return "text" in record or self._object_path(record["sha256"]).exists()
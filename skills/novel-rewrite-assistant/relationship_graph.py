@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+角色关系图模块
+以邻接表保存角色之间带类型的关系，邻居、关系和路径查询不需要扫描整个角色列表
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+
+class RelationshipGraph:
+    """角色关系图
+
+    每个角色对应一个邻接表 {邻居名字: 关系}，按加入顺序排列，
+    判断两人关系为O(1)，列出邻居为O(度数)。
+    关系为字典 {"from", "to", "type", "kind", ...}：kind 为关系类型（如"师父"、"同门"），
+    无向关系在两端共用同一个字典。
+    """
+
+    def __init__(self):
+        self.characters: Dict[str, Dict] = {}
+        self.edges: List[Dict] = []
+        self._adjacency: Dict[str, Dict[str, Dict]] = {}
+
+    @classmethod
+    def from_cast(cls, protagonist: Dict, supporting_chars: Iterable[Dict]) -> "RelationshipGraph":
+        """由主角和配角建图：主角与每个配角相连，关系类型为配角类型"""
+        graph = cls()
+        graph.add_character(protagonist)
+        for character in supporting_chars:
+            graph.add_character(character)
+            graph.add_relation(protagonist["name"], character["name"], character.get("type", ""),
+                               type=character.get("relationship", ""))
+        return graph
+
+    def add_character(self, character: Dict):
+        """加入角色（同名角色以后加入的为准）"""
+        name = character["name"]
+        self.characters[name] = character
+        self._adjacency.setdefault(name, {})
+
+    def add_relation(self, source: str, target: str, kind: str,
+                     directed: bool = False, **attributes) -> Optional[Dict]:
+        """加入关系，返回关系字典（自身或已有关系时返回None）"""
+        if source == target or target in self._adjacency.get(source, ()):
+            return None
+
+        edge = {"from": source, "to": target}
+        edge.update(attributes)
+        edge["kind"] = kind
+
+        self._adjacency.setdefault(source, {})[target] = edge
+        if not directed:
+            self._adjacency.setdefault(target, {})[source] = edge
+        self.edges.append(edge)
+        return edge
+
+    def relation(self, source: str, target: str) -> Optional[Dict]:
+        """两人之间的关系，没有时返回None"""
+        return self._adjacency.get(source, {}).get(target)
+
+    def has_relation(self, source: str, target: str) -> bool:
+        return target in self._adjacency.get(source, ())
+
+    def degree(self, name: str) -> int:
+        return len(self._adjacency.get(name, ()))
+
+    def neighbors(self, name: str,
+                  kinds: Optional[Iterable[str]] = None,
+                  exclude: Iterable[str] = ()) -> List[str]:
+        """相邻角色（按加入顺序），可按关系类型筛选或排除"""
+        adjacency = self._adjacency.get(name, {})
+        if kinds is None and not exclude:
+            return list(adjacency)
+        kinds = set(kinds) if kinds is not None else None
+        exclude = set(exclude)
+        return [other for other, edge in adjacency.items()
+                if (kinds is None or edge["kind"] in kinds) and edge["kind"] not in exclude]
+
+    def neighbor_characters(self, name: str,
+                            kinds: Optional[Iterable[str]] = None,
+                            exclude: Iterable[str] = ()) -> List[Dict]:
+        """相邻角色的角色信息"""
+        return [self.characters[other] for other in self.neighbors(name, kinds, exclude)
+                if other in self.characters]
+
+    def shortest_path(self, source: str, target: str, max_depth: Optional[int] = None) -> Optional[List[str]]:
+        """两人之间最短的关系链（广度优先），不相连时返回None"""
+        if source not in self._adjacency or target not in self._adjacency:
+            return None
+        if source == target:
+            return [source]
+
+        previous = {source: None}
+        queue = deque([(source, 0)])
+        while queue:
+            name, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for other in self._adjacency[name]:
+                if other in previous:
+                    continue
+                previous[other] = name
+                if other == target:
+                    path = [target]
+                    while previous[path[-1]] is not None:
+                        path.append(previous[path[-1]])
+                    return path[::-1]
+                queue.append((other, depth + 1))
+        return None
+
+    def to_dict(self, protagonist: str) -> Dict:
+        """导出为故事中的 character_relationships 结构"""
+        return {
+            "protagonist": protagonist,
+            "character_network": self.edges,
+            "relationship_map": {
+                other: edge.get("type", "") for other, edge in self._adjacency.get(protagonist, {}).items()
+            }
+        }
+
+    def __len__(self) -> int:
+        return len(self.characters)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.characters
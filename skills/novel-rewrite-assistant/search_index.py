@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+全文检索模块
+生成的小说按章节建立倒排索引（中文按相邻两字切分，英文数字按词），保存在SQLite中；
+保存故事时逐章更新，也可以扫描输出目录补充索引，检索结果精确到章节
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from story_sink import StorySink
+from story_container import CONTAINER_SUFFIX, StoryContainer
+
+
+# 索引文件名（放在输出目录中）
+INDEX_FILE = "search_index.db"
+
+# 索引格式版本（PRAGMA user_version）；文件识别规则变化时递增，已索引的文件在下次扫描时重新读取
+INDEX_VERSION = 1
+
+# 可被索引的输出文件；同名的多种格式只索引排在前面的一种
+STORY_SUFFIXES = (".story", ".json", ".jsonl", ".md", ".markdown", ".txt")
+
+# 生成的故事JSON中一定有的字段（完整版与简化版）
+STORY_MARKERS = ("story_outline", "protagonist")
+
+# 中文连续片段、英文数字单词
+TOKEN_PATTERN = re.compile(r'[\u4e00-\u9fa5]+|[0-9A-Za-z]+')
+
+# Markdown / 纯文本输出中的章节标题行
+MARKDOWN_HEADING = re.compile(r'^### 第(\d+)章 ?(.*)$', re.MULTILINE)
+TEXT_HEADING = re.compile(r'^第(\d+)章 ?(.*)\n-{10,}$', re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    title TEXT,
+    mtime REAL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    chapter_id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    number INTEGER NOT NULL,
+    title TEXT,
+    content BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chapters_by_doc ON chapters (doc_id);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (term, chapter_id)
+) WITHOUT ROWID;
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """切分为检索词
+
+    中文片段切成相邻两字（"林风遇到" -> 林风 风遇 遇到），片段最后一个字再单独记一次，
+    这样任意单字都能以"该字开头的词"找到；英文数字按词并转为小写。
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        run = match.group()
+        if run.isascii():
+            tokens.append(run.lower())
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return tokens
+
+
+def query_terms(query: str) -> List[str]:
+    """检索词：中文单字按前缀查找，两字以上按相邻两字查找"""
+    terms = []
+    for match in TOKEN_PATTERN.finditer(query):
+        run = match.group()
+        if run.isascii():
+            terms.append(run.lower())
+        elif len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return list(dict.fromkeys(terms))
+
+
+def read_story_file(path: Path) -> Tuple[Optional[str], List[Dict]]:
+    """从输出文件读出 (标题, 章节列表)，无法识别时章节为空"""
+    if path.suffix.lower() == CONTAINER_SUFFIX:
+        with StoryContainer.open(path) as container:
+            return container.title, list(container.chapters())
+
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    suffix = path.suffix.lower()
+    if suffix == ".json":
+        data = json.loads(text)
+        if not isinstance(data, dict):
+            return None, []
+        chapters = [chapter for chapter in data.get("chapters", []) if isinstance(chapter, dict)]
+        # 只索引输出器写出的故事；分析结果等其他JSON也有chapters（参考小说的章节链接），跳过
+        if not _is_story(data, chapters):
+            return None, []
+        title = data.get("title") or data.get("framework", {}).get("title")
+        return title, chapters
+
+    if suffix == ".jsonl":
+        header = None
+        chapters = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                return None, []
+            if record.get("type") == "story":
+                header = record
+            elif record.get("type") == "chapter":
+                chapters.append(record)
+        # 批量分析结果等其他JSONL没有故事信息行，跳过
+        if header is None and not _is_story({}, chapters):
+            return None, []
+        return (header or {}).get("title"), chapters
+
+    if suffix in (".md", ".markdown"):
+        title = text[2:text.find("\n")].strip() if text.startswith("# ") else None
+        body_start = text.find("\n## 正文\n")
+        return title, _split_chapters(text, MARKDOWN_HEADING, max(body_start, 0))
+
+    first_line = text[:text.find("\n")].strip() if "\n" in text else text.strip()
+    return first_line or None, _split_chapters(text, TEXT_HEADING, 0)
+
+
+def _is_story(data: Dict, chapters: List[Dict]) -> bool:
+    """是否为生成的故事：带有主角或故事大纲，或章节带有正文"""
+    if any(key in data for key in STORY_MARKERS):
+        return True
+    return bool(chapters) and all("content" in chapter for chapter in chapters)
+
+
+def _split_chapters(text: str, heading: re.Pattern, start: int) -> List[Dict]:
+    """按章节标题行切分正文"""
+    matches = list(heading.finditer(text, start))
+    chapters = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        chapters.append({
+            "number": int(match.group(1)),
+            "title": match.group(2).strip(),
+            "content": text[match.end():end].strip()
+        })
+    return chapters
+
+
+class SearchIndex:
+    """SQLite倒排索引
+
+    postings 以 (检索词, 章节) 为主键，查一个词是一次范围扫描，判断某章是否包含某词是一次主键查找；
+    检索时从命中最少的词开始求交集，再用章节原文核对整个检索词，排除只是两字分别出现的章节。
+    章节原文压缩保存，用于核对、显示摘要和删除旧索引。
+    """
+
+    def __init__(self, db_file: Path):
+        self.db_file = Path(db_file)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_directory(cls, directory: Path) -> "SearchIndex":
+        """输出目录中的索引"""
+        return cls(Path(directory) / INDEX_FILE)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """数据库连接（首次访问时打开）"""
+        if self._conn is None:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+                # 旧版本可能索引过分析结果等非故事文件：清空修改时间，让update_directory重新判断
+                with conn:
+                    conn.execute("UPDATE documents SET mtime = NULL")
+                    conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    # ---- 写入 ----
+
+    def begin_document(self, path: Path, title: Optional[str]) -> int:
+        """开始（重新）索引一个文件，清除其旧索引，返回文档编号"""
+        path = str(Path(path).resolve())
+        conn = self.conn
+        with self._lock, conn:
+            self._delete(conn, path)
+            cursor = conn.execute(
+                "INSERT INTO documents (path, title, mtime, indexed_at) VALUES (?, ?, NULL, ?)",
+                (path, title, time.time())
+            )
+        return cursor.lastrowid
+
+    def add_chapter(self, doc_id: int, number: int, title: str, content: str):
+        """索引一章（标题和正文）"""
+        with self._lock, self.conn:
+            self._insert_chapter(self.conn, doc_id, number, title, content)
+
+    @staticmethod
+    def _insert_chapter(conn: sqlite3.Connection, doc_id: int, number: int, title: str, content: str):
+        cursor = conn.execute(
+            "INSERT INTO chapters (doc_id, number, title, content) VALUES (?, ?, ?, ?)",
+            (doc_id, number, title, zlib.compress(content.encode('utf-8')))
+        )
+        chapter_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO postings (term, chapter_id, count) VALUES (?, ?, ?)",
+            [(term, chapter_id, count) for term, count in Counter(tokenize(f"{title}\n{content}")).items()]
+        )
+
+    def finish_document(self, doc_id: int, path: Path):
+        """记录文件的修改时间，之后扫描目录时未变化的文件不再重新索引"""
+        path = Path(path)
+        mtime = path.stat().st_mtime if path.exists() else None
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE documents SET mtime = ? WHERE doc_id = ?", (mtime, doc_id))
+
+    def add_document(self, path: Path, title: Optional[str], chapters: Iterable[Dict]) -> int:
+        """索引一个文件的全部章节（一个事务），返回章节数"""
+        doc_id = self.begin_document(path, title)
+        count = 0
+        with self._lock, self.conn:
+            for count, chapter in enumerate(chapters, 1):
+                self._insert_chapter(self.conn, doc_id, chapter.get("number", count),
+                                     chapter.get("title", ""), chapter.get("content", ""))
+        self.finish_document(doc_id, path)
+        return count
+
+    def remove_document(self, path: Path):
+        """删除一个文件的索引"""
+        with self._lock, self.conn:
+            self._delete(self.conn, str(Path(path).resolve()))
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, path: str):
+        row = conn.execute("SELECT doc_id FROM documents WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return
+        # 由保存的原文重新切分得到该章的检索词，按主键逐条删除
+        for chapter_id, title, content in conn.execute(
+                "SELECT chapter_id, title, content FROM chapters WHERE doc_id = ?", row).fetchall():
+            text = f"{title}\n{zlib.decompress(content).decode('utf-8')}"
+            conn.executemany("DELETE FROM postings WHERE term = ? AND chapter_id = ?",
+                             [(term, chapter_id) for term in set(tokenize(text))])
+        conn.execute("DELETE FROM chapters WHERE doc_id = ?", row)
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", row)
+
+    def update_directory(self, directory: Path) -> Dict[str, int]:
+        """扫描目录：索引新增或修改过的输出文件，删除已不存在的文件的索引"""
+        directory = Path(directory)
+        known = dict(self.conn.execute("SELECT path, mtime FROM documents").fetchall())
+        stats = {"indexed": 0, "unchanged": 0, "skipped": 0, "removed": 0, "chapters": 0}
+
+        # 同一故事保存为多种格式时（同目录同名），只索引一种
+        files = {}
+        for path in directory.rglob("*"):
+            suffix = path.suffix.lower()
+            if suffix in STORY_SUFFIXES and path.name != INDEX_FILE and path.is_file():
+                key = path.with_suffix("")
+                if key not in files or STORY_SUFFIXES.index(suffix) < STORY_SUFFIXES.index(files[key].suffix.lower()):
+                    files[key] = path
+
+        seen = set()
+        for path in sorted(files.values()):
+            resolved = str(path.resolve())
+            if known.get(resolved) == path.stat().st_mtime:
+                seen.add(resolved)
+                stats["unchanged"] += 1
+                continue
+            try:
+                title, chapters = read_story_file(path)
+            except (OSError, ValueError) as e:
+                print(f"警告: 无法读取 {path}: {e}")
+                seen.add(resolved)
+                continue
+            if not chapters:
+                # 不是生成的故事（如分析结果），不建文档；以前索引过的随后删除
+                stats["skipped"] += 1
+                continue
+            seen.add(resolved)
+            stats["chapters"] += self.add_document(path, title, chapters)
+            stats["indexed"] += 1
+
+        root = str(directory.resolve()) + os.sep
+        for path in known:
+            if path not in seen and path.startswith(root):
+                self.remove_document(Path(path))
+                stats["removed"] += 1
+        return stats
+
+    # ---- 检索 ----
+
+    @staticmethod
+    def _is_prefix_term(term: str) -> bool:
+        """中文单字：按以该字开头的词查找"""
+        return len(term) == 1 and not term.isascii()
+
+    def _frequency(self, term: str) -> int:
+        """包含检索词的章节数（主键范围计数）"""
+        if self._is_prefix_term(term):
+            return self.conn.execute("SELECT COUNT(*) FROM postings WHERE term >= ? AND term < ?",
+                                     (term, term + "\U0010ffff")).fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+
+    def _candidates(self, terms: List[str]) -> sqlite3.Cursor:
+        """同时包含各检索词的章节，新索引的在前
+
+        以最少见的词为驱动，其余词对每个候选章节做一次主键查找，全部在SQLite中完成；
+        结果按章节编号倒序逐行读取，取够结果即停止。中文单字只在没有其他词时用于查找，
+        否则只在核对原文时检查。
+        """
+        exact = [term for term in terms if not self._is_prefix_term(term)]
+        if not exact:
+            term = min(terms, key=self._frequency)
+            return self.conn.execute(
+                "SELECT chapter_id, SUM(count) FROM postings WHERE term >= ? AND term < ? "
+                "GROUP BY chapter_id ORDER BY chapter_id DESC", (term, term + "\U0010ffff")
+            )
+
+        exact.sort(key=self._frequency)
+        joins = "".join(f" JOIN postings p{i} ON p{i}.term = ? AND p{i}.chapter_id = p0.chapter_id"
+                        for i in range(1, len(exact)))
+        score = " + ".join(f"p{i}.count" for i in range(len(exact)))
+        return self.conn.execute(
+            f"SELECT p0.chapter_id, {score} FROM postings p0{joins} "
+            f"WHERE p0.term = ? ORDER BY p0.chapter_id DESC",
+            exact[1:] + exact[:1]
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """检索，返回包含全部检索词的章节（含文件、标题、命中次数和摘要），新索引的在前"""
+        words = [word for word in query.split() if TOKEN_PATTERN.search(word)]
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        hits = []
+        for chapter_id, score in self._candidates(terms):
+            row = self.conn.execute(
+                "SELECT d.path, d.title, c.number, c.title, c.content FROM chapters c "
+                "JOIN documents d ON d.doc_id = c.doc_id WHERE c.chapter_id = ?", (chapter_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            path, story_title, number, title, content = row
+            content = zlib.decompress(content).decode('utf-8')
+            text = f"{title}\n{content}".lower()
+            if not all(word.lower() in text for word in words):
+                continue
+            hits.append({
+                "path": path,
+                "story": story_title,
+                "chapter": number,
+                "title": title,
+                "score": score,
+                "snippet": _snippet(content, words[0] if words else query)
+            })
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        """文件数、章节数、检索词条数"""
+        conn = self.conn
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+            "chapters": conn.execute("SELECT COUNT(*) FROM chapters").fetchone()[0],
+            "postings": conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+        }
+
+    def close(self):
+        """关闭数据库"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 连接不能传给其他进程，到达后重新打开
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _snippet(content: str, word: str, width: int = 30) -> str:
+    """检索词附近的一段正文"""
+    position = content.lower().find(word.lower())
+    if position < 0:
+        position = 0
+    start = max(0, position - width)
+    end = min(len(content), position + len(word) + width)
+    text = content[start:end].replace("\n", " ")
+    return ("…" if start > 0 else "") + text + ("…" if end < len(content) else "")
+
+
+class SearchIndexSink(StorySink):
+    """把逐章写出的故事同步写入检索索引（与文件输出器一起用 TeeSink 组合）"""
+
+    def __init__(self, index: SearchIndex, output_file: Path):
+        super().__init__(output_file)
+        self.index = index
+        self._doc_id = None
+
+    def open(self, story: Dict):
+        self._doc_id = self.index.begin_document(self.output_file, story.get("title"))
+
+    def write_chapter(self, chapter: Dict):
+        self.chapter_count += 1
+        self.index.add_chapter(self._doc_id, chapter.get("number", self.chapter_count),
+                               chapter.get("title", ""), chapter.get("content", ""))
+
+    def close(self):
+        if self._doc_id is None:
+            return
+        self.index.finish_document(self._doc_id, self.output_file)
+        self._doc_id = None
+
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+故事存档读取模块
+以内存映射方式打开已保存的故事（JSON / JSONL / .story容器），按章读取：
+第一次打开时扫描一遍文件，把每章的字节范围、标题和字数写入旁边的索引文件，
+之后列目录只读索引，读取单章只解码该章所在的字节范围，不把整个文件读入内存
+"""
+
+import re
+import json
+import mmap
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from story_container import CONTAINER_SUFFIX, StoryContainer
+
+
+# 索引文件：与存档同名，追加扩展名
+INDEX_SUFFIX = ".idx"
+
+# 索引格式版本，格式变化时旧索引自动重建
+INDEX_VERSION = 1
+
+# JSON结构扫描：字符串（后跟冒号时为键名）或括号；字符串整体由正则在C层跳过
+JSON_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"(\s*:)?|[\[\]{}]')
+
+
+def _map_file(path: Path) -> Optional[mmap.mmap]:
+    """只读映射整个文件；空文件无法映射，返回None"""
+    with open(path, 'rb') as f:
+        if f.seek(0, 2) == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _chapter_entry(chapter: Dict, number: int, start: int, end: int) -> Dict:
+    """索引中的一章：序号、标题、字数和字节范围"""
+    return {
+        "number": chapter.get("number", number),
+        "title": chapter.get("title", f"第{number}章"),
+        "word_count": chapter.get("word_count", len(chapter.get("content", ""))),
+        "start": start,
+        "end": end
+    }
+
+
+def scan_json(data) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+    """扫描JSON存档，返回 (chapters数组的字节范围, 每章对象的字节范围)
+
+    只识别顶层对象的 "chapters" 键；字符串内容由正则整体跳过，不逐字节处理。
+    """
+    depth = 0
+    key = None
+    array = None
+    spans = []
+    chapter_start = None
+
+    for match in JSON_TOKEN.finditer(data):
+        token = data[match.start():match.start() + 1]
+        if token == b'"':
+            if depth == 1 and match.group(1):
+                key = data[match.start():match.start(1)]
+            continue
+
+        if token in (b'{', b'['):
+            if depth == 1 and token == b'[' and key == b'"chapters"' and array is None:
+                array = [match.start(), None]
+            elif depth == 2 and token == b'{' and array is not None and array[1] is None:
+                chapter_start = match.start()
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 2 and chapter_start is not None:
+            spans.append((chapter_start, match.end()))
+            chapter_start = None
+        elif depth == 1 and array is not None and array[1] is None:
+            array[1] = match.end()
+        elif depth == 0:
+            break
+
+    if array is None or array[1] is None:
+        raise ValueError("JSON存档中没有完整的chapters数组")
+    return (array[0], array[1]), spans
+
+
+class StoryArchive:
+    """已保存故事的随机读取器
+
+    用法：
+        with StoryArchive.open("workspace/修仙传奇.json") as story:
+            print(story.chapter_titles()[:3])   # 只读索引
+            chapter = story.chapter(42)         # 只解码第42章
+
+    .story 容器文件自带目录，open() 直接返回 StoryContainer（接口相同）。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.suffix = self.path.suffix.lower()
+        if self.suffix not in (".json", ".jsonl"):
+            raise ValueError(f"不支持的存档格式: {self.path}")
+        self._map = _map_file(self.path)
+        self._header: Optional[Dict] = None
+        try:
+            self._index = self._load_index()
+        except Exception:
+            self.close()
+            raise
+        self.toc: List[Dict] = self._index["chapters"]
+
+    @classmethod
+    def open(cls, path: Path):
+        """按扩展名打开存档：.story 为容器，.json / .jsonl 为内存映射存档"""
+        path = Path(path)
+        if path.suffix.lower() == CONTAINER_SUFFIX:
+            return StoryContainer.open(path)
+        return cls(path)
+
+    @property
+    def index_file(self) -> Path:
+        return self.path.with_name(self.path.name + INDEX_SUFFIX)
+
+    def _load_index(self) -> Dict:
+        """读取索引；文件大小或修改时间变化时重新扫描"""
+        stat = self.path.stat()
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if (index.get("version") == INDEX_VERSION and index.get("size") == stat.st_size
+                    and index.get("mtime_ns") == stat.st_mtime_ns):
+                return index
+        except (OSError, ValueError):
+            pass
+
+        index = self._build_index()
+        index.update({"version": INDEX_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        try:
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False)
+        except OSError:
+            pass  # 目录不可写时只在内存中使用索引
+        return index
+
+    def _build_index(self) -> Dict:
+        """扫描一遍存档，逐章解码一次，记录字节范围、标题和字数"""
+        if self._map is None:
+            raise ValueError(f"存档文件为空: {self.path}")
+        if self.suffix == ".jsonl":
+            return self._build_jsonl_index()
+
+        (array_start, array_end), spans = scan_json(self._map)
+        chapters = [_chapter_entry(json.loads(self._map[start:end]), number, start, end)
+                    for number, (start, end) in enumerate(spans, 1)]
+        header = self._decode_header(array_start, array_end)
+        return {"title": self._story_title(header), "header": [array_start, array_end], "chapters": chapters}
+
+    def _build_jsonl_index(self) -> Dict:
+        """JSONL：故事信息行和每个章节行的字节范围"""
+        data = self._map
+        header = None
+        chapters = []
+        position = 0
+        while position < len(data):
+            end = data.find(b"\n", position)
+            end = len(data) if end < 0 else end
+            line = data[position:end]
+            if line.strip():
+                record = json.loads(line)
+                if record.get("type") == "story":
+                    header = [position, end]
+                    title = self._story_title(record)
+                elif record.get("type") == "chapter":
+                    chapters.append(_chapter_entry(record, len(chapters) + 1, position, end))
+            position = end + 1
+        if header is None:
+            raise ValueError(f"JSONL存档缺少故事信息行: {self.path}")
+        return {"title": title, "header": header, "chapters": chapters}
+
+    def _decode_header(self, start: int, end: int) -> Dict:
+        """故事信息：JSON去掉chapters数组内容后解码，JSONL解码第一行"""
+        if self.suffix == ".jsonl":
+            header = json.loads(self._map[start:end])
+            header.pop("type", None)
+            return header
+        header = json.loads(self._map[:start] + b"[]" + self._map[end:])
+        header.pop("chapters", None)
+        return header
+
+    @staticmethod
+    def _story_title(header: Dict) -> Optional[str]:
+        """标题（简化版的JSON没有顶层title，取framework中的标题）"""
+        return header.get("title") or header.get("framework", {}).get("title")
+
+    @property
+    def header(self) -> Dict:
+        """故事信息（不含chapters），第一次访问时解码"""
+        if self._header is None:
+            self._header = self._decode_header(*self._index["header"])
+        return self._header
+
+    @property
+    def title(self) -> Optional[str]:
+        return self._index.get("title")
+
+    def chapter_titles(self) -> List[Dict]:
+        """目录：每章的序号、标题和字数（不读正文）"""
+        return [{"number": entry["number"], "title": entry["title"], "word_count": entry["word_count"]}
+                for entry in self.toc]
+
+    def chapter(self, number: int) -> Dict:
+        """第number章（从1开始）"""
+        if not 1 <= number <= len(self.toc):
+            raise IndexError(f"章节不存在: {number}")
+        entry = self.toc[number - 1]
+        record = json.loads(self._map[entry["start"]:entry["end"]])
+        record.pop("type", None)
+        return record
+
+    def chapters(self) -> Iterator[Dict]:
+        """按顺序逐章读取"""
+        for number in range(1, len(self.toc) + 1):
+            yield self.chapter(number)
+
+    def story(self) -> Dict:
+        """完整的故事字典"""
+        story = dict(self.header)
+        story["chapters"] = list(self.chapters())
+        return story
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __len__(self) -> int:
+        return len(self.toc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
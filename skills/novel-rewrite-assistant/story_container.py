@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+紧凑故事容器模块
+一个故事保存为一个二进制文件：故事信息单独压缩，章节按顺序合并成若干压缩数据块，
+文件末尾是目录（数据块偏移表，每章所在的数据块、位置、标题和字数）；
+读取单章只需读目录和该章所在的数据块，Markdown / 纯文本 / JSON 等格式在需要时由容器导出
+"""
+
+import json
+import zlib
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# 文件扩展名
+CONTAINER_SUFFIX = ".story"
+
+# 文件头：魔数、格式版本、压缩方式
+MAGIC = b"NRSTORY\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sBB")
+
+# 文件尾：目录位置、目录长度、魔数
+TRAILER = struct.Struct("<QI8s")
+
+# 压缩方式编号
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+# 相邻章节合并压缩，每个数据块解压后约16KB；读取单章只解压所在的数据块
+BLOCK_SIZE = 16 * 1024
+
+# zlib预置字典最长32KB
+ZLIB_DICT_SIZE = 32 * 1024
+
+
+def default_codec() -> str:
+    """安装了zstandard时用zstd，否则用zlib"""
+    return "zstd" if zstandard is not None else "zlib"
+
+
+class _Codec:
+    """数据块压缩/解压，可带预置字典"""
+
+    def __init__(self, codec_id: int):
+        if codec_id == CODEC_ZSTD and zstandard is None:
+            raise ValueError("该文件使用zstd压缩，需要安装zstandard")
+        if codec_id not in (CODEC_ZLIB, CODEC_ZSTD):
+            raise ValueError(f"未知的压缩方式: {codec_id}")
+        self.codec_id = codec_id
+
+    def _zstd_dict(self, zdict: bytes):
+        if not zdict:
+            return None
+        return zstandard.ZstdCompressionDict(zdict, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+    def compress(self, data: bytes, zdict: bytes = b"") -> bytes:
+        if self.codec_id == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=19, dict_data=self._zstd_dict(zdict)).compress(data)
+        if zdict:
+            compressor = zlib.compressobj(9, zdict=zdict[-ZLIB_DICT_SIZE:])
+        else:
+            compressor = zlib.compressobj(9)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes, zdict: bytes = b"") -> bytes:
+        if self.codec_id == CODEC_ZSTD:
+            try:
+                return zstandard.ZstdDecompressor(dict_data=self._zstd_dict(zdict)).decompress(data)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"数据块损坏: {e}")
+        if zdict:
+            decompressor = zlib.decompressobj(zdict=zdict[-ZLIB_DICT_SIZE:])
+        else:
+            decompressor = zlib.decompressobj()
+        try:
+            return decompressor.decompress(data) + decompressor.flush()
+        except zlib.error as e:
+            raise ValueError(f"数据块损坏: {e}")
+
+
+def _encode(record) -> bytes:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode(data: bytes):
+    return json.loads(data.decode("utf-8"))
+
+
+class StoryContainerWriter:
+    """容器写入器：先写故事信息，再逐章追加，关闭时写目录
+
+    同一故事的章节由同一批模板生成，彼此高度相似，逐章单独压缩效果很差：
+    相邻章节凑满 BLOCK_SIZE 后合并压缩为一个数据块，第一个数据块以故事信息为预置字典，
+    其余数据块以"故事信息 + 第一个数据块"为预置字典。
+
+    用法：
+        with StoryContainerWriter(path) as writer:
+            writer.open(story)          # 故事信息（不含chapters）
+            for chapter in chapters:
+                writer.add_chapter(chapter)
+    """
+
+    def __init__(self, output_file: Path, codec: Optional[str] = None):
+        self.output_file = Path(output_file)
+        self.codec_name = codec or default_codec()
+        if self.codec_name not in CODEC_NAMES:
+            raise ValueError(f"不支持的压缩方式: {self.codec_name}")
+        self._codec = _Codec(CODEC_NAMES[self.codec_name])
+        self._file = None
+        self._header = b""
+        self._dict = b""
+        self._metadata = None
+        self._blocks: List[List[int]] = []
+        self._chapters: List[Dict] = []
+        self._pending = bytearray()
+
+    def open(self, story: Dict):
+        """创建文件，写入文件头和故事信息"""
+        self._header = _encode({key: value for key, value in story.items() if key != "chapters"})
+        self._dict = self._header
+        self._file = open(self.output_file, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, self._codec.codec_id))
+        self._metadata = self._write(self._codec.compress(self._header))
+
+    def add_chapter(self, chapter: Dict):
+        """追加一章，所在数据块凑满后写入文件"""
+        record = _encode(chapter)
+        number = len(self._chapters) + 1
+        self._chapters.append({
+            "number": chapter.get("number", number),
+            "title": chapter.get("title", f"第{number}章"),
+            "word_count": chapter.get("word_count", len(chapter.get("content", ""))),
+            "block": len(self._blocks),
+            "start": len(self._pending),
+            "end": len(self._pending) + len(record)
+        })
+        self._pending += record
+        if len(self._pending) >= BLOCK_SIZE:
+            self._write_block()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """写入未满的数据块、目录和文件尾"""
+        if self._file is None:
+            return
+        if self._pending:
+            self._write_block()
+        table = {"metadata": self._metadata, "blocks": self._blocks, "chapters": self._chapters}
+        offset, length = self._write(self._codec.compress(_encode(table)))
+        self._file.write(TRAILER.pack(offset, length, MAGIC))
+        self._file.close()
+        self._file = None
+
+    def _write_block(self):
+        block = bytes(self._pending)
+        self._blocks.append(self._write(self._codec.compress(block, self._dict)))
+        if len(self._blocks) == 1:
+            self._dict = self._header + block
+        self._pending.clear()
+
+    def _write(self, data: bytes) -> List[int]:
+        offset = self._file.tell()
+        self._file.write(data)
+        return [offset, len(data)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class StoryContainer:
+    """容器读取器
+
+    打开时只读文件头、文件尾、目录和故事信息；chapter(n) 只解压第n章所在的数据块
+    （以及作为字典的第一个数据块，读过后保留）。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._cache: Dict[int, bytes] = {}
+        try:
+            self._load()
+        except Exception:
+            self._file.close()
+            raise
+
+    @classmethod
+    def open(cls, path: Path) -> "StoryContainer":
+        return cls(path)
+
+    def _load(self):
+        magic, version, codec_id = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"不是故事容器文件: {self.path}")
+        if version > VERSION:
+            raise ValueError(f"不支持的容器版本: {version}")
+
+        self._file.seek(-TRAILER.size, 2)
+        table_offset, table_length, magic = TRAILER.unpack(self._file.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"容器文件不完整: {self.path}")
+
+        self._codec = _Codec(codec_id)
+        table = _decode(self._codec.decompress(self._read(table_offset, table_length)))
+        self._header = self._codec.decompress(self._read(*table["metadata"]))
+        self.header: Dict = _decode(self._header)
+        self.toc: List[Dict] = table["chapters"]
+        self._blocks: List[List[int]] = table["blocks"]
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def _block(self, index: int) -> bytes:
+        """解压后的数据块；保留第一个数据块（字典）和最近读取的一个"""
+        if index in self._cache:
+            return self._cache[index]
+        if index == 0:
+            zdict = self._header
+        else:
+            zdict = self._header + self._block(0)
+        block = self._codec.decompress(self._read(*self._blocks[index]), zdict)
+        for cached in list(self._cache):
+            if cached != 0:
+                del self._cache[cached]
+        self._cache[index] = block
+        return block
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.header.get("title")
+
+    def chapter_titles(self) -> List[Dict]:
+        """目录：每章的序号、标题和字数（不读正文）"""
+        return [{"number": entry["number"], "title": entry["title"], "word_count": entry["word_count"]}
+                for entry in self.toc]
+
+    def chapter(self, number: int) -> Dict:
+        """第number章（从1开始）"""
+        if not 1 <= number <= len(self.toc):
+            raise IndexError(f"章节不存在: {number}")
+        entry = self.toc[number - 1]
+        return _decode(self._block(entry["block"])[entry["start"]:entry["end"]])
+
+    def chapters(self) -> Iterator[Dict]:
+        """按顺序逐章读取"""
+        for number in range(1, len(self.toc) + 1):
+            yield self.chapter(number)
+
+    def story(self) -> Dict:
+        """完整的故事字典（与JSON输出的结构相同）"""
+        story = dict(self.header)
+        story["chapters"] = list(self.chapters())
+        return story
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self.toc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
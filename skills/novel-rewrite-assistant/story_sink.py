@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+故事输出模块
+先写入故事信息，再逐章追加正文，每章写完立即刷新到磁盘
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable
+
+from story_container import StoryContainerWriter
+from story_archive import StoryArchive
+
+
+# 只在内存中使用、不写入输出文件的章节字段（章节索引）
+INTERNAL_FIELDS = ("index",)
+
+
+def public_fields(chapter: Dict) -> Dict:
+    """去掉内部字段后的章节"""
+    return {key: value for key, value in chapter.items() if key not in INTERNAL_FIELDS}
+
+
+class StorySink:
+    """故事输出基类
+
+    用法：
+        with create_sink("markdown", path) as sink:
+            sink.open(story)            # 故事信息（不含chapters）
+            for chapter in chapters:
+                sink.write_chapter(chapter)
+    """
+
+    def __init__(self, output_file: Path):
+        self.output_file = Path(output_file)
+        self.chapter_count = 0
+        self._file = None
+
+    def open(self, story: Dict):
+        """打开文件并写入故事信息"""
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+        self._write_header(story)
+        self._file.flush()
+
+    def write_chapter(self, chapter: Dict):
+        """追加一章并刷新"""
+        self.chapter_count += 1
+        self._write_chapter(chapter, self.chapter_count)
+        self._file.flush()
+
+    def write_chapters(self, chapters: Iterable[Dict]):
+        """逐章追加"""
+        for chapter in chapters:
+            self.write_chapter(chapter)
+
+    def close(self):
+        """写入结尾并关闭文件"""
+        if self._file is None:
+            return
+        self._write_footer()
+        self._file.close()
+        self._file = None
+
+    def _write_header(self, story: Dict):
+        pass
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        raise NotImplementedError
+
+    def _write_footer(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MarkdownSink(StorySink):
+    """Markdown格式"""
+
+    def _write_header(self, story: Dict):
+        f = self._file
+
+        # 标题
+        f.write(f"# {story['title']}\n\n")
+
+        # 作者信息（简化版保存的容器没有作者和仿照风格字段）
+        metadata = story.get('metadata', {})
+        f.write(f"**作者**: {story.get('author', '未知')}\n\n")
+        f.write(f"**创作时间**: {metadata.get('created_at')}\n\n")
+        f.write(f"**参考作品**: {metadata.get('original_novel')}\n\n")
+        f.write(f"**仿照风格**: {metadata.get('style_imitated', metadata.get('style'))}\n\n")
+        if metadata.get('seed') is not None:
+            f.write(f"**随机种子**: {metadata['seed']}\n\n")
+
+        # 主角信息
+        f.write("## 主角\n\n")
+        protagonist = story['protagonist']
+        f.write(f"**姓名**: {protagonist['name']}\n\n")
+        f.write(f"**年龄**: {protagonist.get('age', '未知')}\n\n")
+        f.write(f"**性格**: {protagonist.get('personality', '未知')}\n\n")
+        f.write(f"**背景**: {protagonist.get('background', '未知')}\n\n")
+
+        # 配角信息
+        if story['supporting_characters']:
+            f.write("## 主要配角\n\n")
+            for char in story['supporting_characters'][:10]:  # 只显示前10个
+                f.write(f"### {char['name']}\n\n")
+                f.write(f"- **关系**: {char.get('relationship', '未知')}\n")
+                f.write(f"- **性格**: {char.get('personality', '未知')}\n")
+                f.write(f"- **作用**: {char.get('role', '未知')}\n\n")
+
+        # 故事大纲
+        f.write("## 故事大纲\n\n")
+        outline = story.get('story_outline', story.get('outline', {}))
+        for i, point in enumerate(outline.get('main_plot_points', []), 1):
+            f.write(f"{i}. {point}\n")
+        f.write("\n")
+
+        # 章节内容
+        f.write("## 正文\n\n")
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        self._file.write(f"### 第{number}章 {chapter.get('title', f'第{number}章')}\n\n")
+        self._file.write(f"{chapter.get('content', '')}\n\n")
+
+
+class TextSink(StorySink):
+    """纯文本格式"""
+
+    def _write_header(self, story: Dict):
+        self._file.write(f"{story['title']}\n")
+        self._file.write("=" * 50 + "\n\n")
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        self._file.write(f"第{number}章 {chapter.get('title', f'第{number}章')}\n")
+        self._file.write("-" * 50 + "\n\n")
+        self._file.write(f"{chapter.get('content', '')}\n\n")
+
+
+class JsonlSink(StorySink):
+    """JSONL格式：第一行为故事信息，之后每行一章"""
+
+    def _write_header(self, story: Dict):
+        self._write_line(dict(story, type="story"))
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        self._write_line(dict(public_fields(chapter), type="chapter"))
+
+    def _write_line(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class JsonSink(StorySink):
+    """JSON格式：chapters数组逐章写入，关闭时补全结尾"""
+
+    def _write_header(self, story: Dict):
+        header = json.dumps(story, ensure_ascii=False, indent=2)
+        # 去掉结尾的 "}"，接着写 chapters 数组
+        body = header[:header.rindex('}')].rstrip()
+        separator = "," if story else ""
+        self._file.write(f'{body}{separator}\n  "chapters": [')
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        text = json.dumps(public_fields(chapter), ensure_ascii=False, indent=2).replace("\n", "\n    ")
+        self._file.write(("," if number > 1 else "") + "\n    " + text)
+
+    def _write_footer(self):
+        self._file.write("\n  ]\n}\n" if self.chapter_count else "]\n}\n")
+
+
+class ContainerSink(StorySink):
+    """紧凑容器格式：故事信息和每章分别压缩，可按章读取，其他格式由容器导出"""
+
+    def open(self, story: Dict):
+        self._file = StoryContainerWriter(self.output_file)
+        self._file.open(story)
+
+    def _write_chapter(self, chapter: Dict, number: int):
+        self._file.add_chapter(public_fields(chapter))
+
+
+class TeeSink(StorySink):
+    """把同一个故事依次交给多个输出器（如文件输出和检索索引）"""
+
+    def __init__(self, *sinks: StorySink):
+        super().__init__(sinks[0].output_file)
+        self.sinks = sinks
+
+    def open(self, story: Dict):
+        for sink in self.sinks:
+            sink.open(story)
+
+    def write_chapter(self, chapter: Dict):
+        self.chapter_count += 1
+        for sink in self.sinks:
+            sink.write_chapter(chapter)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+# 输出格式与文件类型
+SINKS = {
+    "markdown": MarkdownSink,
+    "txt": TextSink,
+    "json": JsonSink,
+    "jsonl": JsonlSink,
+    "story": ContainerSink
+}
+
+
+def create_sink(output_format: str, output_file: Path) -> StorySink:
+    """按输出格式创建输出器"""
+    return SINKS[output_format](output_file)
+
+
+def export_story(source_file: Path, output_format: str, output_file: Path) -> int:
+    """把已保存的故事（容器 / JSON / JSONL）导出为其他格式，逐章读取写入，返回章节数"""
+    with StoryArchive.open(source_file) as archive, create_sink(output_format, output_file) as sink:
+        # 简化版的JSON没有顶层标题，补上framework中的标题
+        sink.open(dict(archive.header, title=archive.title))
+        sink.write_chapters(archive.chapters())
+    return sink.chapter_count
@@ -4,63 +4,65 @@
 仿照参考小说创作新故事
 """
 
+import os
 import random
 import re
-from typing import Dict, List
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+from rng import RngContext
+from template_engine import TemplateLibrary
+from chapter_store import ChapterStore
+from relationship_graph import RelationshipGraph
+from chapter_index import ChapterIndexer, key_events
+
+
+# 工作进程内的创作器和本次创作的公共参数（每个进程只初始化一次）
+_worker_writer = None
+_worker_context = None
+
+
+def _init_worker(writer: "StoryWriter", context: Tuple):
+    """工作进程初始化"""
+    global _worker_writer, _worker_context
+    _worker_writer = writer
+    _worker_context = context
+
+
+def _write_chapter_task(chapter_num: int, cast: List[Dict]) -> Dict:
+    """在工作进程中创作一章"""
+    return _worker_writer._write_chapter(chapter_num, cast, *_worker_context)
+
+
+# 结局章节出场的配角类型、中间章节每三章才出场一次的配角类型
+FINALE_TYPES = ("朋友", "恋人", "伙伴")
+ANTAGONIST_TYPES = ("反派", "对手")
+
 
 class StoryWriter:
     """故事创作器"""
     
-    def __init__(self, config: Dict):
+    # 章节生成逻辑或模板变化时递增，已缓存的章节随之失效
+    WRITER_VERSION = "1.1.0"
+    
+    def __init__(self, config: Dict, rng: Optional[RngContext] = None,
+                 chapter_store: Optional[ChapterStore] = None):
         self.config = config
         
-        # 场景模板
-        self.scene_templates = {
-            "玄幻": ["宗门", "山洞", "森林", "城镇", "秘境", "战场", "宫殿", "山谷"],
-            "都市": ["公司", "咖啡厅", "公园", "家里", "餐厅", "街道", "商场", "学校"],
-            "言情": ["校园", "海边", "餐厅", "家里", "公园", "电影院", "商场", "旅行地"],
-            "科幻": ["太空站", "实验室", "飞船", "未来城市", "外星基地", "虚拟世界", "战场"]
-        }
+        # 随机数上下文（大纲、每一章各用独立的随机数流）
+        self.rng = rng or RngContext.from_config(config)
+        
+        # 已生成章节的缓存（可选），输入不变的章节不再重新生成
+        self.chapter_store = chapter_store
+        
+        # 场景、情节、对话、描写等模板（加载时预解析）
+        self.templates = TemplateLibrary.from_config(config)
         
-        # 情节模板
-        self.plot_templates = [
-            "遇到困难，努力克服",
-            "发现秘密，揭开真相", 
-            "遭遇背叛，重新振作",
-            "获得奇遇，实力提升",
-            "面对选择，做出决定",
-            "遭遇危机，化险为夷",
-            "结识新友，共同成长",
-            "挑战强敌，证明自己",
-            "经历考验，获得认可",
-            "陷入困境，寻找出路"
-        ]
-        
-        # 对话模板
-        self.dialogue_templates = [
-            "「{char1}，你终于来了。」{char2}说道。",
-            "{char1}看着{char2}，问道：「你为什么要这样做？」",
-            "「不用担心，」{char2}安慰道，「一切都会好起来的。」",
-            "{char1}摇了摇头：「不，这件事没有这么简单。」",
-            "「相信我，」{char2}坚定地说，「我们一定能成功。」",
-            "{char1}叹了口气：「也许你是对的。」",
-            "「小心！」{char2}突然喊道。",
-            "{char1}微微一笑：「我早就料到了。」"
-        ]
-        
-        # 描写模板
-        self.description_templates = [
-            "阳光透过{scene}的窗户洒进来，照亮了整个房间。",
-            "{scene}里弥漫着一种神秘的气氛。",
-            "站在{scene}中央，{char}感受到一股强大的力量。",
-            "{scene}的景色美得令人窒息。",
-            "在{scene}中，时间仿佛静止了。",
-            "{scene}里充满了各种奇怪的声音。",
-            "走进{scene}，{char}立刻被眼前的景象震撼了。",
-            "{scene}的空气中飘散着淡淡的花香。"
-        ]
+        # 章节索引（句子位置、关键事件、角色出现位置）
+        self.indexer = ChapterIndexer()
     
     def generate_outline(self, 
                         analysis_result: Dict,
@@ -83,10 +85,12 @@ class StoryWriter:
         )
         
         # 生成主要情节点
-        plot_points = self._generate_plot_points(main_plot, chapter_count, genre)
+        plot_points = self._generate_plot_points(main_plot, chapter_count, genre,
+                                                 self.rng.stream("outline", "plot_points"))
         
         # 生成章节标题
-        chapter_titles = self._generate_chapter_titles(chapter_count, genre)
+        chapter_titles = self._generate_chapter_titles(chapter_count, genre,
+                                                       self.rng.stream("outline", "chapter_titles"))
         
         # 构建大纲
         outline = {
@@ -106,7 +110,8 @@ class StoryWriter:
         
         return outline
     
-    def _generate_plot_points(self, main_plot: str, chapter_count: int, genre: str) -> List[str]:
+    def _generate_plot_points(self, main_plot: str, chapter_count: int, genre: str,
+                              rng: random.Random) -> List[str]:
         """生成主要情节点"""
         plot_points = []
         
@@ -126,29 +131,23 @@ class StoryWriter:
         plot_points.append(f"第{chapter_count}章：结局，{main_plot}的收尾")
         
         # 添加随机情节点
-        additional_points = random.sample(self.plot_templates, min(3, len(self.plot_templates)))
+        plots = self.templates.words("plots")
+        additional_points = rng.sample(plots, min(3, len(plots)))
         for point in additional_points:
-            chapter = random.randint(2, chapter_count - 1)
+            chapter = rng.randint(2, chapter_count - 1)
             plot_points.append(f"第{chapter}章左右：{point}")
         
         return plot_points
     
-    def _generate_chapter_titles(self, chapter_count: int, genre: str) -> List[str]:
+    def _generate_chapter_titles(self, chapter_count: int, genre: str, rng: random.Random) -> List[str]:
         """生成章节标题"""
         titles = []
         
-        # 根据题材选择标题风格
-        if genre in ["玄幻", "仙侠", "武侠"]:
-            title_words = ["入门", "试炼", "突破", "奇遇", "挑战", "决战", 
-                          "传承", "秘境", "宗门", "长老", "师兄", "师姐"]
-        elif genre in ["都市", "现代"]:
-            title_words = ["初遇", "合作", "竞争", "危机", "转机", "成功",
-                          "选择", "挑战", "机遇", "成长", "突破", "成就"]
-        elif genre in ["言情", "爱情"]:
-            title_words = ["相遇", "相识", "相知", "相爱", "误会", "和解",
-                          "考验", "承诺", "离别", "重逢", "永恒", "幸福"]
+        # 根据题材选择标题风格（没有对应词表时使用默认词表）
+        if self.templates.has("title_words", genre):
+            title_words = self.templates.words("title_words", genre)
         else:
-            title_words = ["开始", "发展", "转折", "高潮", "结局", "新生"]
+            title_words = self.templates.words("title_words", "默认")
         
         for i in range(1, chapter_count + 1):
             if i == 1:
@@ -157,9 +156,9 @@ class StoryWriter:
                 titles.append("终章")
             else:
                 # 随机组合标题
-                word1 = random.choice(title_words)
-                word2 = random.choice(title_words)
-                if random.random() > 0.5:
+                word1 = rng.choice(title_words)
+                word2 = rng.choice(title_words)
+                if rng.random() > 0.5:
                     title = f"{word1}{word2}"
                 else:
                     title = word1
@@ -173,251 +172,316 @@ class StoryWriter:
                       protagonist: Dict,
                       supporting_chars: List[Dict]) -> List[Dict]:
         """创作章节内容"""
-        chapters = []
+        return list(self.iter_chapters(outline, analysis_result, protagonist, supporting_chars))
+    
+    def iter_chapters(self,
+                      outline: Dict,
+                      analysis_result: Dict,
+                      protagonist: Dict,
+                      supporting_chars: List[Dict]) -> Iterator[Dict]:
+        """按章节顺序逐章产出，已产出的章节不被保留
+        
+        多进程时同时在途的章节不超过 2 * workers；命中章节缓存的章节直接产出。
+        """
         chapter_count = outline["total_chapters"]
-        genre = outline["genre"]
         
         # 获取写作风格参考
         writing_style = analysis_result.get("writing_style", {})
         style_type = writing_style.get("style_type", "平衡型")
         
-        print(f"开始创作{chapter_count}章内容，风格：{style_type}")
-        
-        for i in range(1, chapter_count + 1):
-            chapter_title = outline["chapter_titles"][i-1] if i-1 < len(outline["chapter_titles"]) else f"第{i}章"
-            
-            print(f"  创作第{i}章: {chapter_title}")
-            
-            # 生成章节内容
-            content = self._write_chapter_content(
-                chapter_num=i,
-                total_chapters=chapter_count,
-                protagonist=protagonist,
-                supporting_chars=supporting_chars,
-                genre=genre,
-                style_type=style_type,
-                outline=outline
-            )
-            
-            chapter = {
-                "number": i,
-                "title": chapter_title,
-                "content": content,
-                "word_count": len(content),
-                "key_events": self._extract_key_events(content)
-            }
+        # 每章使用由随机数上下文和章节号派生的随机数流，结果与并行进程数无关
+        context = (outline, protagonist, style_type)
+        
+        # 出场配角按关系图预先分组，每章只做一次选择
+        cast_pools = self._cast_pools(protagonist, supporting_chars)
+        
+        # 并行进程数，0表示使用全部CPU核心
+        workers = self.config["writing"].get("workers", 1)
+        if not workers:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, chapter_count))
+        
+        print(f"开始创作{chapter_count}章内容，风格：{style_type}" + (f"（{workers}个进程）" if workers > 1 else ""))
+        
+        # 每一项为 (章节号, 缓存键, 已完成的章节或进行中的任务)
+        pending = deque()
+        reused = 0
+        started = time.perf_counter()
+        window = workers * 2
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                           initargs=(self, context))
+        
+        try:
+            for i in range(1, chapter_count + 1):
+                cast = self._select_cast(i, chapter_count, cast_pools)
+                key = None
+                cached = None
+                if self.chapter_store is not None:
+                    key = self.chapter_store.fingerprint(self._chapter_inputs(i, cast, *context))
+                    cached = self.chapter_store.get(key)
+                
+                if cached is not None:
+                    reused += 1
+                    pending.append((i, None, cached))
+                elif executor is None:
+                    pending.append((i, key, self._write_chapter(i, cast, *context)))
+                else:
+                    pending.append((i, key, executor.submit(_write_chapter_task, i, cast)))
+                
+                while pending and (executor is None or len(pending) >= window or not hasattr(pending[0][2], "result")):
+                    yield self._finish_chapter(pending.popleft(), outline)
             
-            chapters.append(chapter)
+            while pending:
+                yield self._finish_chapter(pending.popleft(), outline)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        elapsed = time.perf_counter() - started
+        rate = chapter_count / elapsed if elapsed > 0 else float("inf")
+        print(f"创作完成: {chapter_count}章，{rate:.1f}章/秒")
+        if self.chapter_store is not None:
+            print(f"复用已生成的章节: {reused}/{chapter_count}")
+    
+    def _finish_chapter(self, item: Tuple, outline: Dict) -> Dict:
+        """等待章节完成，写入缓存并补上章节号和标题"""
+        chapter_num, key, result = item
+        fields = result.result() if hasattr(result, "result") else result
+        if key is not None:
+            self.chapter_store.put(key, fields)
+        
+        chapter = {"number": chapter_num, "title": self._chapter_title(outline, chapter_num)}
+        chapter.update(fields)
+        print(f"  创作第{chapter_num}章: {chapter['title']}")
+        return chapter
+    
+    def _chapter_title(self, outline: Dict, chapter_num: int) -> str:
+        """章节标题"""
+        titles = outline["chapter_titles"]
+        return titles[chapter_num-1] if chapter_num-1 < len(titles) else f"第{chapter_num}章"
+    
+    def _cast_pools(self, protagonist: Dict, supporting_chars: List[Dict]) -> Dict[str, List[Dict]]:
+        """按与主角的关系类型把配角分组（一次遍历主角的邻居）"""
+        graph = RelationshipGraph.from_cast(protagonist, supporting_chars)
+        name = protagonist["name"]
+        everyone = graph.neighbor_characters(name)
+        return {
+            "opening": everyone[:1],
+            "finale": graph.neighbor_characters(name, kinds=FINALE_TYPES)[:2],
+            "regular": graph.neighbor_characters(name, exclude=ANTAGONIST_TYPES),
+            "all": everyone
+        }
+    
+    def _select_cast(self, chapter_num: int, total_chapters: int, cast_pools: Dict[str, List[Dict]]) -> List[Dict]:
+        """选择本章出场的配角（中间章节的随机选择使用独立的随机数流）"""
+        if chapter_num == 1:
+            # 开篇引入第一个配角
+            return cast_pools["opening"]
+        
+        if chapter_num == total_chapters:
+            # 结局与主要配角互动
+            return cast_pools["finale"]
+        
+        # 中间章节：反派、对手每三章出场一次
+        available_chars = cast_pools["all"] if chapter_num % 3 == 0 else cast_pools["regular"]
+        if not available_chars:
+            return []
+        return [self.rng.stream("cast", chapter_num).choice(available_chars)]
+    
+    def _chapter_inputs(self, chapter_num: int, cast: List[Dict], outline: Dict,
+                        protagonist: Dict, style_type: str) -> Dict:
+        """本章生成结果所依赖的全部输入（用于计算缓存指纹）"""
+        total_chapters = outline["total_chapters"]
+        return {
+            "writer": self.WRITER_VERSION,
+            "templates": self.templates.fingerprint,
+            "seed": self.rng.seed,
+            "chapter": chapter_num,
+            "total_chapters": total_chapters,
+            "plot_points": self._chapter_plot_points(outline, chapter_num),
+            "ending": outline.get("ending") if chapter_num == total_chapters else None,
+            "genre": outline["genre"],
+            "style_type": style_type,
+            "chapter_length": self.config["writing"].get("chapter_length", 3000),
+            "protagonist": protagonist,
+            "cast": cast
+        }
+    
+    def _chapter_plot_points(self, outline: Dict, chapter_num: int) -> List[str]:
+        """大纲中指向本章的情节点"""
+        points = []
+        for point in outline.get("main_plot_points", []):
+            match = re.match(r'第(\d+)章', point)
+            if (match and int(match.group(1)) == chapter_num) or (chapter_num == 1 and point.startswith("开篇")):
+                points.append(point)
+        return points
+    
+    def chapter_rng(self, chapter_num: int) -> random.Random:
+        """章节的随机数流（跨进程、跨运行稳定）"""
+        return self.rng.stream("chapter", chapter_num)
+    
+    def _write_chapter(self,
+                       chapter_num: int,
+                       cast: List[Dict],
+                       outline: Dict,
+                       protagonist: Dict,
+                       style_type: str) -> Dict:
+        """创作一章，返回由输入决定的字段（只依赖参数，可在任意进程中执行）"""
+        # 生成章节内容
+        content = self._write_chapter_content(
+            chapter_num=chapter_num,
+            total_chapters=outline["total_chapters"],
+            protagonist=protagonist,
+            cast=cast,
+            genre=outline["genre"],
+            style_type=style_type,
+            outline=outline,
+            rng=self.chapter_rng(chapter_num)
+        )
         
-        return chapters
+        # 一次扫描建立索引，关键事件取自索引
+        index = self.indexer.index(content, [protagonist["name"]] + [char["name"] for char in cast])
+        return {
+            "content": content,
+            "word_count": index["word_count"],
+            "key_events": key_events(content, index),
+            "index": index
+        }
+    
+    def __getstate__(self):
+        # 章节缓存只在主进程中使用（含锁，不能传给工作进程）
+        state = self.__dict__.copy()
+        state["chapter_store"] = None
+        return state
     
     def _write_chapter_content(self,
                               chapter_num: int,
                               total_chapters: int,
                               protagonist: Dict,
-                              supporting_chars: List[Dict],
+                              cast: List[Dict],
                               genre: str,
                               style_type: str,
-                              outline: Dict) -> str:
-        """创作单章内容"""
+                              outline: Dict,
+                              rng: random.Random) -> str:
+        """创作单章内容（cast为本章出场的配角）"""
+        groups = self.templates.templates
+        lines = groups["lines"]
         content_parts = []
+        append = content_parts.append
+        name = protagonist["name"]
         
         # 1. 场景描写
-        scene = self._generate_scene(genre, chapter_num)
-        scene_desc = random.choice(self.description_templates)
-        scene_desc = scene_desc.replace("{scene}", scene).replace("{char}", protagonist["name"])
-        content_parts.append(scene_desc)
+        scene = self._generate_scene(genre, chapter_num, rng)
+        values = {"name": name, "char": name, "scene": scene}
+        append(rng.choice(groups["description"]).render(values))
         
         # 2. 主角出场
-        protagonist_desc = self._describe_character(protagonist, "出场")
-        content_parts.append(protagonist_desc)
+        self._describe_character(content_parts, protagonist, "出场", rng)
         
         # 3. 根据章节位置决定内容
         if chapter_num == 1:
             # 开篇章节
-            content_parts.append(f"这是{protagonist['name']}的故事开始的地方。")
-            content_parts.append(f"{protagonist['name']}{protagonist.get('background', '')}。")
+            append(lines["opening"].render(values))
+            append(lines["origin"].render({"name": name, "background": protagonist.get("background", "")}))
             
             # 引入第一个配角
-            if supporting_chars:
-                first_char = supporting_chars[0]
-                char_desc = self._describe_character(first_char, "引入")
-                content_parts.append(char_desc)
+            if cast:
+                first_char = cast[0]
+                self._describe_character(content_parts, first_char, "引入", rng)
                 
                 # 添加对话
-                dialogue = self._generate_dialogue(protagonist["name"], first_char["name"])
-                content_parts.append(dialogue)
+                self._generate_dialogue(content_parts, name, first_char["name"], rng)
         
         elif chapter_num == total_chapters:
             # 结局章节
-            content_parts.append(f"经过漫长的旅程，{protagonist['name']}终于来到了故事的终点。")
-            content_parts.append(f"{outline.get('ending', '故事圆满结束')}。")
+            append(lines["finale"].render(values))
+            append(lines["ending"].render({"ending": outline.get("ending", "故事圆满结束")}))
             
             # 与主要配角互动
-            main_chars = [c for c in supporting_chars if c["type"] in ["朋友", "恋人", "伙伴"]]
-            if main_chars:
-                for char in main_chars[:2]:
-                    content_parts.append(f"{char['name']}走到{protagonist['name']}身边。")
-                    dialogue = self._generate_dialogue(protagonist["name"], char["name"], "结局")
-                    content_parts.append(dialogue)
+            for char in cast:
+                append(lines["approach"].render({"name": name, "char": char["name"]}))
+                self._generate_dialogue(content_parts, name, char["name"], rng, "结局")
         
         else:
             # 中间章节
-            # 选择本章的配角
-            available_chars = [c for c in supporting_chars if c["type"] not in ["反派", "对手"] or chapter_num % 3 == 0]
-            if available_chars:
-                chapter_char = random.choice(available_chars)
+            # 本章的配角
+            if cast:
+                chapter_char = cast[0]
                 
                 # 描述相遇
-                content_parts.append(f"在{scene}，{protagonist['name']}遇到了{chapter_char['name']}。")
+                append(lines["meet"].render({"name": name, "char": chapter_char["name"], "scene": scene}))
                 
                 # 添加对话
-                dialogue = self._generate_dialogue(protagonist["name"], chapter_char["name"])
-                content_parts.append(dialogue)
+                self._generate_dialogue(content_parts, name, chapter_char["name"], rng)
                 
                 # 添加情节
-                plot_template = random.choice(self.plot_templates)
-                content_parts.append(f"就在这时，{plot_template}。")
+                append(lines["plot_turn"].render({"plot": rng.choice(self.templates.words("plots"))}))
             
             # 添加一些描写
-            extra_desc = random.choice(self.description_templates)
-            extra_desc = extra_desc.replace("{scene}", scene).replace("{char}", protagonist["name"])
-            content_parts.append(extra_desc)
+            append(rng.choice(groups["description"]).render(values))
         
-        # 4. 章节结尾
+        # 4. 章节结尾：悬念或故事结尾
         if chapter_num < total_chapters:
-            # 悬念结尾
-            cliffhangers = [
-                f"然而，{protagonist['name']}并不知道，更大的挑战正在前方等待着他。",
-                f"{protagonist['name']}深吸一口气，准备迎接接下来的考验。",
-                f"就在这时，远处传来了奇怪的声音...",
-                f"{protagonist['name']}心中涌起一股不祥的预感。"
-            ]
-            content_parts.append(random.choice(cliffhangers))
+            append(rng.choice(groups["cliffhangers"]).render(values))
         else:
-            # 故事结尾
-            endings = [
-                f"故事到这里就结束了，但{protagonist['name']}的传奇仍在继续。",
-                f"{protagonist['name']}望着远方，心中充满了希望。",
-                f"这是一个结束，也是一个新的开始。",
-                f"传奇落幕，但记忆永存。"
-            ]
-            content_parts.append(random.choice(endings))
-        
-        # 组合内容
-        content = "\n\n".join(content_parts)
+            append(rng.choice(groups["endings"]).render(values))
         
         # 根据风格调整内容长度
         target_length = self.config["writing"].get("chapter_length", 3000)
-        current_length = len(content)
         
-        if current_length < target_length * 0.7:
+        # 组合内容
+        content = "\n\n".join(content_parts)
+        
+        if len(content) < target_length * 0.7:
             # 内容太短，添加更多描写
-            extra_content = self._add_extra_content(protagonist, scene, genre)
-            content += "\n\n" + extra_content
+            extra_parts = []
+            self._add_extra_content(extra_parts, values, rng)
+            content += "\n\n" + "\n\n".join(extra_parts)
         
         return content
     
-    def _generate_scene(self, genre: str, chapter_num: int) -> str:
+    def _generate_scene(self, genre: str, chapter_num: int, rng: random.Random) -> str:
         """生成场景"""
-        if genre in self.scene_templates:
-            scenes = self.scene_templates[genre]
-        else:
-            scenes = self.scene_templates["玄幻"]
+        all_scenes = self.templates.words("scenes")
+        scenes = all_scenes[genre] if genre in all_scenes else all_scenes["玄幻"]
         
-        scene = random.choice(scenes)
+        scene = rng.choice(scenes)
         
         # 根据章节添加修饰
-        modifiers = ["古老的", "神秘的", "繁华的", "寂静的", "危险的", "美丽的"]
         if chapter_num % 4 == 0:
-            scene = f"{random.choice(modifiers)}{scene}"
+            scene = f"{rng.choice(self.templates.words('scene_modifiers'))}{scene}"
         
         return scene
     
-    def _describe_character(self, character: Dict, context: str) -> str:
+    def _describe_character(self, parts: List[str], character: Dict, context: str,
+                            rng: random.Random):
         """描述角色"""
-        name = character["name"]
-        
-        if context == "出场":
-            templates = [
-                f"{name}站在那儿，{character.get('appearance', '身影挺拔')}。",
-                f"这就是{name}，{character.get('personality', '性格独特')}的{character.get('age', '年轻人')}。",
-                f"{name}出现了，{character.get('background', '来历神秘')}。"
-            ]
-        elif context == "引入":
-            templates = [
-                f"这时，{name}走了过来。",
-                f"不远处，{name}正朝这边看来。",
-                f"{name}的出现让气氛发生了变化。"
-            ]
-        else:
-            templates = [f"{name}就在那里。"]
+        groups = self.templates.get("character")
+        templates = groups[context] if context in groups else groups["其他"]
         
-        return random.choice(templates)
+        # 角色缺少的属性使用默认描述
+        values = {**self.templates.words("character_defaults"), **character}
+        parts.append(rng.choice(templates).render(values))
     
-    def _generate_dialogue(self, char1: str, char2: str, context: str = "普通") -> str:
-        """生成对话"""
-        template = random.choice(self.dialogue_templates)
+    def _generate_dialogue(self, parts: List[str], char1: str, char2: str,
+                           rng: random.Random, context: str = "普通"):
+        """生成对话（结局等上下文使用对应的模板变体）"""
+        template = rng.choice(self.templates.variant("dialogue", context))
         
         # 随机决定谁先说
-        if random.random() > 0.5:
-            dialogue = template.replace("{char1}", char1).replace("{char2}", char2)
+        if rng.random() > 0.5:
+            parts.append(template.render({"char1": char1, "char2": char2}))
         else:
             # 交换角色
-            dialogue = template.replace("{char1}", char2).replace("{char2}", char1)
-        
-        # 根据上下文调整
-        if context == "结局":
-            # 更正式、深刻的对话
-            dialogue = dialogue.replace("说道", "郑重地说道").replace("问道", "轻声问道")
-        
-        return dialogue
-    
-    def _add_extra_content(self, protagonist: Dict, scene: str, genre: str) -> str:
-        """添加额外内容"""
-        extra_parts = []
-        
-        # 添加环境描写
-        env_descriptions = [
-            f"{scene}的空气中弥漫着特殊的气息。",
-            f"阳光（或月光）洒在{scene}的每一个角落。",
-            f"{scene}里的一切都显得那么宁静（或喧嚣）。",
-            f"站在{scene}中，{protagonist['name']}能感受到时间的流逝。"
-        ]
-        extra_parts.append(random.choice(env_descriptions))
-        
-        # 添加心理描写
-        thoughts = [
-            f"{protagonist['name']}心中思绪万千。",
-            f"回忆起过往的经历，{protagonist['name']}不禁感慨。",
-            f"{protagonist['name']}思考着接下来的计划。",
-            f"一股复杂的情绪在{protagonist['name']}心中涌动。"
-        ]
-        extra_parts.append(random.choice(thoughts))
-        
-        # 添加动作描写
-        actions = [
-            f"{protagonist['name']}轻轻叹了口气。",
-            f"{protagonist['name']}握紧了拳头。",
-            f"{protagonist['name']}抬头望向远方。",
-            f"{protagonist['name']}微微一笑。"
-        ]
-        extra_parts.append(random.choice(actions))
-        
-        return "\n\n".join(extra_parts)
+            parts.append(template.render({"char1": char2, "char2": char1}))
     
-    def _extract_key_events(self, content: str) -> List[str]:
-        """提取关键事件"""
-        # 简单提取：找到包含特定关键词的句子
-        event_keywords = ["遇到", "发现", "遭遇", "获得", "面对", "挑战", "经历", "陷入"]
-        sentences = re.split(r'[。！？!?]', content)
-        
-        events = []
-        for sentence in sentences:
-            if any(keyword in sentence for keyword in event_keywords):
-                events.append(sentence.strip())
-        
-        return events[:3]  # 最多返回3个关键事件
+    def _add_extra_content(self, parts: List[str], values: Dict, rng: random.Random):
+        """添加额外内容：环境、心理、动作描写"""
+        groups = self.templates.templates
+        for group in ("environment", "thoughts", "actions"):
+            parts.append(rng.choice(groups[group]).render(values))
 
 
 # 测试代码
@@ -443,4 +507,6 @@ if __name__ == "__main__":
     print("生成的故事大纲:")
     print(f"标题: {outline['title']}")
     print(f"题材: {outline['genre']}")
-    print(f"章节数
\ No newline at end of file
+    print(f"章节数: {outline['total_chapters']}")
+    for i, title in enumerate(outline["chapter_titles"][:5], 1):
+        print(f"  {i}. {title}")
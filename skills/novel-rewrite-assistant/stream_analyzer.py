@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+流式分析模块
+逐章消费正文，增量更新写作风格与人名统计，内存占用与全书长度无关
+"""
+
+import re
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from character_extractor import CharacterExtractor, RoleClassifier, ROLE_NAMES
+
+
+# 对话标记
+DIALOGUE_PATTERN = re.compile('「|」|“|”|"|\'|说道|问道|喊道')
+
+# 句子分隔符
+SENTENCE_SPLIT = re.compile(r'[。！？!?]')
+
+# 直方图分桶上界（字符数），最后一个桶不设上界
+PARAGRAPH_BUCKETS = [20, 50, 100, 200, 500]
+SENTENCE_BUCKETS = [10, 20, 40, 80]
+
+
+def _bucket_labels(bounds: List[int]) -> List[str]:
+    labels = []
+    lower = 0
+    for upper in bounds:
+        labels.append(f"{lower}-{upper - 1}")
+        lower = upper
+    labels.append(f"{lower}+")
+    return labels
+
+
+class LengthHistogram:
+    """长度直方图，同时累计总数和总长度"""
+
+    def __init__(self, bounds: List[int]):
+        self.bounds = bounds
+        self.labels = _bucket_labels(bounds)
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.total_length = 0
+
+    def add(self, length: int):
+        self.counts[bisect_right(self.bounds, length)] += 1
+        self.total += 1
+        self.total_length += length
+
+    @property
+    def mean(self) -> float:
+        return self.total_length / self.total if self.total else 0.0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(zip(self.labels, self.counts))
+
+
+class StreamingAnalyzer:
+    """流式正文分析器
+
+    每次 feed 一章正文，只保留计数器和直方图：
+    - 对话比例：对话标记次数 / 总字符数
+    - 段落、句子长度直方图与均值
+    - 人名出现次数（姓氏自动机计数）
+    - 人名附近出现过的最高优先级身份关键词
+    """
+
+    def __init__(self, extractor: Optional[CharacterExtractor] = None,
+                 role_classifier: Optional[RoleClassifier] = None,
+                 track_names: bool = True):
+        self.track_names = track_names
+        if track_names:
+            self.extractor = extractor or CharacterExtractor()
+            self.role_classifier = role_classifier or RoleClassifier()
+
+        self.total_chars = 0
+        self.dialogue_count = 0
+        self.chunks = 0
+        self.paragraphs = LengthHistogram(PARAGRAPH_BUCKETS)
+        self.sentences = LengthHistogram(SENTENCE_BUCKETS)
+
+        self.name_counter = Counter()
+        self.name_candidates = set()
+        self.role_ranks = {}
+
+    def feed(self, text: str):
+        """消费一段正文（通常是一章）"""
+        if not text:
+            return
+
+        self.chunks += 1
+        self.total_chars += len(text)
+        self.dialogue_count += len(DIALOGUE_PATTERN.findall(text))
+
+        for line in text.split('\n'):
+            paragraph = line.strip()
+            if paragraph:
+                self.paragraphs.add(len(paragraph))
+
+        for sentence in SENTENCE_SPLIT.split(text):
+            sentence = sentence.strip()
+            if sentence:
+                self.sentences.add(len(sentence))
+
+        if self.track_names:
+            self.extractor.scan(text, self.name_counter, self.name_candidates)
+            self._tally_roles(text)
+
+    def feed_all(self, texts: Iterable[str]) -> "StreamingAnalyzer":
+        """消费整个正文生成器"""
+        for text in texts:
+            self.feed(text)
+        return self
+
+    def _tally_roles(self, text: str):
+        """以身份关键词为中心查找附近的人名
+
+        关键词远比人名稀疏，只在每个关键词前后的小窗口内匹配人名，
+        判定条件与 MentionIndex 的上下文窗口一致（前后window个字符，不跨行）。
+        """
+        window = self.role_classifier.window
+        name_pattern = self.extractor.count_pattern
+        ranks = self.role_ranks
+
+        starts, ends, hit_ranks = self.role_classifier.keyword_hits(text)
+        for keyword_start, keyword_end, rank in zip(starts, ends, hit_ranks):
+            # 人名最长4个字符，起点需落在 [keyword_end-window-4, keyword_start+window]
+            low = max(0, keyword_end - window - 4)
+            high = min(len(text), keyword_start + window + 1 + 4)
+            for match in name_pattern.finditer(text, low, high):
+                start = match.start()
+                if start > keyword_start + window:
+                    break
+                surname, given = match.group(1), match.group(2)
+                for name in (surname + given[:1], surname + given) if len(given) == 2 else (surname + given,):
+                    end = start + len(name)
+                    if keyword_start < start - window or keyword_end > end + window:
+                        continue
+                    if keyword_start < start and '\n' in text[keyword_start:start]:
+                        continue
+                    if keyword_end > end and '\n' in text[end:keyword_end]:
+                        continue
+                    if rank < ranks.get(name, len(ROLE_NAMES)):
+                        ranks[name] = rank
+
+    def writing_style(self) -> Dict:
+        """写作风格统计（覆盖已消费的全部正文）"""
+        style = {
+            "style_type": "未知",
+            "dialogue_ratio": self.dialogue_count / max(self.total_chars, 1),
+            "description_ratio": 0.0,
+            "paragraph_length_avg": self.paragraphs.mean,
+            "sentence_length_avg": self.sentences.mean,
+            "common_words": [],
+            "special_patterns": [],
+            "paragraph_length_hist": self.paragraphs.as_dict(),
+            "sentence_length_hist": self.sentences.as_dict(),
+            "sampled_chars": self.total_chars
+        }
+
+        # 判断风格类型
+        if style["dialogue_ratio"] > 0.3:
+            style["style_type"] = "对话驱动型"
+        elif style["paragraph_length_avg"] > 200:
+            style["style_type"] = "描写细腻型"
+        elif style["sentence_length_avg"] < 20:
+            style["style_type"] = "简洁明快型"
+        else:
+            style["style_type"] = "平衡型"
+
+        return style
+
+    def top_names(self, limit: int = 10, min_frequency: int = 3) -> List[Tuple[str, int]]:
+        """出现次数最多的人名"""
+        return self.extractor.top_names(self.name_counter, self.name_candidates, limit, min_frequency)
+
+    def role_of(self, name: str) -> str:
+        """人名的身份（未命中关键词为“未知”）"""
+        rank = self.role_ranks.get(name)
+        return ROLE_NAMES[rank] if rank is not None else "未知"
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+模板引擎模块
+模板加载时解析为文字段和占位段，编译成一个返回字符串的渲染函数；
+占位只支持 {名字}，格式说明、转换（如 {age:>3}、{name!r}）和空占位在加载时报错
+"""
+
+import json
+import hashlib
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+
+# 内置模板文件（与本模块同目录）
+DEFAULT_TEMPLATE_FILE = Path(__file__).parent / "templates" / "story_templates.json"
+
+
+class Template:
+    """预解析的模板
+
+    "{char1}看着{char2}" 解析为 (("", "char1"), ("看着", "char2"))，
+    每段为 (文字, 占位名)，占位名为None表示只有文字。
+    解析结果再编译成一个f-string函数 render(values)，渲染时只做一次字符串拼接。
+    """
+
+    __slots__ = ("text", "segments", "fields", "render")
+
+    def __init__(self, text: str):
+        segments = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field is not None and (not field.isidentifier() or spec or conversion):
+                # 编译出的函数只按名字取值，其他写法无法照原样渲染，不静默忽略
+                raise ValueError(f"模板占位只支持{{名字}}: {text!r}")
+            segments.append((literal, field))
+        self._setup(text, tuple(segments))
+
+    def _setup(self, text: str, segments: Tuple[Tuple[str, Optional[str]], ...]):
+        self.text = text
+        self.segments = segments
+        self.fields = frozenset(field for _, field in segments if field)
+        self.render = _compile_segments(segments)
+
+    def replace_literals(self, replacements: Dict[str, str]) -> "Template":
+        """只替换文字部分，生成新模板（占位内容不受影响）"""
+        segments = []
+        for literal, field in self.segments:
+            for old, new in replacements.items():
+                literal = literal.replace(old, new)
+            segments.append((literal, field))
+        text = "".join(literal.replace("{", "{{").replace("}", "}}") + (f"{{{field}}}" if field else "")
+                       for literal, field in segments)
+        template = Template.__new__(Template)
+        template._setup(text, tuple(segments))
+        return template
+
+    def __getstate__(self):
+        # 编译出的函数不能序列化，传给工作进程时按解析结果重新编译
+        return self.text, self.segments
+
+    def __setstate__(self, state):
+        self._setup(*state)
+
+    def __repr__(self) -> str:
+        return f"Template({self.text!r})"
+
+
+def _compile_segments(segments: Tuple[Tuple[str, Optional[str]], ...]):
+    """把解析结果编译为 values -> str 的函数
+
+    文字和占位名都作为闭包变量传入，生成的源码中只有变量名，无需转义。
+    """
+    names = []
+    constants = []
+    pieces = []
+    for i, (literal, field) in enumerate(segments):
+        if literal:
+            names.append(f"_l{i}")
+            constants.append(literal)
+            pieces.append(f"{{_l{i}}}")
+        if field is not None:
+            names.append(f"_k{i}")
+            constants.append(field)
+            pieces.append(f"{{values[_k{i}]}}")
+
+    source = "def _factory({}):\n    return lambda values: f\"{}\"\n".format(
+        ", ".join(names), "".join(pieces)
+    )
+    namespace = {}
+    exec(source, namespace)
+    return namespace["_factory"](*constants)
+
+
+class TemplateLibrary:
+    """故事模板库
+
+    从内置的 templates/story_templates.json 加载，再依次合并 writing.template_dir
+    中的 *.json（字典逐层合并，列表整体替换），新增题材只需添加数据文件。
+    所有字符串在加载时解析为 Template。
+    """
+
+    def __init__(self, data: Dict):
+        self.data = data
+        self.templates = self._compile(data)
+        self.fingerprint = hashlib.sha256(
+            json.dumps(data, ensure_ascii=False, sort_keys=True).encode('utf-8')
+        ).hexdigest()
+        self.variants = self._compile_variants(data.get("variants", {}))
+
+    @classmethod
+    def load(cls, template_dir: Optional[str] = None) -> "TemplateLibrary":
+        """加载内置模板，并合并自定义目录中的模板文件"""
+        with open(DEFAULT_TEMPLATE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if template_dir:
+            directory = Path(template_dir)
+            if not directory.is_dir():
+                print(f"警告: 模板目录不存在 {directory}")
+            for path in sorted(directory.glob("*.json")) if directory.is_dir() else []:
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        update = json.load(f)
+                    cls._compile(update)  # 先检查占位写法，有错的文件整个跳过
+                    cls._merge(data, update)
+                except (OSError, ValueError) as e:
+                    print(f"警告: 无法加载模板文件 {path}: {e}")
+
+        return cls(data)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "TemplateLibrary":
+        """按配置加载（writing.template_dir）"""
+        return cls.load(config.get("writing", {}).get("template_dir"))
+
+    @classmethod
+    def _merge(cls, base: Dict, update: Dict):
+        """字典逐层合并，其他值直接替换"""
+        for key, value in update.items():
+            if key in base and isinstance(base[key], dict) and isinstance(value, dict):
+                cls._merge(base[key], value)
+            else:
+                base[key] = value
+
+    @classmethod
+    def _compile(cls, value):
+        """把所有字符串解析为 Template"""
+        if isinstance(value, str):
+            return Template(value)
+        if isinstance(value, list):
+            return [cls._compile(item) for item in value]
+        if isinstance(value, dict):
+            return {key: cls._compile(item) for key, item in value.items()}
+        return value
+
+    def get(self, *path):
+        """按路径取模板组，如 get("character", "出场")"""
+        node = self.templates
+        for key in path:
+            node = node[key]
+        return node
+
+    def words(self, *path) -> List[str]:
+        """按路径取词表（原始字符串）"""
+        node = self.data
+        for key in path:
+            node = node[key]
+        return node
+
+    def has(self, *path) -> bool:
+        """路径是否存在"""
+        node = self.data
+        for key in path:
+            if not isinstance(node, dict) or key not in node:
+                return False
+            node = node[key]
+        return True
+
+    def _compile_variants(self, variants: Dict) -> Dict:
+        """按 variants 中的文字替换生成模板组的变体，如对话的"结局"版本"""
+        compiled = {}
+        for name, groups in variants.items():
+            templates = self.get(name)
+            compiled[name] = {
+                variant: [template.replace_literals(replacements) for template in templates]
+                for variant, replacements in groups.items()
+            }
+        return compiled
+
+    def variant(self, name: str, variant: str) -> List[Template]:
+        """模板组的变体，没有对应变体时返回原模板组"""
+        return self.variants.get(name, {}).get(variant) or self.templates[name]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+HTML解析后端测试：两种后端对空白页面的处理一致
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapter_crawler import ChapterCrawler
+from html_parser import LxmlBackend, SoupBackend, lxml_available
+
+
+BLANK_PAGES = ["", "   \n\t", "<!-- 空页面 -->"]
+
+
+class BlankPageTest(unittest.TestCase):
+
+    def _check_backend(self, backend):
+        selectors = backend.compile(["h1", "#content"])
+        for html in BLANK_PAGES:
+            with self.subTest(backend=backend.name, html=html):
+                document = backend.parse(html)
+                self.assertIsNone(document.first_text(selectors))
+                self.assertEqual(list(document.iter_links()), [])
+                self.assertEqual(document.body_text().strip(), "")
+
+                crawler = ChapterCrawler({}, {}, parser=backend)
+                self.assertEqual(crawler.extract_text(html), "")
+
+    def test_soup_backend(self):
+        self._check_backend(SoupBackend())
+
+    @unittest.skipUnless(lxml_available(), "未安装lxml/cssselect")
+    def test_lxml_backend(self):
+        self._check_backend(LxmlBackend())
+
+
+if __name__ == "__main__":
+    unittest.main()
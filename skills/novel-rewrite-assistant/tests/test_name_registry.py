@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+名字登记表测试：凑不够名字时释放本次已预留的名字
+"""
+
+import os
+import sys
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from character_generator import CharacterGenerator
+from name_registry import NameRegistry
+from name_sampler import NamePattern, NameSampler, NameSpaceExhausted
+from novel_rewriter import NovelRewriter
+
+
+class ClaimNamesTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        temp = Path(self._temp.name)
+        self.config = NovelRewriter.load_config("")
+        self.config["cache"]["cache_dir"] = str(temp / "cache")
+        self.config["generation"]["name_registry"] = str(temp / "registry.db")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def test_exhausted_retry_releases_claimed_names(self):
+        # 6个名字，其中3个已被其他进程预留；要5个，补抽时必然不够
+        sampler = NameSampler([(1.0, NamePattern("赵钱", "一二三"))])
+        other = NameRegistry(Path(self.config["generation"]["name_registry"]))
+        other.reserve(["赵一", "钱二", "赵三"])
+
+        generator = CharacterGenerator(self.config)
+        with self.assertRaises(NameSpaceExhausted):
+            generator._claim_names(sampler, random.Random(1), 5, set())
+
+        self.assertEqual(other.names(), {"赵一", "钱二", "赵三"})
+        generator.name_registry.close()
+        other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+检索索引测试：目录扫描只索引生成的故事
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+from story_sink import create_sink
+
+
+STORY = {
+    "title": "修仙传奇",
+    "author": "测试",
+    "protagonist": {"name": "林风"},
+    "supporting_characters": [],
+    "story_outline": {"main_plot_points": []},
+    "metadata": {}
+}
+
+CHAPTERS = [
+    {"number": 1, "title": "初入宗门", "content": "林风走进了青云宗的大殿。"},
+    {"number": 2, "title": "山中奇遇", "content": "林风在后山遇到了神秘老人。"}
+]
+
+# NovelRewriter.analyze_novel 写出的分析结果：chapters 是参考小说的章节链接
+ANALYSIS = {
+    "url": "https://example.com/novel",
+    "title": "参考小说",
+    "chapters": [
+        {"title": "第1章 开端", "url": "chapter/1.html", "order": 1},
+        {"title": "第2章 转折", "url": "chapter/2.html", "order": 2}
+    ],
+    "writing_style": {},
+    "main_characters": []
+}
+
+
+class UpdateDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.workspace = Path(self._temp.name)
+        self.index = SearchIndex.for_directory(self.workspace)
+
+    def tearDown(self):
+        self.index.close()
+        self._temp.cleanup()
+
+    def _write_story(self, name: str, output_format: str = "json"):
+        with create_sink(output_format, self.workspace / name) as sink:
+            sink.open(STORY)
+            sink.write_chapters(CHAPTERS)
+
+    def _indexed_paths(self):
+        return {Path(row[0]).name for row in self.index.conn.execute("SELECT path FROM documents")}
+
+    def test_skips_analysis_result(self):
+        self._write_story("修仙传奇.json")
+        (self.workspace / "analysis_result.json").write_text(
+            json.dumps(ANALYSIS, ensure_ascii=False), encoding='utf-8')
+        with open(self.workspace / "batch_results.jsonl", 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"url": ANALYSIS["url"], "status": "ok", "result": ANALYSIS},
+                               ensure_ascii=False) + "\n")
+
+        stats = self.index.update_directory(self.workspace)
+
+        self.assertEqual(stats["indexed"], 1)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(self._indexed_paths(), {"修仙传奇.json"})
+        self.assertEqual(self.index.search("第1章"), [])
+        hits = self.index.search("神秘老人")
+        self.assertEqual([(hit["title"], hit["chapter"]) for hit in hits], [("山中奇遇", 2)])
+
+    def test_indexes_jsonl_story(self):
+        self._write_story("修仙传奇.jsonl", "jsonl")
+        stats = self.index.update_directory(self.workspace)
+        self.assertEqual(stats["indexed"], 1)
+        self.assertEqual(stats["chapters"], 2)
+
+    def test_old_index_drops_analysis_result(self):
+        # 旧版本的索引中已有分析结果的文档，升级后下次扫描时删除
+        analysis_file = self.workspace / "analysis_result.json"
+        analysis_file.write_text(json.dumps(ANALYSIS, ensure_ascii=False), encoding='utf-8')
+        self.index.add_document(analysis_file, ANALYSIS["title"], ANALYSIS["chapters"])
+        self.index.close()
+        with sqlite3.connect(self.index.db_file) as conn:
+            conn.execute("PRAGMA user_version = 0")
+        conn.close()
+
+        self.index = SearchIndex.for_directory(self.workspace)
+        stats = self.index.update_directory(self.workspace)
+
+        self.assertEqual(stats["removed"], 1)
+        self.assertEqual(self._indexed_paths(), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
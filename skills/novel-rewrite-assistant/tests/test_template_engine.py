@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+模板引擎测试：不支持的占位写法在加载时报错
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from template_engine import Template, TemplateLibrary
+
+
+class TemplateTest(unittest.TestCase):
+
+    def test_render(self):
+        template = Template("{char1}看着{char2}，{{笑}}了")
+        self.assertEqual(template.render({"char1": "林风", "char2": "萧云"}), "林风看着萧云，{笑}了")
+        self.assertEqual(template.fields, {"char1", "char2"})
+
+    def test_rejects_spec_conversion_and_empty_fields(self):
+        for text in ["{age:>3}岁", "{name!r}", "{}说", "{0}说", "{char.name}"]:
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    Template(text)
+
+    def test_template_dir_skips_invalid_file(self):
+        with tempfile.TemporaryDirectory() as temp:
+            Path(temp, "bad.json").write_text(
+                json.dumps({"extra": {"bad": ["{age:>3}岁"]}}, ensure_ascii=False), encoding='utf-8')
+            Path(temp, "good.json").write_text(
+                json.dumps({"extra": {"good": ["{name}来了"]}}, ensure_ascii=False), encoding='utf-8')
+            library = TemplateLibrary.load(temp)
+
+        self.assertNotIn("bad", library.data["extra"])
+        self.assertEqual(library.get("extra", "good")[0].render({"name": "林风"}), "林风来了")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+关键词自动机模块
+把词表构建成前缀树，再编译成一个正则，一次线性扫描匹配全部词
+"""
+
+import re
+from typing import Iterable, Pattern
+
+
+class Trie:
+    """前缀树，可编译为等价的正则表达式
+
+    编译结果按前缀合并分支（如 欧(?:阳)? ），由正则引擎在C层一次扫描完成匹配，
+    同一位置总是优先匹配最长的词。
+    """
+
+    _END = ''
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """添加一个词"""
+        if not word:
+            return
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[self._END] = {}
+
+    def __contains__(self, word: str) -> bool:
+        node = self.root
+        for char in word:
+            if char not in node:
+                return False
+            node = node[char]
+        return self._END in node
+
+    def pattern(self) -> str:
+        """生成正则表达式源码（不含分组）"""
+        if not self.root:
+            return '(?!)'  # 空词表不匹配任何内容
+        return self._node_pattern(self.root)
+
+    def compile(self, flags: int = 0) -> Pattern:
+        """编译为正则对象"""
+        return re.compile(self.pattern(), flags)
+
+    def _node_pattern(self, node: dict):
+        if self._END in node and len(node) == 1:
+            return None
+
+        alternatives = []
+        single_chars = []
+        optional = False
+
+        for char in sorted(node):
+            if char == self._END:
+                optional = True
+                continue
+            sub_pattern = self._node_pattern(node[char])
+            if sub_pattern is None:
+                single_chars.append(re.escape(char))
+            else:
+                alternatives.append(re.escape(char) + sub_pattern)
+
+        chars_only = not alternatives
+        if single_chars:
+            if len(single_chars) == 1:
+                alternatives.append(single_chars[0])
+            else:
+                alternatives.append('[' + ''.join(single_chars) + ']')
+
+        if len(alternatives) == 1:
+            result = alternatives[0]
+        else:
+            result = '(?:' + '|'.join(alternatives) + ')'
+
+        if optional:
+            if chars_only:
+                result += '?'
+            else:
+                result = f'(?:{result})?'
+
+        return result